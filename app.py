@@ -14,7 +14,6 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import APP_CONFIG
 from services.portfolio_service import UserService, PortfolioService
-from services.market_service import MarketService
 from services.data_loader import DataLoader
 from db.connection import test_connection
 
@@ -185,7 +184,24 @@ def register_form():
         st.rerun()
 
 
-def sidebar():
+def change_simulation_date(new_date: date):
+    """Move the simulation date, executing pending limit orders when moving forward."""
+    old_date = st.session_state.simulation_date
+    st.session_state.simulation_date = new_date
+    st.session_state.is_time_travel = (new_date != date.today())
+
+    # Process limit orders when moving forward in time
+    if st.session_state.get('portfolio_id') and new_date > old_date:
+        from services.order_service import OrderService
+        if OrderService.has_pending_limit_orders(st.session_state.portfolio_id):
+            executed, messages = OrderService.process_limit_orders_for_range(
+                st.session_state.portfolio_id, old_date, new_date
+            )
+            if messages:
+                st.session_state['limit_order_messages'] = messages
+
+
+def sidebar(portfolios: list, date_range: tuple):
     """Display sidebar with user info and navigation."""
     with st.sidebar:
         st.title("Symulator Giełdy")
@@ -195,8 +211,6 @@ def sidebar():
             st.write(f"Zalogowany: **{user.get('login', 'N/A')}**")
 
             # Portfolio selector
-            portfolios = PortfolioService.get_user_portfolios(st.session_state.user_id)
-
             if portfolios:
                 portfolio_options = {p['nazwa_portfela']: p['portfolio_id'] for p in portfolios}
                 current_portfolio_name = None
@@ -224,8 +238,8 @@ def sidebar():
             # Time travel feature
             st.subheader("Podróż w czasie")
 
-            # Get available date range
-            min_date, max_date = MarketService.get_date_range()
+            # Available date range
+            min_date, max_date = date_range
 
             if min_date and max_date:
                 # Convert to date if datetime
@@ -250,22 +264,25 @@ def sidebar():
                 )
 
                 if simulation_date != st.session_state.simulation_date:
-                    old_date = st.session_state.simulation_date
-                    st.session_state.simulation_date = simulation_date
-                    st.session_state.is_time_travel = (simulation_date != date.today())
-
-                    # Process limit orders when moving forward in time
-                    if st.session_state.get('portfolio_id') and simulation_date > old_date:
-                        from services.order_service import OrderService
-                        if OrderService.has_pending_limit_orders(st.session_state.portfolio_id):
-                            executed, messages = OrderService.process_limit_orders_for_range(
-                                st.session_state.portfolio_id, old_date, simulation_date
-                            )
-                            if messages:
-                                st.session_state['limit_order_messages'] = messages
-
+                    change_simulation_date(simulation_date)
                     st.rerun()
 
+                # Step between trading sessions from the trading calendar
+                from services.market_service import MarketService
+                col_prev, col_next = st.columns(2)
+                with col_prev:
+                    if st.button("◀ Poprzednia sesja", use_container_width=True):
+                        previous_day = MarketService.get_previous_trading_day(simulation_date)
+                        if previous_day:
+                            change_simulation_date(previous_day)
+                            st.rerun()
+                with col_next:
+                    if st.button("Następna sesja ▶", use_container_width=True):
+                        next_day = MarketService.get_next_trading_day(simulation_date)
+                        if next_day:
+                            change_simulation_date(next_day)
+                            st.rerun()
+
                 if st.session_state.is_time_travel:
                     st.info(f"Tryb historyczny: {st.session_state.simulation_date}")
                     if st.button("Powrót do bieżącej daty"):
@@ -312,8 +329,13 @@ def main():
             login_form()
         return
 
+    # Sidebar and portfolio summary data are fetched in one round trip
+    page_data = PortfolioService.get_page_data(
+        st.session_state.portfolio_id, st.session_state.user_id
+    )
+
     # Show sidebar for logged in users
-    sidebar()
+    sidebar(page_data['portfolios'], page_data['date_range'])
 
     # Display limit order execution messages
     if 'limit_order_messages' in st.session_state:
@@ -328,27 +350,38 @@ def main():
 
     # Show portfolio summary
     if st.session_state.portfolio_id:
-        summary = PortfolioService.get_portfolio_summary(st.session_state.portfolio_id)
+        summary = page_data['summary']
 
         if summary:
             col1, col2, col3, col4 = st.columns(4)
 
             currency = summary.get('waluta_portfela', 'USD')
-            saldo = float(summary.get('saldo_gotowkowe', 0) or 0)
+            saldo = summary['saldo_gotowkowe']
 
             # Calculate values based on time travel mode
+            snapshot = None
             if st.session_state.is_time_travel:
+                snapshot = PortfolioService.get_portfolio_summary_for_date(
+                    st.session_state.portfolio_id, st.session_state.simulation_date
+                )
+            if snapshot:
+                # Stored daily snapshot for the historical date
+                saldo = snapshot['saldo_gotowkowe']
+                wartosc_pozycji = snapshot['wartosc_pozycji']
+                zysk_strata = snapshot['zysk_strata_pozycji']
+                wartosc_calkowita = snapshot['wartosc_calkowita']
+            elif st.session_state.is_time_travel:
                 simulation_date = st.session_state.simulation_date
                 positions = PortfolioService.get_positions_for_date(
                     st.session_state.portfolio_id, simulation_date
                 )
-                wartosc_pozycji = sum(float(p.get('wartosc_biezaca', 0) or 0) for p in positions)
-                zysk_strata = sum(float(p.get('zysk_strata', 0) or 0) for p in positions)
+                wartosc_pozycji = sum(p['wartosc_biezaca'] for p in positions)
+                zysk_strata = sum(p['zysk_strata'] for p in positions)
                 wartosc_calkowita = saldo + wartosc_pozycji
             else:
-                wartosc_calkowita = float(summary.get('wartosc_calkowita', 0) or 0)
-                wartosc_pozycji = float(summary.get('wartosc_pozycji', 0) or 0)
-                zysk_strata = float(summary.get('zysk_strata_pozycji', 0) or 0)
+                wartosc_calkowita = summary['wartosc_calkowita']
+                wartosc_pozycji = summary['wartosc_pozycji']
+                zysk_strata = summary['zysk_strata_pozycji']
 
             with col1:
                 st.metric(
@@ -5,11 +5,28 @@ Chart components using Plotly.
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from datetime import date
 import pandas as pd
 
 
+# Technical indicators drawn by Charts.candlestick_chart: name -> (column, label, color, dash)
+INDICATOR_OVERLAYS = {
+    'SMA 20': [('sma_20', 'SMA 20', '#ff9800', 'solid')],
+    'SMA 50': [('sma_50', 'SMA 50', '#9c27b0', 'solid')],
+    'EMA 20': [('ema_20', 'EMA 20', '#2196f3', 'solid')],
+    'Bollinger': [('bb_gorna', 'Bollinger górna', '#607d8b', 'dot'),
+                  ('bb_dolna', 'Bollinger dolna', '#607d8b', 'dot')],
+}
+INDICATOR_PANELS = {
+    'RSI': [('rsi_14', 'RSI 14', '#673ab7', 'solid')],
+    'MACD': [('macd', 'MACD', '#2196f3', 'solid'),
+             ('macd_sygnal', 'Sygnał', '#ff9800', 'solid'),
+             ('macd_histogram', 'Histogram', None, None)],
+    'ATR': [('atr_14', 'ATR 14', '#795548', 'solid')],
+}
+
+
 class Charts:
     """Plotly chart components."""
 
@@ -61,20 +78,77 @@ class Charts:
         return fig
 
     @staticmethod
-    def candlestick_chart(price_data: List[Dict], symbol: str,
-                         title: str = None) -> go.Figure:
+    def performance_chart(series: pd.DataFrame,
+                          title: str = 'Stopa zwrotu i obsunięcie') -> go.Figure:
+        """
+        Create a chart of cumulative return above drawdown.
+
+        Args:
+            series: DataFrame with 'data', 'zwrot_skumulowany' and 'obsuniecie' (fractions)
+            title: Chart title
+
+        Returns:
+            Plotly figure
+        """
+        if series is None or len(series) == 0:
+            fig = go.Figure()
+            fig.add_annotation(
+                text="Brak danych do wyświetlenia",
+                xref="paper", yref="paper",
+                x=0.5, y=0.5, showarrow=False
+            )
+            return fig
+
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                            vertical_spacing=0.05, row_heights=[0.65, 0.35])
+        fig.add_trace(go.Scatter(
+            x=series['data'],
+            y=series['zwrot_skumulowany'] * 100,
+            mode='lines',
+            name='Stopa zwrotu',
+            line=dict(color='#1f77b4', width=2),
+            hovertemplate='%{x}<br>Stopa zwrotu: %{y:.2f}%<extra></extra>'
+        ), row=1, col=1)
+        fig.add_trace(go.Scatter(
+            x=series['data'],
+            y=series['obsuniecie'] * 100,
+            mode='lines',
+            name='Obsunięcie',
+            line=dict(color='#d62728', width=1),
+            fill='tozeroy',
+            fillcolor='rgba(214, 39, 40, 0.2)',
+            hovertemplate='%{x}<br>Obsunięcie: %{y:.2f}%<extra></extra>'
+        ), row=2, col=1)
+
+        fig.update_yaxes(title_text='Stopa zwrotu (%)', row=1, col=1)
+        fig.update_yaxes(title_text='Obsunięcie (%)', row=2, col=1)
+        fig.update_layout(
+            title=title,
+            hovermode='x unified',
+            showlegend=False,
+            height=500
+        )
+
+        return fig
+
+    @staticmethod
+    def candlestick_chart(price_data: Union[List[Dict], pd.DataFrame], symbol: str,
+                         title: str = None, indicators: pd.DataFrame = None,
+                         selected_indicators: List[str] = None) -> go.Figure:
         """
         Create a candlestick chart for stock prices.
 
         Args:
-            price_data: List of OHLCV dicts
+            price_data: List of OHLCV dicts or OHLCV DataFrame
             symbol: Stock symbol
             title: Optional title
+            indicators: Precomputed indicators (IndicatorService.get_indicators)
+            selected_indicators: Keys of INDICATOR_OVERLAYS / INDICATOR_PANELS to draw
 
         Returns:
             Plotly figure
         """
-        if not price_data:
+        if price_data is None or len(price_data) == 0:
             fig = go.Figure()
             fig.add_annotation(
                 text="Brak danych do wyświetlenia",
@@ -83,7 +157,7 @@ class Charts:
             )
             return fig
 
-        df = pd.DataFrame(price_data)
+        df = price_data if isinstance(price_data, pd.DataFrame) else pd.DataFrame(price_data)
 
         # Rename columns if needed
         column_map = {
@@ -96,11 +170,16 @@ class Charts:
         }
         df = df.rename(columns=column_map)
 
+        selected = selected_indicators or []
+        if indicators is None or indicators.empty:
+            selected = []
+        panels = [name for name in INDICATOR_PANELS if name in selected]
+
         fig = make_subplots(
-            rows=2, cols=1,
+            rows=2 + len(panels), cols=1,
             shared_xaxes=True,
             vertical_spacing=0.03,
-            row_heights=[0.7, 0.3]
+            row_heights=[0.7, 0.3] + [0.25] * len(panels)
         )
 
         # Candlestick
@@ -115,6 +194,16 @@ class Charts:
             decreasing_line_color='#ef5350'
         ), row=1, col=1)
 
+        # Indicator lines over the price
+        for name, lines in INDICATOR_OVERLAYS.items():
+            if name not in selected:
+                continue
+            for column, label, color, dash in lines:
+                fig.add_trace(go.Scatter(
+                    x=indicators['data'], y=indicators[column], mode='lines', name=label,
+                    line=dict(color=color, width=1, dash=dash)
+                ), row=1, col=1)
+
         # Volume bars
         colors = ['#26a69a' if close >= open else '#ef5350'
                   for close, open in zip(df['close'], df['open'])]
@@ -127,11 +216,30 @@ class Charts:
             opacity=0.7
         ), row=2, col=1)
 
+        # Indicators in their own panels below the volume
+        for row, name in enumerate(panels, start=3):
+            for column, label, color, dash in INDICATOR_PANELS[name]:
+                if column == 'macd_histogram':
+                    fig.add_trace(go.Bar(
+                        x=indicators['data'], y=indicators[column], name=label,
+                        marker_color=['#26a69a' if v >= 0 else '#ef5350' for v in indicators[column].fillna(0)],
+                        opacity=0.6
+                    ), row=row, col=1)
+                else:
+                    fig.add_trace(go.Scatter(
+                        x=indicators['data'], y=indicators[column], mode='lines', name=label,
+                        line=dict(color=color, width=1, dash=dash)
+                    ), row=row, col=1)
+            if name == 'RSI':
+                fig.add_hline(y=70, line_dash='dot', line_color='gray', row=row, col=1)
+                fig.add_hline(y=30, line_dash='dot', line_color='gray', row=row, col=1)
+            fig.update_yaxes(title_text=name, row=row, col=1)
+
         fig.update_layout(
             title=title or f'{symbol} - Wykres świecowy',
             xaxis_rangeslider_visible=False,
-            height=500,
-            showlegend=False
+            height=500 + 150 * len(panels),
+            showlegend=bool(selected)
         )
 
         fig.update_yaxes(title_text='Cena', row=1, col=1)
@@ -140,20 +248,20 @@ class Charts:
         return fig
 
     @staticmethod
-    def line_chart(price_data: List[Dict], symbol: str,
+    def line_chart(price_data: Union[List[Dict], pd.DataFrame], symbol: str,
                   title: str = None) -> go.Figure:
         """
         Create a simple line chart for stock prices.
 
         Args:
-            price_data: List of dicts with 'data' and 'close' (or 'cena_zamkniecia')
+            price_data: List of dicts or DataFrame with 'data' and 'close' (or 'cena_zamkniecia')
             symbol: Stock symbol
             title: Optional title
 
         Returns:
             Plotly figure
         """
-        if not price_data:
+        if price_data is None or len(price_data) == 0:
             fig = go.Figure()
             fig.add_annotation(
                 text="Brak danych do wyświetlenia",
@@ -162,7 +270,7 @@ class Charts:
             )
             return fig
 
-        df = pd.DataFrame(price_data)
+        df = price_data if isinstance(price_data, pd.DataFrame) else pd.DataFrame(price_data)
 
         # Handle different column names
         date_col = 'data' if 'data' in df.columns else 'data_notowan'
@@ -197,7 +305,7 @@ class Charts:
         Create a pie chart showing portfolio composition.
 
         Args:
-            positions: List of position dicts with 'symbol' and 'wartosc_biezaca'
+            positions: List of position records with 'symbol' and float 'wartosc_biezaca'
 
         Returns:
             Plotly figure
@@ -212,7 +320,7 @@ class Charts:
             return fig
 
         labels = [p.get('symbol', 'N/A') for p in positions]
-        values = [float(p.get('wartosc_biezaca', 0) or 0) for p in positions]
+        values = [p['wartosc_biezaca'] for p in positions]
 
         fig = go.Figure(data=[go.Pie(
             labels=labels,
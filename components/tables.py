@@ -4,10 +4,24 @@ Table components for displaying data.
 
 import streamlit as st
 import pandas as pd
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, Optional, Callable, Union
 from datetime import datetime
 
 
+# Position fields shown by positions_dataframe and their column labels
+POSITION_COLUMNS = {
+    'symbol': 'Symbol',
+    'nazwa_pelna': 'Nazwa',
+    'ilosc_akcji': 'Ilość',
+    'srednia_cena_zakupu': 'Śr. cena zakupu',
+    'wartosc_zakupu': 'Wartość zakupu',
+    'wartosc_biezaca': 'Wartość bieżąca',
+    'zysk_strata': 'Zysk/Strata',
+    'zysk_strata_procent': 'Zysk %',
+}
+POSITION_NUMERIC_COLUMNS = list(POSITION_COLUMNS.values())[2:]
+
+
 class Tables:
     """Data table components."""
 
@@ -18,7 +32,7 @@ class Tables:
         Display positions table with optional sell button.
 
         Args:
-            positions: List of position dicts
+            positions: List of position records (see PortfolioService.get_positions)
             currency: Currency symbol
             on_sell_click: Callback when sell button is clicked
         """
@@ -29,11 +43,11 @@ class Tables:
         for pos in positions:
             symbol = pos.get('symbol', 'N/A')
             nazwa = pos.get('nazwa_pelna', '')
-            ilosc = float(pos.get('ilosc_akcji', 0) or 0)
-            srednia_cena = float(pos.get('srednia_cena_zakupu', 0) or 0)
-            wartosc_biezaca = float(pos.get('wartosc_biezaca', 0) or 0)
-            zysk_strata = float(pos.get('zysk_strata', 0) or 0)
-            zysk_procent = float(pos.get('zysk_strata_procent', 0) or 0)
+            ilosc = pos['ilosc_akcji']
+            srednia_cena = pos['srednia_cena_zakupu']
+            wartosc_biezaca = pos['wartosc_biezaca']
+            zysk_strata = pos['zysk_strata']
+            zysk_procent = pos['zysk_strata_procent']
 
             with st.container():
                 col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 1])
@@ -71,34 +85,31 @@ class Tables:
                 st.divider()
 
     @staticmethod
-    def positions_dataframe(positions: List[Dict], currency: str = 'USD') -> pd.DataFrame:
+    def positions_dataframe(positions: Union[List[Dict], pd.DataFrame],
+                            currency: str = 'USD') -> pd.DataFrame:
         """
         Convert positions to formatted DataFrame.
 
         Args:
-            positions: List of position dicts
+            positions: List of position dicts or positions DataFrame
             currency: Currency symbol
 
         Returns:
             Formatted DataFrame
         """
-        if not positions:
+        if positions is None or len(positions) == 0:
             return pd.DataFrame()
 
-        data = []
-        for pos in positions:
-            data.append({
-                'Symbol': pos.get('symbol', 'N/A'),
-                'Nazwa': pos.get('nazwa_pelna', ''),
-                'Ilość': float(pos.get('ilosc_akcji', 0) or 0),
-                'Śr. cena zakupu': float(pos.get('srednia_cena_zakupu', 0) or 0),
-                'Wartość zakupu': float(pos.get('wartosc_zakupu', 0) or 0),
-                'Wartość bieżąca': float(pos.get('wartosc_biezaca', 0) or 0),
-                'Zysk/Strata': float(pos.get('zysk_strata', 0) or 0),
-                'Zysk %': float(pos.get('zysk_strata_procent', 0) or 0),
-            })
+        if isinstance(positions, pd.DataFrame):
+            source = positions
+        else:
+            source = pd.DataFrame.from_records(positions)
+
+        df = source.reindex(columns=list(POSITION_COLUMNS)).rename(columns=POSITION_COLUMNS)
+        df['Symbol'] = df['Symbol'].fillna('N/A')
+        df['Nazwa'] = df['Nazwa'].fillna('')
+        df[POSITION_NUMERIC_COLUMNS] = df[POSITION_NUMERIC_COLUMNS].astype('float64').fillna(0.0)
 
-        df = pd.DataFrame(data)
         return df
 
     @staticmethod
@@ -119,7 +130,7 @@ class Tables:
             symbol = order.get('symbol', 'N/A')
             typ = order.get('typ_zlecenia', 'N/A')
             strona = order.get('strona_zlecenia', 'N/A')
-            ilosc = float(order.get('ilosc', 0) or 0)
+            ilosc = order.get('ilosc') or 0
             limit_ceny = order.get('limit_ceny')
             status = order.get('status', 'N/A')
             data_utworzenia = order.get('data_utworzenia')
@@ -137,7 +148,7 @@ class Tables:
 
                 with col3:
                     if limit_ceny:
-                        st.metric(label="Limit ceny", value=f"{float(limit_ceny):,.2f}")
+                        st.metric(label="Limit ceny", value=f"{limit_ceny:,.2f}")
                     else:
                         st.metric(label="Limit ceny", value="Rynkowa")
 
@@ -180,10 +191,10 @@ class Tables:
                 'Data': tx.get('data_transakcji'),
                 'Symbol': tx.get('symbol', 'N/A'),
                 'Typ': tx.get('typ_transakcji', 'N/A'),
-                'Ilość': float(tx.get('ilosc', 0) or 0),
-                'Cena': float(tx.get('cena_jednostkowa', 0) or 0),
-                'Wartość': float(tx.get('wartosc_transakcji', 0) or 0),
-                'Prowizja': float(tx.get('prowizja', 0) or 0),
+                'Ilość': tx.get('ilosc') or 0,
+                'Cena': tx.get('cena_jednostkowa') or 0,
+                'Wartość': tx.get('wartosc_transakcji') or 0,
+                'Prowizja': tx.get('prowizja') or 0,
                 'Waluta': tx.get('waluta_transakcji', 'USD')
             })
 
@@ -234,18 +245,18 @@ class Tables:
 
                 with col3:
                     if cena:
-                        st.metric(label="Cena", value=f"{float(cena):,.2f} {currency}")
+                        st.metric(label="Cena", value=f"{cena:,.2f} {currency}")
                     else:
                         st.metric(label="Cena", value="Brak danych")
 
                 with col4:
                     if zmiana is not None and zmiana_procent is not None:
-                        color = "normal" if float(zmiana) >= 0 else "inverse"
-                        sign = "+" if float(zmiana) > 0 else ""
+                        color = "normal" if zmiana >= 0 else "inverse"
+                        sign = "+" if zmiana > 0 else ""
                         st.metric(
                             label="Zmiana",
-                            value=f"{sign}{float(zmiana):,.2f}",
-                            delta=f"{sign}{float(zmiana_procent):.2f}%",
+                            value=f"{sign}{zmiana:,.2f}",
+                            delta=f"{sign}{zmiana_procent:.2f}%",
                             delta_color=color
                         )
                     else:
@@ -282,9 +293,9 @@ class Tables:
                 'Symbol': inst.get('symbol', 'N/A'),
                 'Nazwa': inst.get('nazwa_pelna', ''),
                 'Sektor': inst.get('nazwa_sektora', 'N/A'),
-                'Cena': float(cena) if cena else None,
-                'Zmiana': float(zmiana) if zmiana else None,
-                'Zmiana %': float(zmiana_procent) if zmiana_procent else None,
+                'Cena': cena,
+                'Zmiana': zmiana,
+                'Zmiana %': zmiana_procent,
                 'Wolumen': inst.get('wolumen'),
                 'Data': inst.get('data_notowan')
             })
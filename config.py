@@ -13,6 +13,84 @@ DB_CONFIG = {
     'password': os.environ.get('ORACLE_PASSWORD', 'YourPassword123'),
 }
 
+# Connection pool settings
+POOL_CONFIG = {
+    'min': int(os.environ.get('ORACLE_POOL_MIN', 2)),
+    'max': int(os.environ.get('ORACLE_POOL_MAX', 10)),
+    'increment': int(os.environ.get('ORACLE_POOL_INCREMENT', 1)),
+    # Seconds after which idle connections above 'min' are closed (0 = never)
+    'timeout': int(os.environ.get('ORACLE_POOL_TIMEOUT', 0)),
+    # WAIT, NOWAIT, FORCEGET or TIMEDWAIT
+    'getmode': os.environ.get('ORACLE_POOL_GETMODE', 'WAIT').upper(),
+    # Milliseconds acquire() may wait when getmode is TIMEDWAIT
+    'wait_timeout': int(os.environ.get('ORACLE_POOL_WAIT_TIMEOUT', 5000)),
+    # Seconds of idleness after which a connection is pinged before reuse
+    'ping_interval': int(os.environ.get('ORACLE_POOL_PING_INTERVAL', 60)),
+}
+
+# Upper bounds (ms) of the acquire() wait-time histogram buckets
+POOL_WAIT_BUCKETS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+# Rows fetched per round trip by the streaming query helpers
+FETCH_ARRAYSIZE = int(os.environ.get('ORACLE_FETCH_ARRAYSIZE', 1000))
+
+# Rows bound per executemany() round trip (and commit) by execute_many
+DML_BATCH_SIZE = int(os.environ.get('ORACLE_DML_BATCH_SIZE', 1000))
+
+# Per-statement latency statistics and slow-query log
+QUERY_STATS_CONFIG = {
+    'enabled': os.environ.get('ORACLE_QUERY_STATS', '1') != '0',
+    # Statements slower than this (total ms) are written to the slow-query log
+    'slow_threshold_ms': float(os.environ.get('ORACLE_SLOW_QUERY_MS', 500)),
+    'slow_log_file': os.environ.get('ORACLE_SLOW_QUERY_LOG', 'logs/slow_queries.log'),
+    'slow_log_max_bytes': int(os.environ.get('ORACLE_SLOW_QUERY_LOG_MAX_BYTES', 1_000_000)),
+    'slow_log_backup_count': int(os.environ.get('ORACLE_SLOW_QUERY_LOG_BACKUPS', 5)),
+}
+
+# Upper bounds (ms) of the per-statement latency histogram buckets
+QUERY_LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+# How execute_query_batch sends several queries in one round trip:
+# 'auto' (pipelining on Oracle 23+, otherwise PL/SQL), 'pipeline' or 'plsql'
+QUERY_BATCH_MODE = os.environ.get('ORACLE_QUERY_BATCH_MODE', 'auto').lower()
+
+# Seconds reference data (instruments, sectors, exchanges, date range) stays
+# in the process-wide cache; 0 disables caching
+REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL', 600))
+
+# In-memory price matrix used for as-of price lookups
+PRICE_MATRIX_CONFIG = {
+    'enabled': os.environ.get('PRICE_MATRIX', '1') != '0',
+    # Seconds after which a lookup first loads bars added by other processes
+    'refresh_seconds': int(os.environ.get('PRICE_MATRIX_REFRESH_SECONDS', 60)),
+}
+
+# Technical indicators cache (SMA/EMA/RSI/MACD/Bollinger/ATR per instrument)
+INDICATOR_CONFIG = {
+    # Seconds after which a lookup first loads bars added by other processes
+    'refresh_seconds': int(os.environ.get('INDICATORS_REFRESH_SECONDS', 60)),
+}
+
+# Event-sourced position history used for time travel
+POSITION_LEDGER_CONFIG = {
+    # Transactions between position checkpoints; a lookup replays at most this many
+    'checkpoint_interval': int(os.environ.get('POSITION_LEDGER_CHECKPOINT_INTERVAL', 64)),
+    # Seconds after which a lookup first checks for transactions added by other processes
+    'refresh_seconds': int(os.environ.get('POSITION_LEDGER_REFRESH_SECONDS', 60)),
+}
+
+# Portfolio performance analytics
+ANALYTICS_CONFIG = {
+    # Trading days per year used to annualize returns and volatility
+    'trading_days': 252,
+    # Annual risk-free rate for Sharpe/Sortino
+    'risk_free_rate': float(os.environ.get('ANALYTICS_RISK_FREE_RATE', 0.0)),
+    # Trading days in the rolling volatility window
+    'volatility_window': int(os.environ.get('ANALYTICS_VOLATILITY_WINDOW', 21)),
+    # Benchmark for beta; empty = first instrument of type INDEKS
+    'benchmark_symbol': os.environ.get('ANALYTICS_BENCHMARK', ''),
+}
+
 # Connection string format for oracledb
 def get_connection_string() -> str:
     """Get Oracle connection string in DSN format."""
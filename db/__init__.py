@@ -2,8 +2,10 @@
 Database module for Oracle connection and operations.
 """
 
-from .connection import get_connection, ConnectionPool
+from .connection import get_connection, get_pool_stats, ConnectionPool
+from .connection_async import run_async, AsyncConnectionPool
 from .queries import Queries
 from .procedures import Procedures
 
-__all__ = ['get_connection', 'ConnectionPool', 'Queries', 'Procedures']
+__all__ = ['get_connection', 'get_pool_stats', 'ConnectionPool', 'run_async', 'AsyncConnectionPool',
+           'Queries', 'Procedures']
@@ -3,14 +3,140 @@ Oracle database connection management with connection pooling.
 """
 
 import oracledb
+import numpy as np
+import pandas as pd
 from contextlib import contextmanager
-from typing import Optional, Generator
+from typing import Optional, Generator, Dict, Iterator, List, Tuple
+from decimal import Decimal
+import threading
+import time
 import sys
 import os
 
+try:
+    import pyarrow
+except ImportError:  # Arrow fetch path is optional
+    pyarrow = None
+
 # Add parent directory to path for config import
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import DB_CONFIG, get_connection_string
+from config import (
+    DB_CONFIG, POOL_CONFIG, POOL_WAIT_BUCKETS_MS, FETCH_ARRAYSIZE, DML_BATCH_SIZE,
+    QUERY_BATCH_MODE, get_connection_string
+)
+from .instrumentation import instrument
+from .records import Record, record_type
+
+
+# Pool getmode names accepted in POOL_CONFIG
+POOL_GETMODES = {
+    'WAIT': oracledb.POOL_GETMODE_WAIT,
+    'NOWAIT': oracledb.POOL_GETMODE_NOWAIT,
+    'FORCEGET': oracledb.POOL_GETMODE_FORCEGET,
+    'TIMEDWAIT': oracledb.POOL_GETMODE_TIMEDWAIT,
+}
+
+# python-oracledb error raised when a TIMEDWAIT acquire runs out of time
+POOL_TIMEOUT_ERROR = 'DPY-4005'
+
+# Column types fetched into NumPy numeric arrays by execute_query_frame
+NUMERIC_DB_TYPES = (
+    oracledb.DB_TYPE_NUMBER,
+    oracledb.DB_TYPE_BINARY_DOUBLE,
+    oracledb.DB_TYPE_BINARY_FLOAT,
+    oracledb.DB_TYPE_BINARY_INTEGER,
+)
+
+
+def float_output_handler(cursor, metadata):
+    """Fetch NUMBER columns with decimal places as native floats."""
+    if metadata.type_code is oracledb.DB_TYPE_NUMBER and metadata.scale > 0:
+        return cursor.var(oracledb.DB_TYPE_BINARY_DOUBLE, arraysize=cursor.arraysize)
+
+
+def fixed_point_output_handler(cursor, metadata):
+    """
+    Fetch NUMBER columns with decimal places as scaled integers.
+
+    A NUMBER(15,4) value 12.3456 is fetched as 123456, i.e. in units of
+    10**-scale, so sums stay exact and fit in int64.
+    """
+    if metadata.type_code is oracledb.DB_TYPE_NUMBER and metadata.scale > 0:
+        scale = metadata.scale
+        return cursor.var(
+            str, arraysize=cursor.arraysize,
+            outconverter=lambda value: int(Decimal(value).scaleb(scale))
+        )
+
+
+class PoolStats:
+    """Thread-safe counters for connection pool usage."""
+
+    def __init__(self, buckets_ms: list = None):
+        self._lock = threading.Lock()
+        self.buckets_ms = list(buckets_ms or POOL_WAIT_BUCKETS_MS)
+        self.reset()
+
+    def reset(self):
+        """Reset all counters."""
+        with self._lock:
+            self.acquires = 0
+            self.releases = 0
+            self.timeouts = 0
+            self.errors = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            # One extra bucket for waits above the last boundary
+            self.wait_histogram = [0] * (len(self.buckets_ms) + 1)
+
+    def record_acquire(self, wait_ms: float):
+        """Record a successful acquire() and the time spent waiting for it."""
+        with self._lock:
+            self.acquires += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+            index = len(self.buckets_ms)
+            for i, bound in enumerate(self.buckets_ms):
+                if wait_ms <= bound:
+                    index = i
+                    break
+            self.wait_histogram[index] += 1
+
+    def record_release(self):
+        """Record a connection returned to the pool."""
+        with self._lock:
+            self.releases += 1
+            self.in_use = max(self.in_use - 1, 0)
+
+    def record_failure(self, timed_out: bool):
+        """Record a failed acquire()."""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def snapshot(self) -> Dict:
+        """Return a copy of the counters as a plain dictionary."""
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in self.buckets_ms]
+            labels.append(f">{self.buckets_ms[-1]}ms" if self.buckets_ms else "all")
+            return {
+                'acquires': self.acquires,
+                'releases': self.releases,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'avg_wait_ms': round(self.total_wait_ms / self.acquires, 3) if self.acquires else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3),
+                'wait_histogram': dict(zip(labels, self.wait_histogram)),
+            }
 
 
 class ConnectionPool:
@@ -18,23 +144,43 @@ class ConnectionPool:
 
     _instance: Optional['ConnectionPool'] = None
     _pool: Optional[oracledb.ConnectionPool] = None
+    _stats: Optional[PoolStats] = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._stats = PoolStats()
         return cls._instance
 
-    def initialize(self, min_connections: int = 2, max_connections: int = 10):
-        """Initialize the connection pool."""
+    def initialize(self, min_connections: int = None, max_connections: int = None):
+        """
+        Initialize the connection pool.
+
+        Sizing, timeouts, getmode and ping interval come from POOL_CONFIG;
+        min_connections/max_connections override the configured sizes.
+        """
         if self._pool is None:
+            getmode = POOL_CONFIG['getmode']
+            if getmode not in POOL_GETMODES:
+                raise ValueError(f"Nieznany tryb pobierania połączeń: {getmode}")
+
+            params = {
+                'min': min_connections if min_connections is not None else POOL_CONFIG['min'],
+                'max': max_connections if max_connections is not None else POOL_CONFIG['max'],
+                'increment': POOL_CONFIG['increment'],
+                'timeout': POOL_CONFIG['timeout'],
+                'getmode': POOL_GETMODES[getmode],
+                'ping_interval': POOL_CONFIG['ping_interval'],
+            }
+            if getmode == 'TIMEDWAIT':
+                params['wait_timeout'] = POOL_CONFIG['wait_timeout']
+
             try:
                 self._pool = oracledb.create_pool(
                     user=DB_CONFIG['user'],
                     password=DB_CONFIG['password'],
                     dsn=get_connection_string(),
-                    min=min_connections,
-                    max=max_connections,
-                    increment=1
+                    **params
                 )
             except oracledb.Error as e:
                 raise ConnectionError(f"Nie można utworzyć puli połączeń: {e}")
@@ -43,12 +189,52 @@ class ConnectionPool:
         """Get a connection from the pool."""
         if self._pool is None:
             self.initialize()
-        return self._pool.acquire()
+
+        start = time.perf_counter()
+        try:
+            connection = self._pool.acquire()
+        except oracledb.Error as e:
+            error_obj = e.args[0] if e.args else None
+            timed_out = getattr(error_obj, 'full_code', None) == POOL_TIMEOUT_ERROR
+            self._stats.record_failure(timed_out)
+            raise
+        self._stats.record_acquire((time.perf_counter() - start) * 1000)
+        # Money and price columns come back as float, so callers need no conversion
+        connection.outputtypehandler = float_output_handler
+        return connection
 
     def release_connection(self, connection: oracledb.Connection):
         """Release a connection back to the pool."""
         if self._pool is not None and connection is not None:
             self._pool.release(connection)
+            self._stats.record_release()
+
+    def get_stats(self) -> Dict:
+        """
+        Get pool statistics.
+
+        Returns dict with:
+        - configured: min, max, increment, getmode, timeouts and ping interval
+        - opened, busy: live counts reported by the driver (None before init)
+        - acquires, releases, timeouts, errors, in_use, peak_in_use
+        - avg_wait_ms, max_wait_ms, wait_histogram: acquire() wait times
+        """
+        stats = self._stats.snapshot()
+        stats['configured'] = dict(POOL_CONFIG)
+        stats['initialized'] = self._pool is not None
+        if self._pool is not None:
+            stats['opened'] = self._pool.opened
+            stats['busy'] = self._pool.busy
+            stats['configured']['min'] = self._pool.min
+            stats['configured']['max'] = self._pool.max
+        else:
+            stats['opened'] = None
+            stats['busy'] = None
+        return stats
+
+    def reset_stats(self):
+        """Reset collected pool statistics."""
+        self._stats.reset()
 
     def close(self):
         """Close the connection pool."""
@@ -71,17 +257,92 @@ def release_connection(connection: oracledb.Connection):
     _pool.release_connection(connection)
 
 
+def get_pool_stats() -> Dict:
+    """Get connection pool statistics (see ConnectionPool.get_stats)."""
+    return _pool.get_stats()
+
+
+class UnitOfWork:
+    """A transaction shared by all database calls made inside unit_of_work()."""
+
+    def __init__(self, connection: oracledb.Connection):
+        self.connection = connection
+        self.rolled_back = False
+
+    def commit(self):
+        """Commit the work done so far."""
+        self.connection.commit()
+
+    def rollback(self):
+        """Discard the work and end the unit without committing."""
+        self.connection.rollback()
+        self.rolled_back = True
+
+
+# Unit of work active on the current thread (Streamlit runs each session in its own thread)
+_local = threading.local()
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    """Get the unit of work active on this thread, or None."""
+    return getattr(_local, 'unit_of_work', None)
+
+
+@contextmanager
+def unit_of_work() -> Generator[UnitOfWork, None, None]:
+    """
+    Context manager sharing one connection and one transaction.
+
+    Every get_db_connection() (and so every helper and Procedures call)
+    inside the block uses the same pooled connection. The helpers skip
+    their own commits and Procedures ask the PL/SQL procedures not to
+    commit, so the work is committed once when the block exits. An
+    exception or uow.rollback() discards all of it. A nested
+    unit_of_work() joins the outer one.
+
+    Usage:
+        with unit_of_work() as uow:
+            success, message, order_id = Procedures.create_order(...)
+            if not success:
+                uow.rollback()
+    """
+    outer = current_unit_of_work()
+    if outer is not None:
+        yield outer
+        return
+
+    connection = get_connection()
+    uow = UnitOfWork(connection)
+    _local.unit_of_work = uow
+    try:
+        yield uow
+        if not uow.rolled_back:
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        _local.unit_of_work = None
+        release_connection(connection)
+
+
 @contextmanager
 def get_db_connection() -> Generator[oracledb.Connection, None, None]:
     """
     Context manager for database connections.
     Automatically acquires and releases connections from the pool.
+    Inside unit_of_work() the unit's connection is used instead.
 
     Usage:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM table")
     """
+    uow = current_unit_of_work()
+    if uow is not None:
+        yield uow.connection
+        return
+
     connection = None
     try:
         connection = get_connection()
@@ -142,12 +403,15 @@ def execute_query(query: str, params: dict = None) -> list:
     Returns:
         List of tuples with query results
     """
-    with get_db_cursor() as cursor:
+    with get_db_cursor() as cursor, instrument(query, params) as probe:
         if params:
             cursor.execute(query, params)
         else:
             cursor.execute(query)
-        return cursor.fetchall()
+        probe.start_fetch()
+        results = cursor.fetchall()
+        probe.rows = len(results)
+        return results
 
 
 def execute_query_dict(query: str, params: dict = None) -> list[dict]:
@@ -161,44 +425,389 @@ def execute_query_dict(query: str, params: dict = None) -> list[dict]:
     Returns:
         List of dictionaries with column names as keys
     """
-    with get_db_cursor() as cursor:
+    with get_db_cursor() as cursor, instrument(query, params) as probe:
         if params:
             cursor.execute(query, params)
         else:
             cursor.execute(query)
+        probe.start_fetch()
 
         columns = [col[0].lower() for col in cursor.description]
         results = []
         for row in cursor.fetchall():
             results.append(dict(zip(columns, row)))
+        probe.rows = len(results)
         return results
 
 
-def execute_dml(query: str, params: dict = None, commit: bool = True) -> int:
+def execute_query_records(query: str, params: dict = None, float_fields: tuple = (),
+                          extra_fields: tuple = ()) -> List[Record]:
     """
-    Execute a DML statement (INSERT, UPDATE, DELETE).
+    Execute a SELECT query and return results as typed records.
+
+    Rows are built by a cursor row factory, so no per-row dict is created
+    and float_fields are converted once while fetching.
 
     Args:
-        query: SQL DML statement
+        query: SQL SELECT query
         params: Optional dictionary of bind parameters
-        commit: Whether to commit the transaction
+        float_fields: Columns returned as float (NULL becomes 0.0)
+        extra_fields: Additional fields the caller fills in later
 
     Returns:
-        Number of affected rows
+        List of records (see db.records) with column names as fields
+    """
+    with get_db_cursor() as cursor, instrument(query, params) as probe:
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        probe.start_fetch()
+
+        columns = tuple(col[0].lower() for col in cursor.description)
+        cursor.rowfactory = record_type(columns, tuple(float_fields), tuple(extra_fields))
+        results = cursor.fetchall()
+        probe.rows = len(results)
+        return results
+
+
+def iter_query(query: str, params: dict = None,
+               arraysize: int = FETCH_ARRAYSIZE) -> Iterator[tuple]:
+    """
+    Execute a SELECT query and yield result rows one at a time.
+
+    Rows are fetched from the database in batches of `arraysize`, so memory
+    use stays constant regardless of the result size. The pooled connection
+    is held until the generator is exhausted or closed; the rows fetched and
+    the fetch time are recorded then.
+
+    Args:
+        query: SQL SELECT query
+        params: Optional dictionary of bind parameters
+        arraysize: Number of rows fetched per round trip
+
+    Yields:
+        Result rows as tuples
+    """
+    with get_db_cursor() as cursor, instrument(query, params) as probe:
+        cursor.arraysize = arraysize
+        cursor.prefetchrows = arraysize
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        probe.start_fetch()
+        probe.rows = 0
+
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            probe.rows += len(rows)
+            yield from rows
+
+
+def iter_query_dict(query: str, params: dict = None,
+                    arraysize: int = FETCH_ARRAYSIZE) -> Iterator[dict]:
+    """
+    Execute a SELECT query and yield result rows as dictionaries.
+
+    Streaming counterpart of execute_query_dict; see iter_query.
+
+    Args:
+        query: SQL SELECT query
+        params: Optional dictionary of bind parameters
+        arraysize: Number of rows fetched per round trip
+
+    Yields:
+        Dictionaries with column names as keys
+    """
+    with get_db_cursor() as cursor, instrument(query, params) as probe:
+        cursor.arraysize = arraysize
+        cursor.prefetchrows = arraysize
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        probe.start_fetch()
+        probe.rows = 0
+
+        columns = [col[0].lower() for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            probe.rows += len(rows)
+            for row in rows:
+                yield dict(zip(columns, row))
+
+
+# First Oracle Database release that executes pipelined operations in one round trip
+PIPELINING_MIN_DB_VERSION = 23
+
+_pipelining_supported: Optional[bool] = None
+
+
+def pipelining_supported() -> bool:
+    """Check (once) whether the driver and database support pipelining."""
+    global _pipelining_supported
+    if _pipelining_supported is None:
+        if not hasattr(oracledb, 'create_pipeline'):
+            _pipelining_supported = False
+        else:
+            with get_db_connection() as connection:
+                major = int(connection.version.split('.')[0])
+            _pipelining_supported = major >= PIPELINING_MIN_DB_VERSION
+    return _pipelining_supported
+
+
+def merge_batch_params(queries: Dict[str, tuple]) -> dict:
     """
+    Merge the bind parameters of batched queries into one dictionary.
+
+    Queries may share a bind name only if they bind the same value.
+    """
+    merged = {}
+    for name, (query, params) in queries.items():
+        for key, value in (params or {}).items():
+            if key in merged and merged[key] != value:
+                raise ValueError(
+                    f"Parametr :{key} ma różne wartości w zapytaniach wsadowych ({name})"
+                )
+            merged[key] = value
+    return merged
+
+
+def execute_query_batch(queries: Dict[str, tuple]) -> Dict[str, list[dict]]:
+    """
+    Execute several independent SELECT queries in one round trip.
+
+    Uses python-oracledb pipelining (on the async pool) when the database
+    supports it, otherwise a single PL/SQL block that opens one REF CURSOR
+    per query. QUERY_BATCH_MODE can force either path.
+
+    Args:
+        queries: Map of result name to (query, params) tuples
+
+    Returns:
+        Map of result name to rows as in execute_query_dict
+
+    Usage:
+        results = execute_query_batch({
+            'portfolios': (Queries.GET_PORTFOLIOS_BY_USER, {'user_id': user_id}),
+            'date_range': (Queries.GET_DATE_RANGE, None),
+        })
+    """
+    if not queries:
+        return {}
+
+    use_pipeline = QUERY_BATCH_MODE == 'pipeline' or (
+        QUERY_BATCH_MODE == 'auto' and pipelining_supported()
+    )
+    if use_pipeline:
+        from .connection_async import run_async, execute_query_batch_async
+        return run_async(execute_query_batch_async(queries))
+    return _execute_query_batch_plsql(queries)
+
+
+def _execute_query_batch_plsql(queries: Dict[str, tuple]) -> Dict[str, list[dict]]:
+    """Execute batched queries as one PL/SQL block returning REF CURSORs."""
+    names = list(queries)
+    params = merge_batch_params(queries)
+    block = "BEGIN\n" + "".join(
+        f"    OPEN :batch_cursor_{i} FOR {queries[name][0].strip().rstrip(';')};\n"
+        for i, name in enumerate(names)
+    ) + "END;"
+
     with get_db_connection() as connection:
+        cursor = connection.cursor()
+        ref_cursors = []
+        try:
+            for i in range(len(names)):
+                # Prefetching lets the rows come back with the block's round trip
+                ref_cursor = connection.cursor()
+                ref_cursor.prefetchrows = FETCH_ARRAYSIZE
+                ref_cursor.arraysize = FETCH_ARRAYSIZE
+                ref_cursors.append(ref_cursor)
+                params[f"batch_cursor_{i}"] = ref_cursor
+
+            with instrument('BATCH: ' + ','.join(names), params):
+                cursor.execute(block, params)
+
+            results = {}
+            for name, ref_cursor in zip(names, ref_cursors):
+                with instrument(queries[name][0], queries[name][1]) as probe:
+                    probe.start_fetch()
+                    columns = [col[0].lower() for col in ref_cursor.description]
+                    results[name] = [dict(zip(columns, row)) for row in ref_cursor.fetchall()]
+                    probe.rows = len(results[name])
+            return results
+        finally:
+            for ref_cursor in ref_cursors:
+                ref_cursor.close()
+            cursor.close()
+
+
+def _numeric_column(values: list) -> np.ndarray:
+    """Build an int64 array for whole-number columns without NULLs, float64 otherwise."""
+    if values and all(type(v) is int for v in values):
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=np.float64)
+
+
+def execute_query_frame(query: str, params: dict = None,
+                        arraysize: int = FETCH_ARRAYSIZE,
+                        fixed_point: bool = False) -> pd.DataFrame:
+    """
+    Execute a SELECT query and return results as a pandas DataFrame.
+
+    Uses the driver's Arrow DataFrame fetch when python-oracledb and pyarrow
+    support it. Otherwise column arrays are built directly from cursor
+    batches, without creating a dictionary per row. Numeric columns are
+    float64 (int64 when every value is a whole number) and column names are
+    lowercase, as in execute_query_dict.
+
+    Args:
+        query: SQL SELECT query
+        params: Optional dictionary of bind parameters
+        arraysize: Number of rows fetched per round trip
+        fixed_point: Fetch NUMBER columns with decimal places as nullable
+            Int64 in units of 10**-scale (see fixed_point_output_handler);
+            the scale of each such column is stored in df.attrs['scale']
+
+    Returns:
+        DataFrame with one column per selected column
+    """
+    with get_db_connection() as connection, instrument(query, params) as probe:
+        if not fixed_point and pyarrow is not None and hasattr(connection, 'fetch_df_all'):
+            odf = connection.fetch_df_all(query, params or {}, arraysize=arraysize)
+            df = pyarrow.table(odf).to_pandas()
+            df.columns = [name.lower() for name in df.columns]
+            probe.rows = len(df)
+            return df
+
         cursor = connection.cursor()
         try:
+            cursor.arraysize = arraysize
+            cursor.prefetchrows = arraysize
+            if fixed_point:
+                cursor.outputtypehandler = fixed_point_output_handler
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
+            probe.start_fetch()
+
+            description = cursor.description
+            columns = [[] for _ in description]
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for column, values in zip(columns, zip(*rows)):
+                    column.extend(values)
+            probe.rows = len(columns[0]) if columns else 0
+        finally:
+            cursor.close()
+
+    data = {}
+    scales = {}
+    for col, values in zip(description, columns):
+        if fixed_point and col.type_code is oracledb.DB_TYPE_NUMBER and (col.scale or 0) > 0:
+            data[col.name.lower()] = pd.array(values, dtype='Int64')
+            scales[col.name.lower()] = col.scale
+        elif col[1] in NUMERIC_DB_TYPES:
+            data[col[0].lower()] = _numeric_column(values)
+        else:
+            data[col[0].lower()] = values
+    df = pd.DataFrame(data)
+    if fixed_point:
+        df.attrs['scale'] = scales
+    return df
+
+
+def execute_dml(query: str, params: dict = None, commit: bool = True) -> int:
+    """
+    Execute a DML statement (INSERT, UPDATE, DELETE).
+
+    Args:
+        query: SQL DML statement
+        params: Optional dictionary of bind parameters
+        commit: Whether to commit the transaction (inside unit_of_work()
+            the unit commits instead)
+
+    Returns:
+        Number of affected rows
+    """
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            with instrument(query, params) as probe:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                probe.rows = cursor.rowcount
             rowcount = cursor.rowcount
-            if commit:
+            if commit and current_unit_of_work() is None:
                 connection.commit()
             return rowcount
         except Exception:
-            connection.rollback()
+            if current_unit_of_work() is None:
+                connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def execute_many(query: str, rows: list, batch_size: int = DML_BATCH_SIZE,
+                 batcherrors: bool = True) -> Tuple[int, List[Dict]]:
+    """
+    Execute a DML statement for many rows using array binding.
+
+    Rows are sent in batches of batch_size with one executemany() round
+    trip and one commit per batch (a single commit inside unit_of_work()).
+    With batcherrors, rows rejected by the database (e.g. unique
+    constraint violations) are reported instead of failing the whole
+    batch.
+
+    Args:
+        query: SQL DML statement
+        rows: List of dicts (named binds) or sequences (positional binds)
+        batch_size: Number of rows per round trip
+        batcherrors: Whether to collect per-row errors instead of raising
+
+    Returns:
+        Tuple of (affected_rows, errors). Each error is a dict with
+        row (index into rows), code (ORA error number) and message.
+    """
+    affected = 0
+    errors = []
+    if not rows:
+        return affected, errors
+
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                with instrument(query, batch[0]) as probe:
+                    cursor.executemany(query, batch, batcherrors=batcherrors)
+                    probe.rows = cursor.rowcount
+                affected += cursor.rowcount
+                if batcherrors:
+                    for error in cursor.getbatcherrors():
+                        errors.append({
+                            'row': start + error.offset,
+                            'code': error.code,
+                            'message': error.message,
+                        })
+                if current_unit_of_work() is None:
+                    connection.commit()
+            return affected, errors
+        except Exception:
+            if current_unit_of_work() is None:
+                connection.rollback()
             raise
         finally:
             cursor.close()
@@ -218,14 +827,17 @@ def call_procedure(proc_name: str, params: list = None) -> list:
     with get_db_connection() as connection:
         cursor = connection.cursor()
         try:
-            if params:
-                cursor.callproc(proc_name, params)
-            else:
-                cursor.callproc(proc_name)
-            connection.commit()
+            with instrument(proc_name, params):
+                if params:
+                    cursor.callproc(proc_name, params)
+                else:
+                    cursor.callproc(proc_name)
+            if current_unit_of_work() is None:
+                connection.commit()
             return params
         except Exception:
-            connection.rollback()
+            if current_unit_of_work() is None:
+                connection.rollback()
             raise
         finally:
             cursor.close()
@@ -243,7 +855,7 @@ def call_function(func_name: str, return_type, params: list = None):
     Returns:
         Function return value
     """
-    with get_db_cursor() as cursor:
+    with get_db_cursor() as cursor, instrument(func_name, params):
         if params:
             return cursor.callfunc(func_name, return_type, params)
         else:
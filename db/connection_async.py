@@ -0,0 +1,352 @@
+"""
+Asyncio twin of db.connection built on python-oracledb's async pool.
+
+Coroutines in this module use one AsyncConnectionPool that belongs to a
+single event loop. Synchronous code (Streamlit pages) should run them with
+run_async(), which keeps that loop alive in a background thread between
+reruns.
+"""
+
+import oracledb
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncGenerator, Dict, Awaitable, List
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path for config import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DB_CONFIG, POOL_CONFIG, get_connection_string
+from .connection import (
+    PoolStats, POOL_GETMODES, POOL_TIMEOUT_ERROR, float_output_handler, merge_batch_params
+)
+from .instrumentation import instrument
+from .records import Record, record_type
+
+
+class AsyncConnectionPool:
+    """Singleton asyncio connection pool for Oracle database."""
+
+    _instance: Optional['AsyncConnectionPool'] = None
+    _pool: Optional[oracledb.AsyncConnectionPool] = None
+    _stats: Optional[PoolStats] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._stats = PoolStats()
+        return cls._instance
+
+    def initialize(self, min_connections: int = None, max_connections: int = None):
+        """
+        Initialize the async connection pool.
+
+        Uses the same POOL_CONFIG settings as the synchronous pool.
+        """
+        if self._pool is None:
+            getmode = POOL_CONFIG['getmode']
+            if getmode not in POOL_GETMODES:
+                raise ValueError(f"Nieznany tryb pobierania połączeń: {getmode}")
+
+            params = {
+                'min': min_connections if min_connections is not None else POOL_CONFIG['min'],
+                'max': max_connections if max_connections is not None else POOL_CONFIG['max'],
+                'increment': POOL_CONFIG['increment'],
+                'timeout': POOL_CONFIG['timeout'],
+                'getmode': POOL_GETMODES[getmode],
+                'ping_interval': POOL_CONFIG['ping_interval'],
+            }
+            if getmode == 'TIMEDWAIT':
+                params['wait_timeout'] = POOL_CONFIG['wait_timeout']
+
+            try:
+                self._pool = oracledb.create_pool_async(
+                    user=DB_CONFIG['user'],
+                    password=DB_CONFIG['password'],
+                    dsn=get_connection_string(),
+                    **params
+                )
+            except oracledb.Error as e:
+                raise ConnectionError(f"Nie można utworzyć puli połączeń: {e}")
+
+    async def get_connection(self) -> oracledb.AsyncConnection:
+        """Get a connection from the pool."""
+        if self._pool is None:
+            self.initialize()
+
+        start = time.perf_counter()
+        try:
+            connection = await self._pool.acquire()
+        except oracledb.Error as e:
+            error_obj = e.args[0] if e.args else None
+            timed_out = getattr(error_obj, 'full_code', None) == POOL_TIMEOUT_ERROR
+            self._stats.record_failure(timed_out)
+            raise
+        self._stats.record_acquire((time.perf_counter() - start) * 1000)
+        connection.outputtypehandler = float_output_handler
+        return connection
+
+    async def release_connection(self, connection: oracledb.AsyncConnection):
+        """Release a connection back to the pool."""
+        if self._pool is not None and connection is not None:
+            await self._pool.release(connection)
+            self._stats.record_release()
+
+    def get_stats(self) -> Dict:
+        """Get pool statistics (same keys as ConnectionPool.get_stats)."""
+        stats = self._stats.snapshot()
+        stats['configured'] = dict(POOL_CONFIG)
+        stats['initialized'] = self._pool is not None
+        if self._pool is not None:
+            stats['opened'] = self._pool.opened
+            stats['busy'] = self._pool.busy
+        else:
+            stats['opened'] = None
+            stats['busy'] = None
+        return stats
+
+    async def close(self):
+        """Close the connection pool."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+# Global async pool instance
+_async_pool = AsyncConnectionPool()
+
+# Event loop owning the async pool, started on first run_async()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Get the background event loop, starting its thread if needed."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name='oracledb-async', daemon=True)
+            thread.start()
+        return _loop
+
+
+def run_async(*coros: Awaitable):
+    """
+    Run coroutines on the async pool's event loop and wait for the results.
+
+    A single coroutine returns its result; several are run concurrently
+    with asyncio.gather and return a list of results in the same order.
+
+    Usage:
+        value, positions = run_async(
+            PortfolioService.get_portfolio_value_async(portfolio_id),
+            PortfolioService.get_positions_async(portfolio_id),
+        )
+    """
+    if len(coros) == 1:
+        main = coros[0]
+    else:
+        async def main_gather():
+            return list(await asyncio.gather(*coros))
+        main = main_gather()
+    return asyncio.run_coroutine_threadsafe(main, _get_loop()).result()
+
+
+def get_async_pool_stats() -> Dict:
+    """Get async connection pool statistics."""
+    return _async_pool.get_stats()
+
+
+@asynccontextmanager
+async def get_db_connection_async() -> AsyncGenerator[oracledb.AsyncConnection, None]:
+    """
+    Async context manager for database connections.
+    Automatically acquires and releases connections from the async pool.
+
+    Usage:
+        async with get_db_connection_async() as conn:
+            cursor = conn.cursor()
+            await cursor.execute("SELECT * FROM table")
+    """
+    connection = None
+    try:
+        connection = await _async_pool.get_connection()
+        yield connection
+    finally:
+        if connection is not None:
+            await _async_pool.release_connection(connection)
+
+
+@asynccontextmanager
+async def get_db_cursor_async() -> AsyncGenerator[oracledb.AsyncCursor, None]:
+    """
+    Async context manager for database cursors.
+    Automatically manages connection and cursor lifecycle.
+    """
+    async with get_db_connection_async() as connection:
+        cursor = connection.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+
+async def execute_query_async(query: str, params: dict = None) -> list:
+    """
+    Execute a SELECT query and return results.
+
+    Args:
+        query: SQL SELECT query
+        params: Optional dictionary of bind parameters
+
+    Returns:
+        List of tuples with query results
+    """
+    async with get_db_cursor_async() as cursor:
+        with instrument(query, params) as probe:
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+            probe.start_fetch()
+            results = await cursor.fetchall()
+            probe.rows = len(results)
+            return results
+
+
+async def execute_query_dict_async(query: str, params: dict = None) -> list[dict]:
+    """
+    Execute a SELECT query and return results as list of dictionaries.
+
+    Args:
+        query: SQL SELECT query
+        params: Optional dictionary of bind parameters
+
+    Returns:
+        List of dictionaries with column names as keys
+    """
+    async with get_db_cursor_async() as cursor:
+        with instrument(query, params) as probe:
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+            probe.start_fetch()
+            columns = [col[0].lower() for col in cursor.description]
+            rows = await cursor.fetchall()
+            probe.rows = len(rows)
+            return [dict(zip(columns, row)) for row in rows]
+
+
+async def execute_query_records_async(query: str, params: dict = None, float_fields: tuple = (),
+                                      extra_fields: tuple = ()) -> List[Record]:
+    """
+    Execute a SELECT query and return results as typed records.
+
+    Args:
+        query: SQL SELECT query
+        params: Optional dictionary of bind parameters
+        float_fields: Columns returned as float (NULL becomes 0.0)
+        extra_fields: Additional fields the caller fills in later
+
+    Returns:
+        List of records (see db.records) with column names as fields
+    """
+    async with get_db_cursor_async() as cursor:
+        with instrument(query, params) as probe:
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+            probe.start_fetch()
+            columns = tuple(col[0].lower() for col in cursor.description)
+            cursor.rowfactory = record_type(columns, tuple(float_fields), tuple(extra_fields))
+            results = await cursor.fetchall()
+            probe.rows = len(results)
+            return results
+
+
+async def call_procedure_async(proc_name: str, params: list = None,
+                               out_types: list = None) -> list:
+    """
+    Call a stored procedure.
+
+    OUT parameters cannot be created before a cursor exists, so they are
+    given as types (e.g. [oracledb.STRING]) and appended after params.
+
+    Args:
+        proc_name: Name of the procedure (e.g., 'pkg_gielda.procedure_name')
+        params: List of input parameters
+        out_types: Oracle types of trailing OUT parameters
+
+    Returns:
+        List of output parameter values, in out_types order
+    """
+    async with get_db_connection_async() as connection:
+        cursor = connection.cursor()
+        try:
+            out_vars = [cursor.var(out_type) for out_type in (out_types or [])]
+            args = list(params or []) + out_vars
+            with instrument(proc_name, args):
+                if args:
+                    await cursor.callproc(proc_name, args)
+                else:
+                    await cursor.callproc(proc_name)
+            await connection.commit()
+            return [var.getvalue() for var in out_vars]
+        except Exception:
+            await connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+async def call_function_async(func_name: str, return_type, params: list = None):
+    """
+    Call a stored function.
+
+    Args:
+        func_name: Name of the function (e.g., 'pkg_gielda.function_name')
+        return_type: Oracle type for return value (e.g., oracledb.NUMBER)
+        params: List of input parameters
+
+    Returns:
+        Function return value
+    """
+    async with get_db_cursor_async() as cursor:
+        with instrument(func_name, params):
+            if params:
+                return await cursor.callfunc(func_name, return_type, params)
+            else:
+                return await cursor.callfunc(func_name, return_type)
+
+
+async def execute_query_batch_async(queries: Dict[str, tuple]) -> Dict[str, list[dict]]:
+    """
+    Execute several independent SELECT queries in one pipelined round trip.
+
+    Args:
+        queries: Map of result name to (query, params) tuples
+
+    Returns:
+        Map of result name to rows as in execute_query_dict_async
+    """
+    merge_batch_params(queries)  # same bind rules as the PL/SQL fallback
+    names = list(queries)
+    pipeline = oracledb.create_pipeline()
+    for name in names:
+        query, params = queries[name]
+        pipeline.add_fetchall(query, params or None)
+
+    async with get_db_connection_async() as connection:
+        with instrument('PIPELINE: ' + ','.join(names)):
+            op_results = await connection.run_pipeline(pipeline)
+
+    results = {}
+    for name, op_result in zip(names, op_results):
+        columns = [col.name.lower() for col in op_result.columns]
+        results[name] = [dict(zip(columns, row)) for row in op_result.rows]
+    return results
@@ -0,0 +1,251 @@
+"""
+Per-statement latency instrumentation for the database helpers.
+
+Every instrumented call records the statement name, bind shape, rows
+returned, fetch time and total time into the process-wide QueryStats
+store. Calls slower than the configured threshold also go to a rotating
+slow-query log.
+"""
+
+from contextlib import contextmanager
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Optional, Generator, Dict, List
+import logging
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import QUERY_STATS_CONFIG, QUERY_LATENCY_BUCKETS_MS
+from .queries import Queries
+
+
+# Length of the SQL prefix used to name statements not defined in Queries
+INLINE_NAME_LENGTH = 60
+
+
+def _normalize_sql(sql: str) -> str:
+    """Collapse whitespace so formatting differences do not matter."""
+    return ' '.join(sql.split())
+
+
+# Normalized SQL text of every Queries constant -> constant name
+_QUERY_NAMES = {
+    _normalize_sql(value): name
+    for name, value in vars(Queries).items()
+    if name.isupper() and isinstance(value, str)
+}
+
+
+@lru_cache(maxsize=512)
+def statement_name(statement: str) -> str:
+    """
+    Get a readable name for a statement.
+
+    Queries constants are reported by their attribute name (e.g.
+    'GET_POSITIONS_BY_PORTFOLIO'), procedure and function names as given
+    and any other SQL by its first characters.
+    """
+    normalized = _normalize_sql(statement)
+    if normalized in _QUERY_NAMES:
+        return _QUERY_NAMES[normalized]
+    if ' ' not in normalized:
+        return normalized
+    if len(normalized) > INLINE_NAME_LENGTH:
+        return normalized[:INLINE_NAME_LENGTH] + '...'
+    return normalized
+
+
+def bind_shape(params) -> str:
+    """
+    Describe bind parameters by name/position and type, never by value.
+
+    E.g. {'portfolio_id': 1} -> 'portfolio_id:int' and [1, 'x'] -> 'int,str'.
+    """
+    if not params:
+        return ''
+    if isinstance(params, dict):
+        return ','.join(f"{key}:{type(value).__name__}" for key, value in sorted(params.items()))
+    return ','.join(type(value).__name__ for value in params)
+
+
+class QueryStats:
+    """Thread-safe latency statistics per statement and bind shape."""
+
+    def __init__(self, buckets_ms: list = None):
+        self._lock = threading.Lock()
+        self.buckets_ms = list(buckets_ms or QUERY_LATENCY_BUCKETS_MS)
+        self.reset()
+
+    def reset(self):
+        """Reset all statistics."""
+        with self._lock:
+            self._entries: Dict[tuple, Dict] = {}
+
+    def record(self, name: str, shape: str, rows: Optional[int],
+               fetch_ms: float, total_ms: float, failed: bool = False):
+        """Record one execution of a statement."""
+        with self._lock:
+            entry = self._entries.get((name, shape))
+            if entry is None:
+                entry = {
+                    'calls': 0, 'errors': 0, 'rows': 0,
+                    'total_ms': 0.0, 'fetch_ms': 0.0, 'max_ms': 0.0,
+                    # One extra bucket for times above the last boundary
+                    'histogram': [0] * (len(self.buckets_ms) + 1),
+                }
+                self._entries[(name, shape)] = entry
+
+            entry['calls'] += 1
+            if failed:
+                entry['errors'] += 1
+            entry['rows'] += rows or 0
+            entry['total_ms'] += total_ms
+            entry['fetch_ms'] += fetch_ms
+            entry['max_ms'] = max(entry['max_ms'], total_ms)
+
+            index = len(self.buckets_ms)
+            for i, bound in enumerate(self.buckets_ms):
+                if total_ms <= bound:
+                    index = i
+                    break
+            entry['histogram'][index] += 1
+
+    def snapshot(self) -> List[Dict]:
+        """
+        Return statistics as a list of dicts, slowest total time first.
+
+        Each dict has: statement, binds, calls, errors, rows, total_ms,
+        avg_ms, max_ms, fetch_ms and histogram (bucket label -> count).
+        """
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in self.buckets_ms]
+            labels.append(f">{self.buckets_ms[-1]}ms" if self.buckets_ms else "all")
+            result = [
+                {
+                    'statement': name,
+                    'binds': shape,
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'rows': entry['rows'],
+                    'total_ms': round(entry['total_ms'], 3),
+                    'avg_ms': round(entry['total_ms'] / entry['calls'], 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                    'fetch_ms': round(entry['fetch_ms'], 3),
+                    'histogram': dict(zip(labels, entry['histogram'])),
+                }
+                for (name, shape), entry in self._entries.items()
+            ]
+        result.sort(key=lambda item: item['total_ms'], reverse=True)
+        return result
+
+
+class QueryProbe:
+    """Timing of a single statement, filled in by the instrumented helper."""
+
+    def __init__(self, name: str, shape: str):
+        self.name = name
+        self.shape = shape
+        self.rows: Optional[int] = None
+        self.started = time.perf_counter()
+        self.fetch_started: Optional[float] = None
+
+    def start_fetch(self):
+        """Mark the end of execute() and the start of fetching rows."""
+        self.fetch_started = time.perf_counter()
+
+
+# Process-wide statistics store
+_query_stats = QueryStats()
+
+_slow_log: Optional[logging.Logger] = None
+_slow_log_lock = threading.Lock()
+
+
+def _get_slow_log() -> logging.Logger:
+    """Get the slow-query logger, creating its rotating file on first use."""
+    global _slow_log
+    with _slow_log_lock:
+        if _slow_log is None:
+            logger = logging.getLogger('gielda.slow_queries')
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False
+            if not logger.handlers:
+                log_file = QUERY_STATS_CONFIG['slow_log_file']
+                log_dir = os.path.dirname(log_file)
+                if log_dir:
+                    os.makedirs(log_dir, exist_ok=True)
+                handler = RotatingFileHandler(
+                    log_file,
+                    maxBytes=QUERY_STATS_CONFIG['slow_log_max_bytes'],
+                    backupCount=QUERY_STATS_CONFIG['slow_log_backup_count'],
+                    encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+            _slow_log = logger
+        return _slow_log
+
+
+def _finish(probe: QueryProbe, failed: bool):
+    """Record a finished probe and log it if it was slow."""
+    end = time.perf_counter()
+    total_ms = (end - probe.started) * 1000
+    fetch_ms = (end - probe.fetch_started) * 1000 if probe.fetch_started is not None else 0.0
+    _query_stats.record(probe.name, probe.shape, probe.rows, fetch_ms, total_ms, failed)
+
+    if total_ms >= QUERY_STATS_CONFIG['slow_threshold_ms']:
+        try:
+            _get_slow_log().warning(
+                "%.1f ms | %s | binds: %s | rows: %s | fetch: %.1f ms%s",
+                total_ms, probe.name, probe.shape or '-',
+                probe.rows if probe.rows is not None else '-', fetch_ms,
+                ' | BŁĄD' if failed else ''
+            )
+        except OSError:
+            # The log is diagnostic only; never fail the query because of it
+            pass
+
+
+@contextmanager
+def instrument(statement: str, params=None) -> Generator[QueryProbe, None, None]:
+    """
+    Time a statement executed inside the block.
+
+    The helper calls probe.start_fetch() after execute() and sets
+    probe.rows when it knows the row count.
+
+    Usage:
+        with instrument(query, params) as probe:
+            cursor.execute(query, params)
+            probe.start_fetch()
+            rows = cursor.fetchall()
+            probe.rows = len(rows)
+    """
+    if not QUERY_STATS_CONFIG['enabled']:
+        yield QueryProbe(statement, '')
+        return
+
+    probe = QueryProbe(statement_name(statement), bind_shape(params))
+    try:
+        yield probe
+    except GeneratorExit:
+        # A streaming helper closed before its last row: record what was fetched
+        _finish(probe, failed=False)
+        raise
+    except Exception:
+        _finish(probe, failed=True)
+        raise
+    _finish(probe, failed=False)
+
+
+def get_query_stats() -> List[Dict]:
+    """Get per-statement latency statistics (see QueryStats.snapshot)."""
+    return _query_stats.snapshot()
+
+
+def reset_query_stats():
+    """Reset collected per-statement statistics."""
+    _query_stats.reset()
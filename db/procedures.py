@@ -4,9 +4,10 @@ Handles error translation to Polish user-friendly messages.
 """
 
 import oracledb
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Dict
 from datetime import date, datetime
-from .connection import get_db_connection, get_db_cursor, call_function
+from .connection import get_db_connection, get_db_cursor, call_function, current_unit_of_work, unit_of_work
+from .instrumentation import instrument
 
 
 # Error code to Polish message mapping
@@ -50,6 +51,28 @@ def parse_result(result: str) -> Tuple[bool, str]:
         return False, result
 
 
+def callproc(cursor: oracledb.Cursor, proc_name: str, params: list,
+             keyword_parameters: dict = None):
+    """Call a procedure on an open cursor, recording its latency."""
+    with instrument(proc_name, params):
+        if keyword_parameters:
+            cursor.callproc(proc_name, params, keyword_parameters)
+        else:
+            cursor.callproc(proc_name, params)
+
+
+def commit_mode() -> dict:
+    """
+    Keyword parameters telling a committing procedure who commits.
+
+    Inside unit_of_work() the procedure is called with p_zatwierdz => FALSE
+    so the unit commits once; otherwise the procedure commits itself.
+    """
+    if current_unit_of_work() is not None:
+        return {'p_zatwierdz': False}
+    return {}
+
+
 class Procedures:
     """Wrapper class for Oracle PL/SQL procedures."""
 
@@ -72,7 +95,7 @@ class Procedures:
                 user_id = cursor.var(oracledb.NUMBER)
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda_ext.utworz_uzytkownika', [
+                callproc(cursor, 'pkg_gielda_ext.utworz_uzytkownika', [
                     login, password, email, first_name, last_name,
                     user_id, result
                 ])
@@ -120,7 +143,7 @@ class Procedures:
                 portfolio_id = cursor.var(oracledb.NUMBER)
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda_ext.utworz_portfel', [
+                callproc(cursor, 'pkg_gielda_ext.utworz_portfel', [
                     user_id, name, currency, initial_balance,
                     portfolio_id, result
                 ])
@@ -144,7 +167,7 @@ class Procedures:
                 cursor = conn.cursor()
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda.wplac_srodki', [
+                callproc(cursor, 'pkg_gielda.wplac_srodki', [
                     portfolio_id, amount, result
                 ])
 
@@ -166,7 +189,7 @@ class Procedures:
                 cursor = conn.cursor()
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda_ext.wyplac_srodki', [
+                callproc(cursor, 'pkg_gielda_ext.wyplac_srodki', [
                     portfolio_id, amount, result
                 ])
 
@@ -186,12 +209,58 @@ class Procedures:
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.callproc('pkg_gielda.aktualizuj_pozycje_portfela', [portfolio_id])
+                callproc(cursor, 'pkg_gielda.aktualizuj_pozycje_portfela', [portfolio_id])
                 return True, "Pozycje zaktualizowane"
 
         except oracledb.Error as e:
             return False, translate_oracle_error(e)
 
+    @staticmethod
+    def update_all_portfolios(since: Optional[date] = None) -> Tuple[bool, str]:
+        """
+        Update positions in every portfolio with current prices (one MERGE)
+        and their daily snapshots.
+
+        Args:
+            since: First trading day whose snapshots are recalculated
+                (e.g. the first day of newly loaded prices; None = all days)
+
+        Returns:
+            Tuple of (success, message)
+        """
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                callproc(cursor, 'pkg_gielda.aktualizuj_wszystkie_portfele', [since])
+                return True, "Pozycje we wszystkich portfelach zaktualizowane"
+
+        except oracledb.Error as e:
+            return False, translate_oracle_error(e)
+
+    @staticmethod
+    def refresh_portfolio_snapshots(portfolio_id: int, since: Optional[date] = None) -> Tuple[bool, str]:
+        """
+        Recalculate a portfolio's daily snapshots.
+
+        Trades refresh their own snapshots; batch jobs that execute them
+        with p_odswiez_migawki = FALSE refresh once from their earliest
+        trade day.
+
+        Args:
+            since: First trading day whose snapshots are recalculated (None = all days)
+
+        Returns:
+            Tuple of (success, message)
+        """
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                callproc(cursor, 'pkg_gielda.odswiez_migawki_portfeli', [portfolio_id, since])
+                return True, "Migawki portfela przeliczone"
+
+        except oracledb.Error as e:
+            return False, translate_oracle_error(e)
+
     @staticmethod
     def get_portfolio_value(portfolio_id: int) -> Optional[float]:
         """
@@ -258,11 +327,11 @@ class Procedures:
                 order_id = cursor.var(oracledb.NUMBER)
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda_ext.utworz_zlecenie', [
+                callproc(cursor, 'pkg_gielda_ext.utworz_zlecenie', [
                     portfolio_id, instrument_id, order_type, order_side,
                     quantity, limit_price, expiration_date, order_date,
                     order_id, result
-                ])
+                ], commit_mode())
 
                 success, message = parse_result(result.getvalue())
                 return success, message, int(order_id.getvalue()) if order_id.getvalue() else None
@@ -286,9 +355,9 @@ class Procedures:
                 cursor = conn.cursor()
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda.wykonaj_zlecenie_kupna', [
+                callproc(cursor, 'pkg_gielda.wykonaj_zlecenie_kupna', [
                     order_id, execution_price, execution_date, result
-                ])
+                ], commit_mode())
 
                 return parse_result(result.getvalue())
 
@@ -311,9 +380,9 @@ class Procedures:
                 cursor = conn.cursor()
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda.wykonaj_zlecenie_sprzedazy', [
+                callproc(cursor, 'pkg_gielda.wykonaj_zlecenie_sprzedazy', [
                     order_id, execution_price, execution_date, result
-                ])
+                ], commit_mode())
 
                 return parse_result(result.getvalue())
 
@@ -333,9 +402,9 @@ class Procedures:
                 cursor = conn.cursor()
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda_ext.anuluj_zlecenie', [
+                callproc(cursor, 'pkg_gielda_ext.anuluj_zlecenie', [
                     order_id, result
-                ])
+                ], commit_mode())
 
                 return parse_result(result.getvalue())
 
@@ -355,15 +424,99 @@ class Procedures:
                 cursor = conn.cursor()
                 result = cursor.var(oracledb.STRING, 500)
 
-                cursor.callproc('pkg_gielda_ext.przetworz_zlecenia_limit', [
+                callproc(cursor, 'pkg_gielda_ext.przetworz_zlecenia_limit', [
                     portfolio_id, simulation_date, result
-                ])
+                ], commit_mode())
 
                 return parse_result(result.getvalue())
 
         except oracledb.Error as e:
             return False, translate_oracle_error(e)
 
+    @staticmethod
+    def process_limit_orders_range(portfolio_id: int, start_date: date,
+                                   end_date: date) -> Tuple[bool, str, List[Dict]]:
+        """
+        Process a portfolio's pending limit orders for trading days in (start_date, end_date].
+
+        A thin wrapper over the matching job: each order is filled on its
+        first trading day whose close meets the limit.
+
+        Returns:
+            Tuple of (success, message, executed orders with order_id,
+            portfolio_id, strona_zlecenia, symbol, ilosc, cena_jednostkowa,
+            data_transakcji)
+        """
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                result = cursor.var(oracledb.STRING, 500)
+                executed = conn.cursor()
+
+                callproc(cursor, 'pkg_gielda_ext.przetworz_zlecenia_limit_zakres', [
+                    portfolio_id, start_date, end_date, result, executed
+                ], commit_mode())
+
+                success, message = parse_result(result.getvalue())
+                if not success:
+                    return False, message, []
+
+                columns = [col[0].lower() for col in executed.description]
+                return True, message, [dict(zip(columns, row)) for row in executed]
+
+        except oracledb.Error as e:
+            return False, translate_oracle_error(e), []
+
+    @staticmethod
+    def match_limit_orders(since: Optional[date] = None, until: Optional[date] = None,
+                           portfolio_id: Optional[int] = None) -> Tuple[bool, str, Dict, List[Dict]]:
+        """
+        Match pending limit orders against the bars of trading days in [since, until].
+
+        Each order is filled on its first trading day (not before the day it
+        was placed) whose close meets the limit, in chronological order.
+
+        Args:
+            since: First trading day (None = only `until`)
+            until: Last trading day (None = last trading day in the calendar)
+            portfolio_id: Match only this portfolio's orders (None = all portfolios)
+
+        Returns:
+            Tuple of (success, message, stats with sprawdzone, spelnione,
+            wykonane, odrzucone, czas_wyboru_ms, czas_realizacji_ms, executed
+            orders with order_id, portfolio_id, strona_zlecenia, symbol, ilosc,
+            cena_jednostkowa, data_transakcji)
+        """
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                counters = [cursor.var(oracledb.NUMBER) for _ in range(5)]
+                result = cursor.var(oracledb.STRING, 500)
+                executed = conn.cursor()
+
+                callproc(cursor, 'pkg_gielda_ext.kojarz_zlecenia_limit', [
+                    since, until, portfolio_id, *counters, result, executed
+                ], commit_mode())
+
+                success, message = parse_result(result.getvalue())
+                if not success:
+                    return False, message, {}, []
+                sprawdzone, spelnione, wykonane, czas_wyboru, czas_realizacji = (
+                    int(var.getvalue() or 0) for var in counters
+                )
+                columns = [col[0].lower() for col in executed.description]
+                return True, message, {
+                    'sprawdzone': sprawdzone,
+                    'spelnione': spelnione,
+                    'wykonane': wykonane,
+                    'odrzucone': spelnione - wykonane,
+                    'czas_wyboru_ms': czas_wyboru,
+                    'czas_realizacji_ms': czas_realizacji,
+                }, [dict(zip(columns, row)) for row in executed]
+
+        except oracledb.Error as e:
+            return False, translate_oracle_error(e), {}, []
+
     # =========================================
     # PRICE FUNCTIONS
     # =========================================
@@ -450,27 +603,41 @@ def create_and_execute_market_order(portfolio_id: int, instrument_id: int,
     """
     Create and immediately execute a market order.
 
+    Both steps run in one unit of work: one connection, one commit, and
+    no pending MARKET order is left behind if the execution fails.
+
     Args:
         order_date: Order creation date (simulation date)
 
     Returns:
         Tuple of (success, message)
     """
-    # Create the order
-    success, message, order_id = Procedures.create_order(
-        portfolio_id=portfolio_id,
-        instrument_id=instrument_id,
-        order_type='MARKET',
-        order_side=order_side,
-        quantity=quantity,
-        order_date=order_date
-    )
-
-    if not success or order_id is None:
-        return False, message
-
-    # Execute the order
-    if order_side == 'KUPNO':
-        return Procedures.execute_buy_order(order_id, price, order_date)
-    else:
-        return Procedures.execute_sell_order(order_id, price, order_date)
+    try:
+        with unit_of_work() as uow:
+            # Create the order
+            success, message, order_id = Procedures.create_order(
+                portfolio_id=portfolio_id,
+                instrument_id=instrument_id,
+                order_type='MARKET',
+                order_side=order_side,
+                quantity=quantity,
+                order_date=order_date
+            )
+
+            if not success or order_id is None:
+                uow.rollback()
+                return False, message
+
+            # Execute the order
+            if order_side == 'KUPNO':
+                success, message = Procedures.execute_buy_order(order_id, price, order_date)
+            else:
+                success, message = Procedures.execute_sell_order(order_id, price, order_date)
+
+            # The trade refreshes its snapshots itself; a failed refresh fails the trade
+            if not success:
+                uow.rollback()
+            return success, message
+
+    except oracledb.Error as e:
+        return False, translate_oracle_error(e)
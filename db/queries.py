@@ -63,6 +63,26 @@ class Queries:
                  p.waluta_portfela, p.data_utworzenia
     """
 
+    # Wartość portfela dla każdego dnia sesyjnego z zakresu (funkcja potokowa)
+    GET_PORTFOLIO_VALUES_FOR_RANGE = """
+        SELECT data_sesji, saldo_gotowkowe, wartosc_pozycji, wartosc_calkowita
+        FROM TABLE(pkg_gielda_ext.wartosci_portfela_w_zakresie(
+            :portfolio_id, :start_date, :end_date
+        ))
+        ORDER BY data_sesji
+    """
+
+    # Migawka portfela na dzień (ostatni dzień sesyjny nie późniejszy niż :target_date)
+    GET_PORTFOLIO_SNAPSHOT_FOR_DATE = """
+        SELECT data_sesji, saldo_gotowkowe, wartosc_pozycji, wartosc_zakupu,
+               zysk_strata as zysk_strata_pozycji, wartosc_calkowita, liczba_pozycji
+        FROM MIGAWKI_PORTFELI
+        WHERE portfolio_id = :portfolio_id
+          AND data_sesji <= :target_date
+        ORDER BY data_sesji DESC
+        FETCH FIRST 1 ROW ONLY
+    """
+
     # ===================
     # POSITION QUERIES
     # ===================
@@ -139,16 +159,12 @@ class Queries:
     # PRICE DATA QUERIES
     # ===================
 
+    # Najnowsze notowanie - odczyt po kluczu z NOTOWANIA_BIEZACE
     GET_LATEST_PRICE = """
         SELECT cena_zamkniecia, data_notowan, cena_otwarcia,
                cena_max, cena_min, wolumen
-        FROM DANE_DZIENNE
+        FROM NOTOWANIA_BIEZACE
         WHERE instrument_id = :instrument_id
-          AND data_notowan = (
-              SELECT MAX(data_notowan)
-              FROM DANE_DZIENNE
-              WHERE instrument_id = :instrument_id
-          )
     """
 
     GET_PRICE_FOR_DATE = """
@@ -186,15 +202,120 @@ class Queries:
         ORDER BY i.symbol
     """
 
-    GET_AVAILABLE_DATES = """
-        SELECT DISTINCT data_notowan
+    # Every active instrument with its last quote on or before :data_notowan
+    # (one index probe on uk_dane_dzienne per instrument) and the daily change
+    GET_INSTRUMENTS_WITH_PRICES = """
+        SELECT i.instrument_id, i.symbol, i.nazwa_pelna, i.exchange_id,
+               i.sector_id, i.typ_instrumentu, i.waluta_notowania, i.status,
+               g.kod_gieldy, g.nazwa_pelna as nazwa_gieldy,
+               s.kod_sektora, s.nazwa_sektora,
+               d.cena_zamkniecia, d.cena_otwarcia, d.cena_max, d.cena_min,
+               d.wolumen, d.data_notowan,
+               CASE
+                   WHEN d.cena_zamkniecia IS NULL THEN NULL
+                   WHEN NVL(d.cena_otwarcia, 0) = 0 OR d.cena_zamkniecia = 0 THEN 0
+                   ELSE d.cena_zamkniecia - d.cena_otwarcia
+               END as zmiana,
+               CASE
+                   WHEN d.cena_zamkniecia IS NULL THEN NULL
+                   WHEN NVL(d.cena_otwarcia, 0) <= 0 OR d.cena_zamkniecia = 0 THEN 0
+                   ELSE (d.cena_zamkniecia - d.cena_otwarcia) / d.cena_otwarcia * 100
+               END as zmiana_procent
+        FROM INSTRUMENTY i
+        LEFT JOIN GIELDY g ON i.exchange_id = g.exchange_id
+        LEFT JOIN SEKTORY s ON i.sector_id = s.sector_id
+        OUTER APPLY (
+            SELECT dd.cena_zamkniecia, dd.cena_otwarcia, dd.cena_max, dd.cena_min,
+                   dd.wolumen, dd.data_notowan
+            FROM DANE_DZIENNE dd
+            WHERE dd.instrument_id = i.instrument_id
+              AND dd.data_notowan <= :data_notowan
+            ORDER BY dd.data_notowan DESC
+            FETCH FIRST 1 ROW ONLY
+        ) d
+        WHERE i.status = 'AKTYWNY'
+        ORDER BY i.symbol
+    """
+
+    # Jak GET_INSTRUMENTS_WITH_PRICES, ale z najnowszymi notowaniami z NOTOWANIA_BIEZACE
+    GET_INSTRUMENTS_WITH_LATEST_PRICES = """
+        SELECT i.instrument_id, i.symbol, i.nazwa_pelna, i.exchange_id,
+               i.sector_id, i.typ_instrumentu, i.waluta_notowania, i.status,
+               g.kod_gieldy, g.nazwa_pelna as nazwa_gieldy,
+               s.kod_sektora, s.nazwa_sektora,
+               d.cena_zamkniecia, d.cena_otwarcia, d.cena_max, d.cena_min,
+               d.wolumen, d.data_notowan,
+               CASE
+                   WHEN d.cena_zamkniecia IS NULL THEN NULL
+                   WHEN NVL(d.cena_otwarcia, 0) = 0 OR d.cena_zamkniecia = 0 THEN 0
+                   ELSE d.cena_zamkniecia - d.cena_otwarcia
+               END as zmiana,
+               CASE
+                   WHEN d.cena_zamkniecia IS NULL THEN NULL
+                   WHEN NVL(d.cena_otwarcia, 0) <= 0 OR d.cena_zamkniecia = 0 THEN 0
+                   ELSE (d.cena_zamkniecia - d.cena_otwarcia) / d.cena_otwarcia * 100
+               END as zmiana_procent
+        FROM INSTRUMENTY i
+        LEFT JOIN GIELDY g ON i.exchange_id = g.exchange_id
+        LEFT JOIN SEKTORY s ON i.sector_id = s.sector_id
+        LEFT JOIN NOTOWANIA_BIEZACE d ON d.instrument_id = i.instrument_id
+        WHERE i.status = 'AKTYWNY'
+        ORDER BY i.symbol
+    """
+
+    # Last close on or before :data_notowan for a JSON array of instrument ids
+    GET_PRICES_FOR_DATE = """
+        SELECT ids.instrument_id, d.cena_zamkniecia
+        FROM JSON_TABLE(:instrument_ids, '$[*]'
+                        COLUMNS (instrument_id NUMBER PATH '$')) ids
+        CROSS APPLY (
+            SELECT dd.cena_zamkniecia
+            FROM DANE_DZIENNE dd
+            WHERE dd.instrument_id = ids.instrument_id
+              AND dd.data_notowan <= :data_notowan
+            ORDER BY dd.data_notowan DESC
+            FETCH FIRST 1 ROW ONLY
+        ) d
+    """
+
+    # Closes added after a given row (incremental price matrix refresh)
+    GET_CLOSES_SINCE = """
+        SELECT daily_data_id, instrument_id, data_notowan, cena_zamkniecia
         FROM DANE_DZIENNE
-        ORDER BY data_notowan DESC
+        WHERE daily_data_id > :last_id
     """
 
-    GET_DATE_RANGE = """
-        SELECT MIN(data_notowan) as min_date, MAX(data_notowan) as max_date
+    # Notowania OHLC dodane po :last_id (przyrostowe liczenie wskaźników technicznych)
+    GET_BARS_SINCE = """
+        SELECT daily_data_id, instrument_id, data_notowan,
+               cena_otwarcia, cena_max, cena_min, cena_zamkniecia
         FROM DANE_DZIENNE
+        WHERE daily_data_id > :last_id
+        ORDER BY instrument_id, data_notowan
+    """
+
+    # Zapytania kalendarzowe czytają KALENDARZ_SESJI (jeden wiersz na dzień sesyjny)
+    GET_AVAILABLE_DATES = """
+        SELECT data_sesji as data_notowan
+        FROM KALENDARZ_SESJI
+        ORDER BY data_sesji DESC
+    """
+
+    GET_DATE_RANGE = """
+        SELECT MIN(data_sesji) as min_date, MAX(data_sesji) as max_date
+        FROM KALENDARZ_SESJI
+    """
+
+    GET_NEXT_TRADING_DAY = """
+        SELECT MIN(data_sesji) as data_sesji
+        FROM KALENDARZ_SESJI
+        WHERE data_sesji > :data_sesji
+    """
+
+    GET_PREVIOUS_TRADING_DAY = """
+        SELECT MAX(data_sesji) as data_sesji
+        FROM KALENDARZ_SESJI
+        WHERE data_sesji < :data_sesji
     """
 
     # ===================
@@ -262,6 +383,40 @@ class Queries:
         ORDER BY t.data_transakcji DESC
     """
 
+    # Transakcje portfela w kolejności chronologicznej (odtwarzanie historii wartości)
+    GET_PORTFOLIO_TRANSACTION_FLOWS = """
+        SELECT t.transaction_id, TRUNC(t.data_transakcji) as data_transakcji,
+               z.instrument_id, t.typ_transakcji, t.ilosc,
+               t.wartosc_transakcji, NVL(t.prowizja, 0) as prowizja
+        FROM TRANSAKCJE t
+        JOIN ZLECENIA z ON t.order_id = z.order_id
+        WHERE z.portfolio_id = :portfolio_id
+        ORDER BY t.data_transakcji, t.transaction_id
+    """
+
+    # Transakcje portfela nowsze niż :last_id (dopisywanie do historii pozycji)
+    GET_PORTFOLIO_TRANSACTION_FLOWS_SINCE = """
+        SELECT t.transaction_id, TRUNC(t.data_transakcji) as data_transakcji,
+               z.instrument_id, t.typ_transakcji, t.ilosc,
+               t.wartosc_transakcji, NVL(t.prowizja, 0) as prowizja
+        FROM TRANSAKCJE t
+        JOIN ZLECENIA z ON t.order_id = z.order_id
+        WHERE z.portfolio_id = :portfolio_id
+          AND t.transaction_id > :last_id
+        ORDER BY t.data_transakcji, t.transaction_id
+    """
+
+    # Saldo i ostatnia transakcja portfela - zmieniają się po każdej operacji na portfelu
+    GET_PORTFOLIO_HISTORY_VERSION = """
+        SELECT p.saldo_gotowkowe,
+               (SELECT NVL(MAX(t.transaction_id), 0)
+                FROM TRANSAKCJE t
+                JOIN ZLECENIA z ON t.order_id = z.order_id
+                WHERE z.portfolio_id = p.portfolio_id) as ostatnia_transakcja
+        FROM PORTFELE p
+        WHERE p.portfolio_id = :portfolio_id
+    """
+
     GET_TRANSACTIONS_BY_DATE_RANGE = """
         SELECT t.transaction_id, t.order_id, t.typ_transakcji, t.ilosc,
                t.cena_jednostkowa, t.wartosc_transakcji, t.prowizja,
@@ -341,9 +496,9 @@ class Queries:
     # ===================
 
     GET_TRADING_DAYS_BETWEEN = """
-        SELECT DISTINCT data_notowan
-        FROM DANE_DZIENNE
-        WHERE data_notowan > :start_date
-          AND data_notowan <= :end_date
-        ORDER BY data_notowan ASC
+        SELECT data_sesji as data_notowan
+        FROM KALENDARZ_SESJI
+        WHERE data_sesji > :start_date
+          AND data_sesji <= :end_date
+        ORDER BY data_sesji ASC
     """
@@ -0,0 +1,99 @@
+"""
+Lightweight typed row objects for hot queries.
+
+A record type is a __slots__ class generated once per column layout. It
+stores values in slots instead of a per-row dict and converts the chosen
+numeric columns to float when the row is fetched, so readers do not need
+float(x or 0) on every access. Records are read-only Mappings (get, keys,
+items, dict(record) and pandas all work) that also allow assigning to
+their existing fields.
+"""
+
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Iterable, Tuple, List, Dict
+
+
+class Record(Mapping):
+    """Base class of generated record types."""
+
+    __slots__ = ()
+
+    # Set on each generated type
+    _fields: Tuple[str, ...] = ()
+    _field_set: frozenset = frozenset()
+    _float_fields: frozenset = frozenset()
+
+    def __init__(self, *values):
+        floats = self._float_fields
+        for name, value in zip(self._fields, values):
+            if name in floats:
+                value = float(value) if value is not None else 0.0
+            setattr(self, name, value)
+        for name in self._fields[len(values):]:
+            setattr(self, name, None)
+
+    def __getitem__(self, key: str):
+        if key not in self._field_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self._field_set:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __repr__(self) -> str:
+        values = ', '.join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+    def get(self, key: str, default=None):
+        """Get a field value, or default if the record has no such field."""
+        if key not in self._field_set:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        """Return the record as a plain dict."""
+        return {name: getattr(self, name) for name in self._fields}
+
+
+@lru_cache(maxsize=64)
+def record_type(columns: Tuple[str, ...], float_fields: Tuple[str, ...] = (),
+                extra_fields: Tuple[str, ...] = ()) -> type:
+    """
+    Get the record type for a column layout.
+
+    Args:
+        columns: Lowercase column names in select-list order
+        float_fields: Columns converted to float (NULL becomes 0.0)
+        extra_fields: Additional fields, initialized to None, that callers
+            fill in after fetching (e.g. prices calculated for a date)
+
+    Returns:
+        Record subclass whose constructor takes the row values positionally
+        (usable as cursor.rowfactory)
+    """
+    fields = tuple(columns) + tuple(f for f in extra_fields if f not in columns)
+    return type('Record', (Record,), {
+        '__slots__': fields,
+        '_fields': fields,
+        '_field_set': frozenset(fields),
+        '_float_fields': frozenset(float_fields),
+    })
+
+
+def records_from_dicts(rows: Iterable[Dict], float_fields: Iterable[str] = (),
+                       extra_fields: Iterable[str] = ()) -> List[Record]:
+    """Convert rows already fetched as dicts (e.g. from a batch) to records."""
+    rows = list(rows)
+    if not rows:
+        return []
+    factory = record_type(tuple(rows[0]), tuple(float_fields), tuple(extra_fields))
+    return [factory(*row.values()) for row in rows]
@@ -11,6 +11,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.portfolio_service import PortfolioService
 from services.market_service import MarketService
+from services.portfolio_history import PortfolioHistoryService
+from services.analytics import AnalyticsService
 from components.tables import Tables
 from components.charts import Charts
 from config import APP_CONFIG
@@ -45,32 +47,40 @@ def main():
     if is_time_travel:
         st.info(f"Wyświetlanie danych historycznych z dnia: {simulation_date}")
 
-    # Portfolio summary
-    summary = PortfolioService.get_portfolio_summary(portfolio_id)
+    # Portfolio summary and current positions are fetched in one round trip
+    page_data = PortfolioService.get_page_data(portfolio_id, include_positions=True)
+    summary, current_positions = page_data['summary'], page_data['positions']
 
     if not summary:
         st.error("Nie można pobrać danych portfela.")
         return
 
     currency = summary.get('waluta_portfela', 'USD')
-    saldo = float(summary.get('saldo_gotowkowe', 0) or 0)
+    saldo = summary['saldo_gotowkowe']
 
     # Get positions (with time travel if enabled) - needed for metrics calculation
     if is_time_travel:
         positions = PortfolioService.get_positions_for_date(portfolio_id, simulation_date)
     else:
-        positions = PortfolioService.get_positions(portfolio_id)
+        positions = current_positions
 
     # Calculate values based on time travel
-    if is_time_travel:
+    snapshot = PortfolioService.get_portfolio_summary_for_date(portfolio_id, simulation_date) if is_time_travel else None
+    if snapshot:
+        # Stored daily snapshot for the historical date
+        saldo = snapshot['saldo_gotowkowe']
+        wartosc_pozycji = snapshot['wartosc_pozycji']
+        zysk_strata = snapshot['zysk_strata_pozycji']
+        wartosc_calkowita = snapshot['wartosc_calkowita']
+    elif is_time_travel:
         # Calculate from positions for historical date
-        wartosc_pozycji = sum(float(p.get('wartosc_biezaca', 0) or 0) for p in positions)
-        zysk_strata = sum(float(p.get('zysk_strata', 0) or 0) for p in positions)
+        wartosc_pozycji = sum(p['wartosc_biezaca'] for p in positions)
+        zysk_strata = sum(p['zysk_strata'] for p in positions)
         wartosc_calkowita = saldo + wartosc_pozycji
     else:
-        wartosc_calkowita = float(summary.get('wartosc_calkowita', 0) or 0)
-        wartosc_pozycji = float(summary.get('wartosc_pozycji', 0) or 0)
-        zysk_strata = float(summary.get('zysk_strata_pozycji', 0) or 0)
+        wartosc_calkowita = summary['wartosc_calkowita']
+        wartosc_pozycji = summary['wartosc_pozycji']
+        zysk_strata = summary['zysk_strata_pozycji']
 
     # Metrics row
     col1, col2, col3, col4 = st.columns(4)
@@ -108,7 +118,7 @@ def main():
     st.divider()
 
     # Tabs for different views
-    tab1, tab2 = st.tabs(["Pozycje", "Wykres"])
+    tab1, tab2, tab3 = st.tabs(["Pozycje", "Wykres", "Analiza"])
 
     with tab1:
         st.subheader("Twoje pozycje")
@@ -166,9 +176,9 @@ def main():
                 # Summary statistics
                 st.markdown("**Podsumowanie pozycji**")
 
-                total_invested = sum(float(p.get('wartosc_zakupu', 0) or 0) for p in positions)
-                total_current = sum(float(p.get('wartosc_biezaca', 0) or 0) for p in positions)
-                total_gain = sum(float(p.get('zysk_strata', 0) or 0) for p in positions)
+                total_invested = sum(p['wartosc_zakupu'] for p in positions)
+                total_current = sum(p['wartosc_biezaca'] for p in positions)
+                total_gain = sum(p['zysk_strata'] for p in positions)
 
                 st.write(f"Liczba pozycji: **{len(positions)}**")
                 st.write(f"Zainwestowano: **{total_invested:,.2f} {currency}**")
@@ -185,20 +195,64 @@ def main():
 
                 # Best and worst performers
                 if len(positions) > 1:
-                    sorted_by_gain = sorted(positions, key=lambda x: float(x.get('zysk_strata_procent', 0) or 0), reverse=True)
+                    sorted_by_gain = sorted(positions, key=lambda x: x['zysk_strata_procent'], reverse=True)
 
                     st.markdown("---")
                     best = sorted_by_gain[0]
-                    best_pct = float(best.get('zysk_strata_procent', 0) or 0)
+                    best_pct = best['zysk_strata_procent']
                     st.write(f"Najlepsza pozycja: **{best.get('symbol')}** ({'+' if best_pct > 0 else ''}{best_pct:.2f}%)")
 
                     worst = sorted_by_gain[-1]
-                    worst_pct = float(worst.get('zysk_strata_procent', 0) or 0)
+                    worst_pct = worst['zysk_strata_procent']
                     st.write(f"Najgorsza pozycja: **{worst.get('symbol')}** ({'+' if worst_pct > 0 else ''}{worst_pct:.2f}%)")
 
         else:
             st.info("Brak danych do wyświetlenia wykresu.")
 
+        st.subheader("Wartość portfela w czasie")
+        history = PortfolioHistoryService.get_value_history(
+            portfolio_id, end_date=simulation_date if is_time_travel else None
+        )
+        fig = Charts.portfolio_value_chart(history.to_dict('records'), currency)
+        st.plotly_chart(fig, use_container_width=True)
+
+    with tab3:
+        st.subheader("Analiza wyników")
+
+        analytics = AnalyticsService.get_portfolio_analytics(
+            portfolio_id, end_date=simulation_date if is_time_travel else None
+        )
+
+        if analytics:
+            def percent(value):
+                return f"{value * 100:+.2f}%" if value is not None else "-"
+
+            def ratio(value):
+                return f"{value:.2f}" if value is not None else "-"
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Stopa zwrotu (TWR)", percent(analytics['twr']))
+            col2.metric("Stopa zwrotu (MWR)", percent(analytics['mwr']))
+            col3.metric("Zwrot skumulowany", percent(analytics['zwrot_skumulowany']))
+            col4.metric("Maks. obsunięcie", percent(analytics['max_obsuniecie']))
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Zmienność (roczna)", f"{analytics['zmiennosc'] * 100:.2f}%" if analytics['zmiennosc'] is not None else "-")
+            col2.metric("Wskaźnik Sharpe'a", ratio(analytics['sharpe']))
+            col3.metric("Wskaźnik Sortino", ratio(analytics['sortino']))
+            col4.metric(f"Beta ({analytics['benchmark']})" if analytics['benchmark'] else "Beta", ratio(analytics['beta']))
+
+            fig = Charts.performance_chart(analytics['szereg'])
+            st.plotly_chart(fig, use_container_width=True)
+
+            st.caption(
+                f"Analiza z {analytics['dni']} dni sesyjnych. MWR jest podawane w skali roku dla okresu "
+                "od roku, a dla krótszego - za cały okres. Wpłaty i wypłaty nie są datowane, "
+                "dlatego MWR jest równe TWR."
+            )
+        else:
+            st.info("Za mało danych do analizy - potrzebne są co najmniej dwa dni sesyjne od pierwszej transakcji.")
+
     # Quick actions
     st.divider()
     st.subheader("Szybkie akcje")
@@ -49,7 +49,7 @@ def main():
         return
 
     currency = portfolio.get('waluta_portfela', 'USD')
-    available_cash = float(portfolio.get('saldo_gotowkowe', 0) or 0)
+    available_cash = portfolio.get('saldo_gotowkowe') or 0
 
     # Show available cash
     st.info(f"Dostępne środki: **{available_cash:,.2f} {currency}**")
@@ -71,7 +71,7 @@ def main():
         nazwa = inst.get('nazwa_pelna', '')
         cena = inst.get('cena_zamkniecia')
         if cena:
-            label = f"{symbol} - {nazwa[:30]}... ({float(cena):,.2f} {currency})"
+            label = f"{symbol} - {nazwa[:30]}... ({cena:,.2f} {currency})"
         else:
             label = f"{symbol} - {nazwa[:30]}... (brak ceny)"
         instrument_options[label] = inst
@@ -111,7 +111,7 @@ def main():
     # Limit price for LIMIT orders (outside form for immediate feedback)
     limit_price = None
     if order_type == 'LIMIT':
-        default_limit = float(current_price) if current_price else 100.0
+        default_limit = current_price if current_price else 100.0
         limit_price = st.number_input(
             "Cena limitu",
             min_value=0.01,
@@ -133,7 +133,7 @@ def main():
 
         # Calculate costs
         if current_price:
-            execution_price = limit_price if order_type == 'LIMIT' else float(current_price)
+            execution_price = limit_price if order_type == 'LIMIT' else current_price
             cost_details = OrderService.calculate_order_cost(quantity, execution_price)
 
             st.divider()
@@ -162,7 +162,7 @@ def main():
                 if not valid_qty:
                     st.error(qty_msg)
                 else:
-                    execution_price = limit_price if order_type == 'LIMIT' else float(current_price)
+                    execution_price = limit_price if order_type == 'LIMIT' else current_price
                     cost_details = OrderService.calculate_order_cost(quantity, execution_price)
 
                     valid_funds, funds_msg = validate_sufficient_funds(
@@ -206,12 +206,12 @@ def main():
 
         with col2:
             if current_price:
-                st.write(f"**Cena:** {float(current_price):,.2f} {currency}")
+                st.write(f"**Cena:** {current_price:,.2f} {currency}")
             zmiana = selected_instrument.get('zmiana_procent')
             if zmiana is not None:
-                sign = "+" if float(zmiana) > 0 else ""
-                color = "green" if float(zmiana) >= 0 else "red"
-                st.markdown(f"**Zmiana:** <span style='color:{color}'>{sign}{float(zmiana):.2f}%</span>", unsafe_allow_html=True)
+                sign = "+" if zmiana > 0 else ""
+                color = "green" if zmiana >= 0 else "red"
+                st.markdown(f"**Zmiana:** <span style='color:{color}'>{sign}{zmiana:.2f}%</span>", unsafe_allow_html=True)
 
         with col3:
             wolumen = selected_instrument.get('wolumen')
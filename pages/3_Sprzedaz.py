@@ -69,7 +69,7 @@ def main():
     position_options = {}
     for pos in positions:
         symbol = pos.get('symbol', 'N/A')
-        ilosc = float(pos.get('ilosc_akcji', 0) or 0)
+        ilosc = pos.get('ilosc_akcji') or 0
         label = f"{symbol} - {ilosc:.4f} szt."
         position_options[label] = pos
 
@@ -101,8 +101,8 @@ def main():
         selected_position = position_options[selected_label]
         instrument_id = selected_position.get('instrument_id')
         symbol = selected_position.get('symbol')
-        owned_shares = float(selected_position.get('ilosc_akcji', 0) or 0)
-        avg_purchase_price = float(selected_position.get('srednia_cena_zakupu', 0) or 0)
+        owned_shares = selected_position.get('ilosc_akcji') or 0.0
+        avg_purchase_price = selected_position.get('srednia_cena_zakupu') or 0.0
 
         # Get current price
         if is_time_travel:
@@ -142,7 +142,7 @@ def main():
         # Limit price for LIMIT orders
         limit_price = None
         if order_type == 'LIMIT':
-            default_limit = float(current_price) if current_price else avg_purchase_price
+            default_limit = current_price if current_price else avg_purchase_price
             limit_price = st.number_input(
                 "Cena limitu",
                 min_value=0.01,
@@ -154,7 +154,7 @@ def main():
 
         # Calculate proceeds and gain/loss
         if current_price:
-            execution_price = limit_price if order_type == 'LIMIT' else float(current_price)
+            execution_price = limit_price if order_type == 'LIMIT' else current_price
             proceeds_details = OrderService.calculate_order_proceeds(quantity, execution_price)
 
             # Calculate gain/loss
@@ -202,7 +202,7 @@ def main():
                     if not valid_shares:
                         st.error(shares_msg)
                     else:
-                        execution_price = limit_price if order_type == 'LIMIT' else float(current_price)
+                        execution_price = limit_price if order_type == 'LIMIT' else current_price
 
                         # Execute order
                         if order_type == 'MARKET':
@@ -237,13 +237,13 @@ def main():
         with col2:
             st.write(f"**Śr. cena zakupu:** {avg_purchase_price:,.2f} {currency}")
             if current_price:
-                st.write(f"**Cena bieżąca:** {float(current_price):,.2f} {currency}")
+                st.write(f"**Cena bieżąca:** {current_price:,.2f} {currency}")
 
         with col3:
-            wartosc_zakupu = float(selected_position.get('wartosc_zakupu', 0) or 0)
-            wartosc_biezaca = float(selected_position.get('wartosc_biezaca', 0) or 0)
-            zysk_strata = float(selected_position.get('zysk_strata', 0) or 0)
-            zysk_procent = float(selected_position.get('zysk_strata_procent', 0) or 0)
+            wartosc_zakupu = selected_position.get('wartosc_zakupu') or 0
+            wartosc_biezaca = selected_position.get('wartosc_biezaca') or 0
+            zysk_strata = selected_position.get('zysk_strata') or 0
+            zysk_procent = selected_position.get('zysk_strata_procent') or 0
 
             st.write(f"**Wartość zakupu:** {wartosc_zakupu:,.2f} {currency}")
             sign = "+" if zysk_strata > 0 else ""
@@ -11,7 +11,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.market_service import MarketService
 from components.tables import Tables
-from components.charts import Charts
+from components.charts import Charts, INDICATOR_OVERLAYS, INDICATOR_PANELS
+from services.indicators import IndicatorService
 from config import APP_CONFIG
 
 
@@ -77,10 +78,10 @@ def main():
     sort_options = {
         "Symbol (A-Z)": lambda x: x.get('symbol', ''),
         "Symbol (Z-A)": lambda x: x.get('symbol', ''),
-        "Cena (rosnąco)": lambda x: float(x.get('cena_zamkniecia', 0) or 0),
-        "Cena (malejąco)": lambda x: float(x.get('cena_zamkniecia', 0) or 0),
-        "Zmiana % (rosnąco)": lambda x: float(x.get('zmiana_procent', 0) or 0),
-        "Zmiana % (malejąco)": lambda x: float(x.get('zmiana_procent', 0) or 0),
+        "Cena (rosnąco)": lambda x: x.get('cena_zamkniecia') or 0,
+        "Cena (malejąco)": lambda x: x.get('cena_zamkniecia') or 0,
+        "Zmiana % (rosnąco)": lambda x: x.get('zmiana_procent') or 0,
+        "Zmiana % (malejąco)": lambda x: x.get('zmiana_procent') or 0,
     }
 
     sort_by = st.selectbox("Sortuj", options=list(sort_options.keys()))
@@ -159,12 +160,27 @@ def main():
                     horizontal=True
                 )
 
+            selected_indicators = []
+            if chart_type == "Świecowy":
+                selected_indicators = st.multiselect(
+                    "Wskaźniki techniczne",
+                    list(INDICATOR_OVERLAYS) + list(INDICATOR_PANELS),
+                    default=["SMA 20"]
+                )
+
             # Get price history
-            price_history = MarketService.get_price_history(instrument_id, chart_start, chart_end)
+            price_history = MarketService.get_price_history_frame(instrument_id, chart_start, chart_end)
 
-            if price_history:
+            if not price_history.empty:
                 if chart_type == "Świecowy":
-                    fig = Charts.candlestick_chart(price_history, instrument_for_chart)
+                    indicators = (
+                        IndicatorService.get_indicators(instrument_id, chart_start, chart_end)
+                        if selected_indicators else None
+                    )
+                    fig = Charts.candlestick_chart(
+                        price_history, instrument_for_chart,
+                        indicators=indicators, selected_indicators=selected_indicators
+                    )
                 else:
                     fig = Charts.line_chart(price_history, instrument_for_chart)
 
@@ -184,8 +200,8 @@ def main():
     col1, col2, col3 = st.columns(3)
 
     # Calculate statistics
-    prices = [float(i.get('cena_zamkniecia', 0) or 0) for i in instruments if i.get('cena_zamkniecia')]
-    changes = [float(i.get('zmiana_procent', 0) or 0) for i in instruments if i.get('zmiana_procent') is not None]
+    prices = [i['cena_zamkniecia'] for i in instruments if i.get('cena_zamkniecia')]
+    changes = [i['zmiana_procent'] for i in instruments if i.get('zmiana_procent') is not None]
 
     with col1:
         st.metric("Liczba instrumentów", len(instruments))
@@ -66,11 +66,9 @@ def main():
             # Bulk cancel option
             if len(pending_orders) > 1:
                 if st.button("Anuluj wszystkie oczekujące zlecenia"):
-                    cancelled = 0
-                    for order in pending_orders:
-                        success, _ = OrderService.cancel_order(order.get('order_id'))
-                        if success:
-                            cancelled += 1
+                    cancelled = OrderService.cancel_orders(
+                        [order.get('order_id') for order in pending_orders]
+                    )
                     st.success(f"Anulowano {cancelled} zleceń")
                     st.rerun()
         else:
@@ -85,7 +83,7 @@ def main():
             for order in executed_orders:
                 symbol = order.get('symbol', 'N/A')
                 strona = order.get('strona_zlecenia', 'N/A')
-                ilosc = float(order.get('ilosc', 0) or 0)
+                ilosc = order.get('ilosc') or 0
                 data_wykonania = order.get('data_wykonania')
 
                 strona_emoji = "🟢" if strona == 'KUPNO' else "🔴"
@@ -103,7 +101,7 @@ def main():
                     with col3:
                         limit_ceny = order.get('limit_ceny')
                         if limit_ceny:
-                            st.metric(label="Cena", value=f"{float(limit_ceny):,.2f}")
+                            st.metric(label="Cena", value=f"{limit_ceny:,.2f}")
                         else:
                             st.metric(label="Cena", value="Rynkowa")
 
@@ -126,7 +124,7 @@ def main():
             for order in cancelled_orders:
                 symbol = order.get('symbol', 'N/A')
                 strona = order.get('strona_zlecenia', 'N/A')
-                ilosc = float(order.get('ilosc', 0) or 0)
+                ilosc = order.get('ilosc') or 0
                 data_utworzenia = order.get('data_utworzenia')
 
                 with st.container():
@@ -142,7 +140,7 @@ def main():
                     with col3:
                         limit_ceny = order.get('limit_ceny')
                         if limit_ceny:
-                            st.metric(label="Limit", value=f"{float(limit_ceny):,.2f}")
+                            st.metric(label="Limit", value=f"{limit_ceny:,.2f}")
                         else:
                             st.metric(label="Limit", value="-")
 
@@ -191,17 +189,17 @@ def main():
             col1, col2, col3, col4 = st.columns(4)
 
             total_buy = sum(
-                float(t.get('wartosc_transakcji', 0) or 0)
+                t.get('wartosc_transakcji') or 0
                 for t in transactions
                 if t.get('typ_transakcji') == 'KUPNO'
             )
             total_sell = sum(
-                float(t.get('wartosc_transakcji', 0) or 0)
+                t.get('wartosc_transakcji') or 0
                 for t in transactions
                 if t.get('typ_transakcji') == 'SPRZEDAZ'
             )
             total_commission = sum(
-                float(t.get('prowizja', 0) or 0)
+                t.get('prowizja') or 0
                 for t in transactions
             )
 
@@ -230,21 +228,30 @@ def main():
     )
 
     if st.button("Eksportuj do CSV"):
-        import pandas as pd
-
-        if export_type == "Wszystkie zlecenia":
-            data = OrderService.get_orders_by_portfolio(portfolio_id)
-        elif export_type == "Wykonane zlecenia":
-            data = OrderService.get_executed_orders(portfolio_id)
+        import csv
+        import io
+
+        if export_type == "Transakcje":
+            # Transactions are streamed straight into the CSV buffer
+            buffer = io.StringIO()
+            writer = None
+            for row in TransactionService.iter_transactions_by_portfolio(portfolio_id):
+                if writer is None:
+                    writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                    writer.writeheader()
+                writer.writerow(row)
+            csv_data = buffer.getvalue() if writer is not None else None
         else:
-            data = TransactionService.get_transactions_by_portfolio(portfolio_id)
+            if export_type == "Wszystkie zlecenia":
+                df = OrderService.get_orders_frame(portfolio_id)
+            else:
+                df = OrderService.get_executed_orders_frame(portfolio_id)
+            csv_data = df.to_csv(index=False) if not df.empty else None
 
-        if data:
-            df = pd.DataFrame(data)
-            csv = df.to_csv(index=False)
+        if csv_data:
             st.download_button(
                 label="Pobierz CSV",
-                data=csv,
+                data=csv_data,
                 file_name=f"{export_type.lower().replace(' ', '_')}.csv",
                 mime="text/csv"
             )
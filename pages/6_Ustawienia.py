@@ -3,6 +3,7 @@ Settings page - User settings and portfolio management.
 """
 
 import streamlit as st
+import pandas as pd
 import sys
 import os
 
@@ -10,7 +11,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.portfolio_service import PortfolioService, UserService
 from services.data_loader import DataLoader
-from db.connection import test_connection
+from services.order_service import OrderService
+from services.reference_cache import reference_cache
+from db.connection import test_connection, get_pool_stats
+from db.connection_async import run_async
+from db.instrumentation import get_query_stats, reset_query_stats
 from config import APP_CONFIG
 from utils.validators import validate_positive_number
 
@@ -71,10 +76,10 @@ def main():
 
             portfolios = PortfolioService.get_user_portfolios(user_id)
 
-            total_value = 0
-            for p in portfolios:
-                value = PortfolioService.get_portfolio_value(p['portfolio_id'])
-                total_value += value if value else 0
+            # Values and positions of all portfolios are fetched concurrently
+            total_value, total_positions = run_async(PortfolioService.get_portfolios_totals_async(
+                [p['portfolio_id'] for p in portfolios]
+            ))
 
             col1, col2, col3 = st.columns(3)
 
@@ -85,10 +90,6 @@ def main():
                 st.metric("Łączna wartość", f"{total_value:,.2f} USD")
 
             with col3:
-                total_positions = 0
-                for p in portfolios:
-                    positions = PortfolioService.get_positions(p['portfolio_id'])
-                    total_positions += len(positions)
                 st.metric("Łączna liczba pozycji", total_positions)
 
     with tab2:
@@ -104,7 +105,7 @@ def main():
                 portfolio_id = portfolio.get('portfolio_id')
                 nazwa = portfolio.get('nazwa_portfela', 'N/A')
                 waluta = portfolio.get('waluta_portfela', 'USD')
-                saldo = float(portfolio.get('saldo_gotowkowe', 0) or 0)
+                saldo = portfolio.get('saldo_gotowkowe') or 0
                 data_utworzenia = portfolio.get('data_utworzenia')
 
                 is_active = portfolio_id == st.session_state.portfolio_id
@@ -178,7 +179,7 @@ def main():
         else:
             portfolio = PortfolioService.get_portfolio(st.session_state.portfolio_id)
             currency = portfolio.get('waluta_portfela', 'USD')
-            current_balance = float(portfolio.get('saldo_gotowkowe', 0) or 0)
+            current_balance = portfolio.get('saldo_gotowkowe') or 0
 
             st.info(f"Aktualne saldo: **{current_balance:,.2f} {currency}**")
 
@@ -266,6 +267,98 @@ def main():
 
         st.divider()
 
+        # Connection pool statistics
+        st.markdown("**Pula połączeń**")
+
+        pool_stats = get_pool_stats()
+        configured = pool_stats['configured']
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("Otwarte / zajęte", f"{pool_stats['opened'] or 0} / {pool_stats['busy'] or 0}")
+
+        with col2:
+            st.metric("Szczyt użycia", f"{pool_stats['peak_in_use']} / {configured['max']}")
+
+        with col3:
+            st.metric("Śr. czas oczekiwania", f"{pool_stats['avg_wait_ms']:.2f} ms")
+
+        with col4:
+            st.metric("Przekroczenia czasu", pool_stats['timeouts'])
+
+        st.caption(
+            f"Rozmiar: {configured['min']}-{configured['max']} (+{configured['increment']}), "
+            f"tryb: {configured['getmode']}, ping: {configured['ping_interval']} s, "
+            f"pobrania: {pool_stats['acquires']}, błędy: {pool_stats['errors']}, "
+            f"maks. oczekiwanie: {pool_stats['max_wait_ms']:.2f} ms"
+        )
+
+        with st.expander("Histogram czasu oczekiwania na połączenie"):
+            histogram = pool_stats['wait_histogram']
+            st.bar_chart(pd.DataFrame(
+                {'Liczba pobrań': list(histogram.values())},
+                index=list(histogram.keys())
+            ))
+
+        st.divider()
+
+        # Per-statement latency statistics
+        st.markdown("**Czasy zapytań**")
+
+        query_stats = get_query_stats()
+
+        if query_stats:
+            st.dataframe(
+                pd.DataFrame(query_stats).drop(columns=['histogram']).rename(columns={
+                    'statement': 'Zapytanie',
+                    'binds': 'Parametry',
+                    'calls': 'Wywołania',
+                    'errors': 'Błędy',
+                    'rows': 'Wiersze',
+                    'total_ms': 'Łącznie [ms]',
+                    'avg_ms': 'Średnio [ms]',
+                    'max_ms': 'Maks. [ms]',
+                    'fetch_ms': 'Pobieranie [ms]',
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+
+            with st.expander("Histogram czasu wykonania"):
+                statement = st.selectbox(
+                    "Zapytanie",
+                    options=range(len(query_stats)),
+                    format_func=lambda i: f"{query_stats[i]['statement']} ({query_stats[i]['binds'] or '-'})"
+                )
+                histogram = query_stats[statement]['histogram']
+                st.bar_chart(pd.DataFrame(
+                    {'Liczba wywołań': list(histogram.values())},
+                    index=list(histogram.keys())
+                ))
+
+            if st.button("Wyczyść statystyki zapytań"):
+                reset_query_stats()
+                st.rerun()
+        else:
+            st.info("Brak zarejestrowanych zapytań")
+
+        st.divider()
+
+        # Reference data cache
+        st.markdown("**Pamięć podręczna danych referencyjnych**")
+
+        cache_stats = reference_cache.get_stats()
+        st.caption(
+            f"Wpisy: {cache_stats['entries']}, trafienia: {cache_stats['hits']}, "
+            f"chybienia: {cache_stats['misses']}, ważność: {cache_stats['ttl_seconds']} s"
+        )
+        if st.button("Wyczyść pamięć podręczną"):
+            reference_cache.invalidate()
+            st.rerun()
+
+        st.divider()
+
         # Data refresh option
         st.markdown("**Aktualizacja danych rynkowych**")
 
@@ -283,6 +376,30 @@ def main():
                     for msg in messages:
                         st.error(msg)
 
+        st.caption("Zlecenia LIMIT wszystkich portfeli są kojarzone z notowaniami z ostatniej sesji.")
+        if st.button("Skojarz zlecenia LIMIT"):
+            with st.spinner("Kojarzenie zleceń..."):
+                success, message, stats = OrderService.match_all_limit_orders()
+
+            if success:
+                st.success(message)
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Sprawdzone", stats['sprawdzone'])
+                with col2:
+                    st.metric("Spełniające warunek", stats['spelnione'])
+                with col3:
+                    st.metric("Wykonane", stats['wykonane'])
+                with col4:
+                    st.metric("Odrzucone", stats['odrzucone'])
+                st.caption(
+                    f"Wybór zleceń: {stats['czas_wyboru_ms']} ms, "
+                    f"realizacja: {stats['czas_realizacji_ms']} ms, "
+                    f"łącznie: {stats['czas_calkowity_ms']} ms"
+                )
+            else:
+                st.error(message)
+
         st.divider()
 
         # About section
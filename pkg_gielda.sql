@@ -130,6 +130,28 @@ CREATE TABLE DANE_DZIENNE (
     CONSTRAINT chk_ceny CHECK (cena_min <= cena_max)
 );
 
+-- Tabela: NOTOWANIA_BIEZACE
+-- Przechowuje najnowsze notowanie każdego instrumentu (kopia ostatniego wiersza z DANE_DZIENNE)
+-- Utrzymywana przez wyzwalacz trg_dane_dzienne_notowania; bieżąca cena to jeden odczyt po kluczu
+CREATE TABLE NOTOWANIA_BIEZACE (
+    instrument_id NUMBER PRIMARY KEY REFERENCES INSTRUMENTY(instrument_id),
+    daily_data_id NUMBER NOT NULL,
+    data_notowan DATE NOT NULL,
+    cena_otwarcia NUMBER(15,4),
+    cena_max NUMBER(15,4),
+    cena_min NUMBER(15,4),
+    cena_zamkniecia NUMBER(15,4) NOT NULL,
+    wolumen NUMBER(20),
+    data_aktualizacji TIMESTAMP DEFAULT SYSTIMESTAMP
+) ORGANIZATION INDEX;
+
+-- Tabela: KALENDARZ_SESJI
+-- Przechowuje dni sesyjne (daty, dla których istnieje co najmniej jedno notowanie w DANE_DZIENNE)
+-- Utrzymywana przez wyzwalacz trg_dane_dzienne_notowania
+CREATE TABLE KALENDARZ_SESJI (
+    data_sesji DATE PRIMARY KEY
+) ORGANIZATION INDEX;
+
 -- Tabela: PORTFELE
 -- Przechowuje portfele inwestycyjne użytkowników
 CREATE TABLE PORTFELE (
@@ -190,6 +212,36 @@ CREATE TABLE POZYCJE (
     CONSTRAINT uk_pozycje UNIQUE(portfolio_id, instrument_id)
 );
 
+-- Tabela: MIGAWKI_PORTFELI
+-- Przechowuje stan każdego portfela na każdy dzień sesyjny (gotówka, wartość pozycji, zysk/strata)
+-- Utrzymywana przyrostowo przez pkg_gielda.odswiez_migawki_portfeli po transakcjach, wpłatach/wypłatach
+-- i załadowaniu nowych notowań; odczyt historii portfela to odczyt po kluczu
+CREATE TABLE MIGAWKI_PORTFELI (
+    portfolio_id NUMBER NOT NULL REFERENCES PORTFELE(portfolio_id),
+    data_sesji DATE NOT NULL,
+    saldo_gotowkowe NUMBER(15,2) NOT NULL,
+    wartosc_pozycji NUMBER(15,2) NOT NULL,
+    wartosc_zakupu NUMBER(15,2) NOT NULL,
+    zysk_strata NUMBER(15,2) NOT NULL,
+    wartosc_calkowita NUMBER(15,2) NOT NULL,
+    liczba_pozycji NUMBER NOT NULL,
+    CONSTRAINT pk_migawki_portfeli PRIMARY KEY (portfolio_id, data_sesji)
+) ORGANIZATION INDEX;
+
+-- Tabela: MIGAWKI_POZYCJI
+-- Przechowuje stan każdej pozycji (ilość, koszt zakupu metodą średniej ważonej) na koniec dnia,
+-- w którym była transakcja tym instrumentem; odswiez_migawki_portfeli przenosi stan sprzed
+-- przeliczanego dnia zamiast odtwarzać całą historię transakcji
+-- (wartosc_zakupu bez zaokrąglenia - jest punktem startowym kolejnych przeliczeń)
+CREATE TABLE MIGAWKI_POZYCJI (
+    portfolio_id NUMBER NOT NULL REFERENCES PORTFELE(portfolio_id),
+    instrument_id NUMBER NOT NULL REFERENCES INSTRUMENTY(instrument_id),
+    data_zmiany DATE NOT NULL,
+    ilosc_akcji NUMBER(15,4) NOT NULL,
+    wartosc_zakupu NUMBER NOT NULL,
+    CONSTRAINT pk_migawki_pozycji PRIMARY KEY (portfolio_id, instrument_id, data_zmiany)
+) ORGANIZATION INDEX;
+
 -- Tabela: KURSY_WALUT
 -- Przechowuje kursy wymiany walut
 CREATE TABLE KURSY_WALUT (
@@ -242,12 +294,31 @@ CREATE OR REPLACE PACKAGE pkg_gielda AS
         p_instrument_id IN NUMBER
     ) RETURN NUMBER;
     
+    -- PROCEDURA: Odświeża najnowsze notowania w NOTOWANIA_BIEZACE (NULL = wszystkie instrumenty)
+    PROCEDURE odswiez_notowania_biezace(
+        p_instrument_id IN NUMBER DEFAULT NULL
+    );
+    
+    -- PROCEDURA: Odświeża dni sesyjne w KALENDARZ_SESJI (NULL = cały kalendarz)
+    PROCEDURE odswiez_kalendarz_sesji(
+        p_data IN DATE DEFAULT NULL
+    );
+    
+    -- PROCEDURA: Przelicza dzienne migawki w MIGAWKI_PORTFELI od dnia p_od
+    -- (NULL = wszystkie portfele / od pierwszego dnia)
+    PROCEDURE odswiez_migawki_portfeli(
+        p_portfolio_id IN NUMBER DEFAULT NULL,
+        p_od IN DATE DEFAULT NULL
+    );
+    
     -- PROCEDURA: Realizuje zlecenie kupna
     PROCEDURE wykonaj_zlecenie_kupna(
         p_order_id IN NUMBER,
         p_cena_wykonania IN NUMBER,
         p_data_symulacji IN TIMESTAMP DEFAULT NULL,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE,
+        p_odswiez_migawki IN BOOLEAN DEFAULT TRUE
     );
     
     -- PROCEDURA: Realizuje zlecenie sprzedaży
@@ -255,7 +326,9 @@ CREATE OR REPLACE PACKAGE pkg_gielda AS
         p_order_id IN NUMBER,
         p_cena_wykonania IN NUMBER,
         p_data_symulacji IN TIMESTAMP DEFAULT NULL,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE,
+        p_odswiez_migawki IN BOOLEAN DEFAULT TRUE
     );
     
     -- PROCEDURA: Aktualizuje wartości bieżące wszystkich pozycji w portfelu
@@ -263,6 +336,12 @@ CREATE OR REPLACE PACKAGE pkg_gielda AS
         p_portfolio_id IN NUMBER
     );
     
+    -- PROCEDURA: Aktualizuje wartości bieżące pozycji we wszystkich portfelach
+    -- i ich migawki od dnia p_od (pierwszy dzień nowych notowań; NULL = wszystkie dni)
+    PROCEDURE aktualizuj_wszystkie_portfele(
+        p_od IN DATE DEFAULT NULL
+    );
+    
     -- PROCEDURA: Wpłata środków na portfel
     PROCEDURE wplac_srodki(
         p_portfolio_id IN NUMBER,
@@ -335,15 +414,11 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
     ) RETURN NUMBER IS
         v_cena NUMBER;
     BEGIN
+        -- Odczyt po kluczu głównym z tabeli najnowszych notowań
         SELECT cena_zamkniecia
         INTO v_cena
-        FROM DANE_DZIENNE
-        WHERE instrument_id = p_instrument_id
-          AND data_notowan = (
-              SELECT MAX(data_notowan)
-              FROM DANE_DZIENNE
-              WHERE instrument_id = p_instrument_id
-          );
+        FROM NOTOWANIA_BIEZACE
+        WHERE instrument_id = p_instrument_id;
         
         RETURN v_cena;
         
@@ -354,12 +429,263 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
             RAISE_APPLICATION_ERROR(-20002, 'Błąd podczas pobierania ceny: ' || SQLERRM);
     END pobierz_aktualna_cene;
 
+    -- PROCEDURA: odswiez_notowania_biezace
+    -- Nie zatwierdza transakcji - wywoływana z wyzwalacza na DANE_DZIENNE
+    PROCEDURE odswiez_notowania_biezace(
+        p_instrument_id IN NUMBER DEFAULT NULL
+    ) IS
+    BEGIN
+        -- Usuń instrumenty, które nie mają już żadnych notowań
+        DELETE FROM NOTOWANIA_BIEZACE nb
+        WHERE (p_instrument_id IS NULL OR nb.instrument_id = p_instrument_id)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM DANE_DZIENNE dd
+              WHERE dd.instrument_id = nb.instrument_id
+          );
+        
+        -- Wstaw lub zaktualizuj ostatnie notowanie każdego instrumentu
+        MERGE INTO NOTOWANIA_BIEZACE nb
+        USING (
+            SELECT instrument_id,
+                   MAX(data_notowan) AS data_notowan,
+                   MAX(daily_data_id) KEEP (DENSE_RANK LAST ORDER BY data_notowan) AS daily_data_id,
+                   MAX(cena_otwarcia) KEEP (DENSE_RANK LAST ORDER BY data_notowan) AS cena_otwarcia,
+                   MAX(cena_max) KEEP (DENSE_RANK LAST ORDER BY data_notowan) AS cena_max,
+                   MAX(cena_min) KEEP (DENSE_RANK LAST ORDER BY data_notowan) AS cena_min,
+                   MAX(cena_zamkniecia) KEEP (DENSE_RANK LAST ORDER BY data_notowan) AS cena_zamkniecia,
+                   MAX(wolumen) KEEP (DENSE_RANK LAST ORDER BY data_notowan) AS wolumen
+            FROM DANE_DZIENNE
+            WHERE p_instrument_id IS NULL OR instrument_id = p_instrument_id
+            GROUP BY instrument_id
+        ) src
+        ON (nb.instrument_id = src.instrument_id)
+        WHEN MATCHED THEN
+            UPDATE SET nb.daily_data_id = src.daily_data_id,
+                       nb.data_notowan = src.data_notowan,
+                       nb.cena_otwarcia = src.cena_otwarcia,
+                       nb.cena_max = src.cena_max,
+                       nb.cena_min = src.cena_min,
+                       nb.cena_zamkniecia = src.cena_zamkniecia,
+                       nb.wolumen = src.wolumen,
+                       nb.data_aktualizacji = SYSTIMESTAMP
+        WHEN NOT MATCHED THEN
+            INSERT (instrument_id, daily_data_id, data_notowan, cena_otwarcia,
+                    cena_max, cena_min, cena_zamkniecia, wolumen)
+            VALUES (src.instrument_id, src.daily_data_id, src.data_notowan, src.cena_otwarcia,
+                    src.cena_max, src.cena_min, src.cena_zamkniecia, src.wolumen);
+        
+    EXCEPTION
+        WHEN OTHERS THEN
+            RAISE_APPLICATION_ERROR(-20004, 'Błąd podczas odświeżania notowań: ' || SQLERRM);
+    END odswiez_notowania_biezace;
+
+    -- PROCEDURA: odswiez_kalendarz_sesji
+    -- Nie zatwierdza transakcji - wywoływana z wyzwalacza na DANE_DZIENNE
+    PROCEDURE odswiez_kalendarz_sesji(
+        p_data IN DATE DEFAULT NULL
+    ) IS
+    BEGIN
+        -- Usuń dni, dla których nie ma już żadnych notowań
+        DELETE FROM KALENDARZ_SESJI k
+        WHERE (p_data IS NULL OR k.data_sesji = p_data)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM DANE_DZIENNE dd
+              WHERE dd.data_notowan = k.data_sesji
+          );
+        
+        -- Dodaj brakujące dni sesyjne
+        MERGE INTO KALENDARZ_SESJI k
+        USING (
+            SELECT DISTINCT data_notowan
+            FROM DANE_DZIENNE
+            WHERE p_data IS NULL OR data_notowan = p_data
+        ) src
+        ON (k.data_sesji = src.data_notowan)
+        WHEN NOT MATCHED THEN
+            INSERT (data_sesji) VALUES (src.data_notowan);
+        
+    EXCEPTION
+        WHEN OTHERS THEN
+            RAISE_APPLICATION_ERROR(-20005, 'Błąd podczas odświeżania kalendarza sesji: ' || SQLERRM);
+    END odswiez_kalendarz_sesji;
+
+    -- PROCEDURA: odswiez_migawki_portfeli
+    -- Nie zatwierdza transakcji - wywoływana z procedur zmieniających portfel
+    -- Stan pozycji przenoszony jest z MIGAWKI_POZYCJI sprzed dnia p_od, więc przeliczane są
+    -- tylko transakcje od p_od (bez p_od - cała historia)
+    -- Gotówka na dzień to bieżące saldo pomniejszone o przepływy z transakcji z późniejszych dni
+    -- (wpłaty i wypłaty nie mają daty, więc traktowane są jak wykonane przed pierwszym dniem)
+    PROCEDURE odswiez_migawki_portfeli(
+        p_portfolio_id IN NUMBER DEFAULT NULL,
+        p_od IN DATE DEFAULT NULL
+    ) IS
+    BEGIN
+        DELETE FROM MIGAWKI_PORTFELI
+        WHERE (p_portfolio_id IS NULL OR portfolio_id = p_portfolio_id)
+          AND (p_od IS NULL OR data_sesji >= TRUNC(p_od));
+        
+        DELETE FROM MIGAWKI_POZYCJI
+        WHERE (p_portfolio_id IS NULL OR portfolio_id = p_portfolio_id)
+          AND (p_od IS NULL OR data_zmiany >= TRUNC(p_od));
+        
+        -- Stan pozycji na koniec każdego dnia z transakcjami od p_od
+        INSERT INTO MIGAWKI_POZYCJI (
+            portfolio_id, instrument_id, data_zmiany, ilosc_akcji, wartosc_zakupu
+        )
+        WITH ruchy AS (
+            -- Transakcje od dnia p_od z numerem kolejnym w ramach pozycji
+            SELECT z.portfolio_id, z.instrument_id,
+                   TRUNC(t.data_transakcji) AS dzien,
+                   t.typ_transakcji, t.ilosc, t.wartosc_transakcji,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY z.portfolio_id, z.instrument_id
+                       ORDER BY t.data_transakcji, t.transaction_id
+                   ) AS nr
+            FROM TRANSAKCJE t
+            JOIN ZLECENIA z ON z.order_id = t.order_id
+            WHERE (p_portfolio_id IS NULL OR z.portfolio_id = p_portfolio_id)
+              AND (p_od IS NULL OR t.data_transakcji >= TRUNC(p_od))
+        ),
+        poczatek AS (
+            -- Stan pozycji sprzed p_od: ostatni zapisany stan każdego instrumentu
+            SELECT portfolio_id, instrument_id,
+                   MAX(ilosc_akcji) KEEP (DENSE_RANK LAST ORDER BY data_zmiany) AS ilosc,
+                   MAX(wartosc_zakupu) KEEP (DENSE_RANK LAST ORDER BY data_zmiany) AS koszt
+            FROM MIGAWKI_POZYCJI
+            WHERE (p_portfolio_id IS NULL OR portfolio_id = p_portfolio_id)
+              AND data_zmiany < TRUNC(p_od)
+            GROUP BY portfolio_id, instrument_id
+        ),
+        -- Stan pozycji po każdej transakcji (średnia ważona, jak w wykonaj_zlecenie_kupna/sprzedazy):
+        -- kupno dodaje koszt, sprzedaż zmniejsza koszt proporcjonalnie do sprzedanej ilości
+        stany (portfolio_id, instrument_id, nr, dzien, ilosc, koszt) AS (
+            SELECT r.portfolio_id, r.instrument_id, r.nr, r.dzien,
+                   CASE WHEN r.typ_transakcji = 'KUPNO' THEN NVL(p.ilosc, 0) + r.ilosc
+                        ELSE NVL(p.ilosc, 0) - r.ilosc
+                   END,
+                   CASE WHEN r.typ_transakcji = 'KUPNO' THEN NVL(p.koszt, 0) + r.wartosc_transakcji
+                        WHEN NVL(p.ilosc, 0) <= r.ilosc THEN 0
+                        ELSE p.koszt * (p.ilosc - r.ilosc) / p.ilosc
+                   END
+            FROM ruchy r
+            LEFT JOIN poczatek p
+                   ON p.portfolio_id = r.portfolio_id
+                  AND p.instrument_id = r.instrument_id
+            WHERE r.nr = 1
+            UNION ALL
+            SELECT r.portfolio_id, r.instrument_id, r.nr, r.dzien,
+                   CASE WHEN r.typ_transakcji = 'KUPNO' THEN s.ilosc + r.ilosc ELSE s.ilosc - r.ilosc END,
+                   CASE WHEN r.typ_transakcji = 'KUPNO' THEN s.koszt + r.wartosc_transakcji
+                        WHEN s.ilosc <= r.ilosc THEN 0
+                        ELSE s.koszt * (s.ilosc - r.ilosc) / s.ilosc
+                   END
+            FROM stany s
+            JOIN ruchy r
+              ON r.portfolio_id = s.portfolio_id
+             AND r.instrument_id = s.instrument_id
+             AND r.nr = s.nr + 1
+        )
+        SELECT portfolio_id, instrument_id, dzien,
+               MAX(ilosc) KEEP (DENSE_RANK LAST ORDER BY nr),
+               MAX(koszt) KEEP (DENSE_RANK LAST ORDER BY nr)
+        FROM stany
+        GROUP BY portfolio_id, instrument_id, dzien;
+        
+        INSERT INTO MIGAWKI_PORTFELI (
+            portfolio_id, data_sesji, saldo_gotowkowe, wartosc_pozycji,
+            wartosc_zakupu, zysk_strata, wartosc_calkowita, liczba_pozycji
+        )
+        WITH przeplywy AS (
+            -- Przepływy gotówki z transakcji od dnia p_od (tylko one zmieniają gotówkę przeliczanych dni)
+            SELECT z.portfolio_id,
+                   TRUNC(t.data_transakcji) AS dzien,
+                   CASE WHEN t.typ_transakcji = 'KUPNO'
+                        THEN -(t.wartosc_transakcji + NVL(t.prowizja, 0))
+                        ELSE t.wartosc_transakcji - NVL(t.prowizja, 0)
+                   END AS przeplyw
+            FROM TRANSAKCJE t
+            JOIN ZLECENIA z ON z.order_id = t.order_id
+            WHERE (p_portfolio_id IS NULL OR z.portfolio_id = p_portfolio_id)
+              AND (p_od IS NULL OR t.data_transakcji >= TRUNC(p_od))
+        ),
+        dni AS (
+            -- Dni sesyjne od utworzenia portfela lub pierwszej transakcji (wcześniejsza z dat)
+            SELECT p.portfolio_id, p.saldo_gotowkowe, k.data_sesji
+            FROM PORTFELE p
+            JOIN KALENDARZ_SESJI k
+              ON k.data_sesji >= LEAST(
+                     TRUNC(p.data_utworzenia),
+                     NVL((SELECT MIN(m.data_zmiany) FROM MIGAWKI_POZYCJI m WHERE m.portfolio_id = p.portfolio_id),
+                         TRUNC(p.data_utworzenia))
+                 )
+            WHERE (p_portfolio_id IS NULL OR p.portfolio_id = p_portfolio_id)
+              AND (p_od IS NULL OR k.data_sesji >= TRUNC(p_od))
+        ),
+        gotowka AS (
+            SELECT d.portfolio_id, d.data_sesji,
+                   d.saldo_gotowkowe - NVL(SUM(r.przeplyw), 0) AS saldo_gotowkowe
+            FROM dni d
+            LEFT JOIN przeplywy r
+                   ON r.portfolio_id = d.portfolio_id
+                  AND r.dzien > d.data_sesji
+            GROUP BY d.portfolio_id, d.data_sesji, d.saldo_gotowkowe
+        ),
+        pozycje AS (
+            -- Stan każdej pozycji na koniec dnia (ostatni zapisany stan z tego lub wcześniejszego dnia)
+            SELECT d.portfolio_id, d.data_sesji, m.instrument_id,
+                   MAX(m.ilosc_akcji) KEEP (DENSE_RANK LAST ORDER BY m.data_zmiany) AS ilosc,
+                   MAX(m.wartosc_zakupu) KEEP (DENSE_RANK LAST ORDER BY m.data_zmiany) AS koszt
+            FROM dni d
+            JOIN MIGAWKI_POZYCJI m
+              ON m.portfolio_id = d.portfolio_id
+             AND m.data_zmiany <= d.data_sesji
+            GROUP BY d.portfolio_id, d.data_sesji, m.instrument_id
+        ),
+        wyceny AS (
+            -- Wycena po ostatnim zamknięciu na dany dzień (bez notowania - po koszcie zakupu)
+            SELECT poz.portfolio_id, poz.data_sesji,
+                   SUM(NVL(poz.ilosc * c.cena_zamkniecia, poz.koszt)) AS wartosc_pozycji,
+                   SUM(poz.koszt) AS wartosc_zakupu,
+                   COUNT(*) AS liczba_pozycji
+            FROM pozycje poz
+            OUTER APPLY (
+                SELECT dd.cena_zamkniecia
+                FROM DANE_DZIENNE dd
+                WHERE dd.instrument_id = poz.instrument_id
+                  AND dd.data_notowan <= poz.data_sesji
+                ORDER BY dd.data_notowan DESC
+                FETCH FIRST 1 ROW ONLY
+            ) c
+            WHERE poz.ilosc > 0
+            GROUP BY poz.portfolio_id, poz.data_sesji
+        )
+        SELECT g.portfolio_id, g.data_sesji,
+               ROUND(g.saldo_gotowkowe, 2),
+               ROUND(NVL(w.wartosc_pozycji, 0), 2),
+               ROUND(NVL(w.wartosc_zakupu, 0), 2),
+               ROUND(NVL(w.wartosc_pozycji - w.wartosc_zakupu, 0), 2),
+               ROUND(g.saldo_gotowkowe + NVL(w.wartosc_pozycji, 0), 2),
+               NVL(w.liczba_pozycji, 0)
+        FROM gotowka g
+        LEFT JOIN wyceny w
+               ON w.portfolio_id = g.portfolio_id
+              AND w.data_sesji = g.data_sesji;
+        
+    EXCEPTION
+        WHEN OTHERS THEN
+            RAISE_APPLICATION_ERROR(-20006, 'Błąd podczas odświeżania migawek portfela: ' || SQLERRM);
+    END odswiez_migawki_portfeli;
+
     -- PROCEDURA: wykonaj_zlecenie_kupna
     PROCEDURE wykonaj_zlecenie_kupna(
         p_order_id IN NUMBER,
         p_cena_wykonania IN NUMBER,
         p_data_symulacji IN TIMESTAMP DEFAULT NULL,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE,
+        p_odswiez_migawki IN BOOLEAN DEFAULT TRUE
     ) IS
         v_portfolio_id NUMBER;
         v_instrument_id NUMBER;
@@ -376,6 +702,8 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
         v_nowa_srednia NUMBER;
         v_data_wykonania TIMESTAMP;
     BEGIN
+        -- Błąd wycofuje tylko zmiany tej procedury (p_zatwierdz = FALSE: transakcja wywołującego)
+        SAVEPOINT sp_zlecenie_kupna;
         -- Użyj podanej daty lub aktualnego czasu
         v_data_wykonania := NVL(p_data_symulacji, SYSTIMESTAMP);
         -- Pobierz dane zlecenia
@@ -461,7 +789,15 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
             data_wykonania = v_data_wykonania
         WHERE order_id = p_order_id;
         
-        COMMIT;
+        -- Przelicz migawki portfela od dnia transakcji; przy p_odswiez_migawki = FALSE
+        -- robi to raz wywołujący (zadania wsadowe), od najwcześniejszego dnia swoich transakcji
+        IF p_odswiez_migawki THEN
+            odswiez_migawki_portfeli(v_portfolio_id, TRUNC(v_data_wykonania));
+        END IF;
+        
+        IF p_zatwierdz THEN
+            COMMIT;
+        END IF;
         
         p_wynik := 'OK: Zlecenie kupna wykonane. Kupiono ' || v_ilosc || 
                    ' szt. po ' || p_cena_wykonania || ' ' || v_waluta ||
@@ -470,10 +806,10 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
     EXCEPTION
         WHEN NO_DATA_FOUND THEN
             p_wynik := 'BŁĄD: Nie znaleziono oczekującego zlecenia kupna o podanym ID';
-            ROLLBACK;
+            ROLLBACK TO sp_zlecenie_kupna;
         WHEN OTHERS THEN
             p_wynik := 'BŁĄD: ' || SQLERRM;
-            ROLLBACK;
+            ROLLBACK TO sp_zlecenie_kupna;
     END wykonaj_zlecenie_kupna;
 
     -- PROCEDURA: wykonaj_zlecenie_sprzedazy
@@ -481,7 +817,9 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
         p_order_id IN NUMBER,
         p_cena_wykonania IN NUMBER,
         p_data_symulacji IN TIMESTAMP DEFAULT NULL,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE,
+        p_odswiez_migawki IN BOOLEAN DEFAULT TRUE
     ) IS
         v_portfolio_id NUMBER;
         v_instrument_id NUMBER;
@@ -494,6 +832,8 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
         v_srednia_cena NUMBER;
         v_data_wykonania TIMESTAMP;
     BEGIN
+        -- Błąd wycofuje tylko zmiany tej procedury (p_zatwierdz = FALSE: transakcja wywołującego)
+        SAVEPOINT sp_zlecenie_sprzedazy;
         -- Użyj podanej daty lub aktualnego czasu
         v_data_wykonania := NVL(p_data_symulacji, SYSTIMESTAMP);
         -- Pobierz dane zlecenia
@@ -573,7 +913,15 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
             data_wykonania = v_data_wykonania
         WHERE order_id = p_order_id;
         
-        COMMIT;
+        -- Przelicz migawki portfela od dnia transakcji; przy p_odswiez_migawki = FALSE
+        -- robi to raz wywołujący (zadania wsadowe), od najwcześniejszego dnia swoich transakcji
+        IF p_odswiez_migawki THEN
+            odswiez_migawki_portfeli(v_portfolio_id, TRUNC(v_data_wykonania));
+        END IF;
+        
+        IF p_zatwierdz THEN
+            COMMIT;
+        END IF;
         
         p_wynik := 'OK: Zlecenie sprzedaży wykonane. Sprzedano ' || v_ilosc || 
                    ' szt. po ' || p_cena_wykonania || ' ' || v_waluta ||
@@ -582,40 +930,47 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
     EXCEPTION
         WHEN NO_DATA_FOUND THEN
             p_wynik := 'BŁĄD: Nie znaleziono oczekującego zlecenia sprzedaży o podanym ID';
-            ROLLBACK;
+            ROLLBACK TO sp_zlecenie_sprzedazy;
         WHEN OTHERS THEN
             p_wynik := 'BŁĄD: ' || SQLERRM;
-            ROLLBACK;
+            ROLLBACK TO sp_zlecenie_sprzedazy;
     END wykonaj_zlecenie_sprzedazy;
 
+    -- PROCEDURA PRYWATNA: przelicz_pozycje
+    -- Przelicza pozycje jednego portfela (lub wszystkich, gdy p_portfolio_id IS NULL)
+    -- jedną instrukcją MERGE z cenami z NOTOWANIA_BIEZACE; nie zatwierdza transakcji
+    PROCEDURE przelicz_pozycje(
+        p_portfolio_id IN NUMBER
+    ) IS
+    BEGIN
+        MERGE INTO POZYCJE p
+        USING (
+            SELECT poz.position_id,
+                   poz.ilosc_akcji * poz.srednia_cena_zakupu AS wartosc_zakupu,
+                   poz.ilosc_akcji * nb.cena_zamkniecia AS wartosc_biezaca
+            FROM POZYCJE poz
+            JOIN NOTOWANIA_BIEZACE nb ON nb.instrument_id = poz.instrument_id
+            WHERE (p_portfolio_id IS NULL OR poz.portfolio_id = p_portfolio_id)
+              AND poz.ilosc_akcji > 0
+        ) src
+        ON (p.position_id = src.position_id)
+        WHEN MATCHED THEN
+            UPDATE SET p.wartosc_biezaca = ROUND(src.wartosc_biezaca, 2),
+                       p.zysk_strata = ROUND(src.wartosc_biezaca - src.wartosc_zakupu, 2),
+                       -- To samo co oblicz_zysk_procent, bez przełączania kontekstu SQL/PL/SQL
+                       p.zysk_strata_procent = CASE
+                           WHEN NVL(src.wartosc_zakupu, 0) = 0 THEN 0
+                           ELSE ROUND((src.wartosc_biezaca - src.wartosc_zakupu) / src.wartosc_zakupu * 100, 4)
+                       END,
+                       p.data_ostatniej_zmiany = SYSTIMESTAMP;
+    END przelicz_pozycje;
+
     -- PROCEDURA: aktualizuj_pozycje_portfela
     PROCEDURE aktualizuj_pozycje_portfela(
         p_portfolio_id IN NUMBER
     ) IS
-        v_aktualna_cena NUMBER;
     BEGIN
-        -- Aktualizuj każdą pozycję w portfelu
-        FOR pozycja IN (
-            SELECT position_id, instrument_id, ilosc_akcji, srednia_cena_zakupu
-            FROM POZYCJE
-            WHERE portfolio_id = p_portfolio_id
-              AND ilosc_akcji > 0
-        ) LOOP
-            -- Pobierz aktualną cenę
-            v_aktualna_cena := pobierz_aktualna_cene(pozycja.instrument_id);
-            
-            IF v_aktualna_cena IS NOT NULL THEN
-                UPDATE POZYCJE
-                SET wartosc_biezaca = ROUND(pozycja.ilosc_akcji * v_aktualna_cena, 2),
-                    zysk_strata = ROUND(pozycja.ilosc_akcji * (v_aktualna_cena - pozycja.srednia_cena_zakupu), 2),
-                    zysk_strata_procent = oblicz_zysk_procent(
-                        pozycja.ilosc_akcji * pozycja.srednia_cena_zakupu,
-                        pozycja.ilosc_akcji * v_aktualna_cena
-                    ),
-                    data_ostatniej_zmiany = SYSTIMESTAMP
-                WHERE position_id = pozycja.position_id;
-            END IF;
-        END LOOP;
+        przelicz_pozycje(p_portfolio_id);
         
         COMMIT;
         
@@ -625,6 +980,22 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
             RAISE_APPLICATION_ERROR(-20003, 'Błąd podczas aktualizacji pozycji: ' || SQLERRM);
     END aktualizuj_pozycje_portfela;
 
+    -- PROCEDURA: aktualizuj_wszystkie_portfele
+    PROCEDURE aktualizuj_wszystkie_portfele(
+        p_od IN DATE DEFAULT NULL
+    ) IS
+    BEGIN
+        przelicz_pozycje(NULL);
+        odswiez_migawki_portfeli(NULL, p_od);
+        
+        COMMIT;
+        
+    EXCEPTION
+        WHEN OTHERS THEN
+            ROLLBACK;
+            RAISE_APPLICATION_ERROR(-20003, 'Błąd podczas aktualizacji pozycji: ' || SQLERRM);
+    END aktualizuj_wszystkie_portfele;
+
     -- PROCEDURA: wplac_srodki
 
     PROCEDURE wplac_srodki(
@@ -649,6 +1020,9 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
             RETURN;
         END IF;
         
+        -- Wpłata zmienia saldo wszystkich dni w migawkach
+        odswiez_migawki_portfeli(p_portfolio_id);
+        
         COMMIT;
         
         p_wynik := 'OK: Wpłacono ' || TO_CHAR(p_kwota, '999999999.99') || ' ' || v_waluta;
@@ -661,3 +1035,58 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda AS
 
 END pkg_gielda;
 /
+
+
+-- CZĘŚĆ 5: WYZWALACZE
+
+-- Wyzwalacz: trg_dane_dzienne_notowania
+-- Po każdej instrukcji zmieniającej DANE_DZIENNE (ładowanie danych, korekty, usunięcia)
+-- odświeża NOTOWANIA_BIEZACE dla instrumentów i KALENDARZ_SESJI dla dni, których dotyczyła zmiana
+CREATE OR REPLACE TRIGGER trg_dane_dzienne_notowania
+FOR INSERT OR UPDATE OR DELETE ON DANE_DZIENNE
+COMPOUND TRIGGER
+
+    -- Zbiory zmienionych instrumentów i dni (dni jako numer dnia juliańskiego)
+    TYPE t_zbior IS TABLE OF BOOLEAN INDEX BY PLS_INTEGER;
+    v_instrumenty t_zbior;
+    v_dni t_zbior;
+
+    AFTER EACH ROW IS
+    BEGIN
+        IF INSERTING OR UPDATING THEN
+            v_instrumenty(:NEW.instrument_id) := TRUE;
+            v_dni(TO_NUMBER(TO_CHAR(:NEW.data_notowan, 'J'))) := TRUE;
+        END IF;
+        IF DELETING OR UPDATING THEN
+            v_instrumenty(:OLD.instrument_id) := TRUE;
+            v_dni(TO_NUMBER(TO_CHAR(:OLD.data_notowan, 'J'))) := TRUE;
+        END IF;
+    END AFTER EACH ROW;
+
+    AFTER STATEMENT IS
+        v_instrument_id PLS_INTEGER := v_instrumenty.FIRST;
+        v_dzien PLS_INTEGER := v_dni.FIRST;
+    BEGIN
+        WHILE v_instrument_id IS NOT NULL LOOP
+            pkg_gielda.odswiez_notowania_biezace(v_instrument_id);
+            v_instrument_id := v_instrumenty.NEXT(v_instrument_id);
+        END LOOP;
+        WHILE v_dzien IS NOT NULL LOOP
+            pkg_gielda.odswiez_kalendarz_sesji(TO_DATE(TO_CHAR(v_dzien), 'J'));
+            v_dzien := v_dni.NEXT(v_dzien);
+        END LOOP;
+        v_instrumenty.DELETE;
+        v_dni.DELETE;
+    END AFTER STATEMENT;
+
+END trg_dane_dzienne_notowania;
+/
+
+-- Początkowe wypełnienie NOTOWANIA_BIEZACE, KALENDARZ_SESJI i MIGAWKI_PORTFELI (dla istniejących danych)
+BEGIN
+    pkg_gielda.odswiez_notowania_biezace;
+    pkg_gielda.odswiez_kalendarz_sesji;
+    pkg_gielda.odswiez_migawki_portfeli;
+    COMMIT;
+END;
+/
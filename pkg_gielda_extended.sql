@@ -57,20 +57,49 @@ CREATE OR REPLACE PACKAGE pkg_gielda_ext AS
         p_data_wygasniecia IN DATE DEFAULT NULL,
         p_data_utworzenia IN TIMESTAMP DEFAULT NULL,
         p_order_id OUT NUMBER,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
     );
 
     -- Anuluje oczekujące zlecenie
     PROCEDURE anuluj_zlecenie(
         p_order_id IN NUMBER,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
     );
 
     -- Przetwarza oczekujące zlecenia z limitem ceny
     PROCEDURE przetworz_zlecenia_limit(
         p_portfolio_id IN NUMBER,
         p_data_symulacji IN DATE,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
+    );
+
+    -- Kojarzy oczekujące zlecenia LIMIT z notowaniami z dni sesyjnych [p_od, p_do]
+    -- (wszystkie portfele lub jeden); każde zlecenie realizowane w pierwszym dniu spełniającym limit
+    PROCEDURE kojarz_zlecenia_limit(
+        p_od IN DATE DEFAULT NULL,
+        p_do IN DATE DEFAULT NULL,
+        p_portfolio_id IN NUMBER DEFAULT NULL,
+        p_sprawdzone OUT NUMBER,
+        p_spelnione OUT NUMBER,
+        p_wykonane OUT NUMBER,
+        p_czas_wyboru_ms OUT NUMBER,
+        p_czas_realizacji_ms OUT NUMBER,
+        p_wynik OUT VARCHAR2,
+        p_zrealizowane OUT SYS_REFCURSOR,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
+    );
+
+    -- Kojarzy oczekujące zlecenia LIMIT portfela z dni sesyjnych (p_od, p_do] - skok daty symulacji
+    PROCEDURE przetworz_zlecenia_limit_zakres(
+        p_portfolio_id IN NUMBER,
+        p_od IN DATE,
+        p_do IN DATE,
+        p_wynik OUT VARCHAR2,
+        p_wykonane OUT SYS_REFCURSOR,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
     );
 
     -- =========================================
@@ -83,12 +112,28 @@ CREATE OR REPLACE PACKAGE pkg_gielda_ext AS
         p_data IN DATE
     ) RETURN NUMBER;
 
-    -- Oblicza wartość portfela dla określonej daty (time travel)
+    -- Wartość portfela dla określonej daty z migawki MIGAWKI_PORTFELI (time travel)
     FUNCTION oblicz_wartosc_portfela_dla_daty(
         p_portfolio_id IN NUMBER,
         p_data IN DATE
     ) RETURN NUMBER;
 
+    -- Wartość portfela w jednym dniu sesyjnym
+    TYPE r_wartosc_portfela IS RECORD (
+        data_sesji DATE,
+        saldo_gotowkowe NUMBER,
+        wartosc_pozycji NUMBER,
+        wartosc_calkowita NUMBER
+    );
+    TYPE t_wartosci_portfela IS TABLE OF r_wartosc_portfela;
+
+    -- Zwraca wartość portfela dla każdego dnia sesyjnego z zakresu [p_od, p_do] z MIGAWKI_PORTFELI (funkcja potokowa)
+    FUNCTION wartosci_portfela_w_zakresie(
+        p_portfolio_id IN NUMBER,
+        p_od IN DATE,
+        p_do IN DATE
+    ) RETURN t_wartosci_portfela PIPELINED;
+
     -- =========================================
     -- FUNKCJE POMOCNICZE
     -- =========================================
@@ -209,6 +254,8 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
         VALUES (p_user_id, p_nazwa, UPPER(p_waluta), p_saldo_poczatkowe)
         RETURNING portfolio_id INTO p_portfolio_id;
 
+        pkg_gielda.odswiez_migawki_portfeli(p_portfolio_id);
+
         COMMIT;
 
         p_wynik := 'OK: Portfel utworzony pomyślnie';
@@ -253,6 +300,9 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
         SET saldo_gotowkowe = saldo_gotowkowe - p_kwota
         WHERE portfolio_id = p_portfolio_id;
 
+        -- Wypłata zmienia saldo wszystkich dni w migawkach
+        pkg_gielda.odswiez_migawki_portfeli(p_portfolio_id);
+
         COMMIT;
 
         p_wynik := 'OK: Wypłacono ' || TO_CHAR(p_kwota, '999999999.99') || ' ' || v_waluta;
@@ -278,12 +328,15 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
         p_data_wygasniecia IN DATE DEFAULT NULL,
         p_data_utworzenia IN TIMESTAMP DEFAULT NULL,
         p_order_id OUT NUMBER,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
     ) IS
         v_portfolio_exists NUMBER;
         v_instrument_exists NUMBER;
         v_data_utworzenia TIMESTAMP;
     BEGIN
+        -- Błąd wycofuje tylko zmiany tej procedury (p_zatwierdz = FALSE: transakcja wywołującego)
+        SAVEPOINT sp_utworz_zlecenie;
         -- Użyj podanej daty lub aktualnego czasu
         v_data_utworzenia := NVL(p_data_utworzenia, SYSTIMESTAMP);
         -- Walidacja typu zlecenia
@@ -347,7 +400,9 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
         )
         RETURNING order_id INTO p_order_id;
 
-        COMMIT;
+        IF p_zatwierdz THEN
+            COMMIT;
+        END IF;
 
         p_wynik := 'OK: Zlecenie utworzone (ID: ' || p_order_id || ')';
 
@@ -355,7 +410,7 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
         WHEN OTHERS THEN
             p_order_id := NULL;
             p_wynik := 'BŁĄD: ' || SQLERRM;
-            ROLLBACK;
+            ROLLBACK TO sp_utworz_zlecenie;
     END utworz_zlecenie;
 
     -- =========================================
@@ -363,10 +418,13 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
     -- =========================================
     PROCEDURE anuluj_zlecenie(
         p_order_id IN NUMBER,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
     ) IS
         v_status VARCHAR2(20);
     BEGIN
+        -- Błąd wycofuje tylko zmiany tej procedury (p_zatwierdz = FALSE: transakcja wywołującego)
+        SAVEPOINT sp_anuluj_zlecenie;
         -- Sprawdź status zlecenia
         SELECT status INTO v_status
         FROM ZLECENIA
@@ -383,7 +441,9 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
             data_wykonania = SYSTIMESTAMP
         WHERE order_id = p_order_id;
 
-        COMMIT;
+        IF p_zatwierdz THEN
+            COMMIT;
+        END IF;
 
         p_wynik := 'OK: Zlecenie anulowane';
 
@@ -392,7 +452,7 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
             p_wynik := 'BŁĄD: Nie znaleziono zlecenia';
         WHEN OTHERS THEN
             p_wynik := 'BŁĄD: ' || SQLERRM;
-            ROLLBACK;
+            ROLLBACK TO sp_anuluj_zlecenie;
     END anuluj_zlecenie;
 
     -- =========================================
@@ -401,13 +461,16 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
     PROCEDURE przetworz_zlecenia_limit(
         p_portfolio_id IN NUMBER,
         p_data_symulacji IN DATE,
-        p_wynik OUT VARCHAR2
+        p_wynik OUT VARCHAR2,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
     ) IS
         v_cena NUMBER;
         v_wykonane NUMBER := 0;
         v_wynik_zlecenia VARCHAR2(500);
     BEGIN
-        -- Przetwórz każde oczekujące zlecenie LIMIT
+        SAVEPOINT sp_zlecenia_limit;
+
+        -- Przetwórz każde oczekujące zlecenie LIMIT (bez zatwierdzania i przeliczania migawek po każdym z osobna)
         FOR zlecenie IN (
             SELECT order_id, instrument_id, strona_zlecenia, limit_ceny
             FROM ZLECENIA
@@ -423,13 +486,15 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
                 -- Sprawdź warunki wykonania
                 IF zlecenie.strona_zlecenia = 'KUPNO' AND v_cena <= zlecenie.limit_ceny THEN
                     -- Wykonaj zlecenie kupna
-                    pkg_gielda.wykonaj_zlecenie_kupna(zlecenie.order_id, v_cena, CAST(p_data_symulacji AS TIMESTAMP), v_wynik_zlecenia);
+                    pkg_gielda.wykonaj_zlecenie_kupna(zlecenie.order_id, v_cena, CAST(p_data_symulacji AS TIMESTAMP), v_wynik_zlecenia,
+                        p_zatwierdz => FALSE, p_odswiez_migawki => FALSE);
                     IF v_wynik_zlecenia LIKE 'OK%' THEN
                         v_wykonane := v_wykonane + 1;
                     END IF;
                 ELSIF zlecenie.strona_zlecenia = 'SPRZEDAZ' AND v_cena >= zlecenie.limit_ceny THEN
                     -- Wykonaj zlecenie sprzedaży
-                    pkg_gielda.wykonaj_zlecenie_sprzedazy(zlecenie.order_id, v_cena, CAST(p_data_symulacji AS TIMESTAMP), v_wynik_zlecenia);
+                    pkg_gielda.wykonaj_zlecenie_sprzedazy(zlecenie.order_id, v_cena, CAST(p_data_symulacji AS TIMESTAMP), v_wynik_zlecenia,
+                        p_zatwierdz => FALSE, p_odswiez_migawki => FALSE);
                     IF v_wynik_zlecenia LIKE 'OK%' THEN
                         v_wykonane := v_wykonane + 1;
                     END IF;
@@ -437,13 +502,219 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
             END IF;
         END LOOP;
 
+        -- Jedno przeliczenie migawek portfela od dnia symulacji
+        IF v_wykonane > 0 THEN
+            pkg_gielda.odswiez_migawki_portfeli(p_portfolio_id, TRUNC(p_data_symulacji));
+        END IF;
+
+        -- Jedno zatwierdzenie dla wszystkich wykonanych zleceń
+        IF p_zatwierdz THEN
+            COMMIT;
+        END IF;
+
         p_wynik := 'OK: Przetworzono zlecenia. Wykonano: ' || v_wykonane;
 
     EXCEPTION
         WHEN OTHERS THEN
             p_wynik := 'BŁĄD: ' || SQLERRM;
+            ROLLBACK TO sp_zlecenia_limit;
     END przetworz_zlecenia_limit;
 
+    -- =========================================
+    -- PROCEDURA: kojarz_zlecenia_limit
+    -- =========================================
+    PROCEDURE kojarz_zlecenia_limit(
+        p_od IN DATE DEFAULT NULL,
+        p_do IN DATE DEFAULT NULL,
+        p_portfolio_id IN NUMBER DEFAULT NULL,
+        p_sprawdzone OUT NUMBER,
+        p_spelnione OUT NUMBER,
+        p_wykonane OUT NUMBER,
+        p_czas_wyboru_ms OUT NUMBER,
+        p_czas_realizacji_ms OUT NUMBER,
+        p_wynik OUT VARCHAR2,
+        p_zrealizowane OUT SYS_REFCURSOR,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
+    ) IS
+        TYPE t_liczby IS TABLE OF NUMBER;
+        TYPE t_daty IS TABLE OF DATE;
+        TYPE t_strony IS TABLE OF ZLECENIA.strona_zlecenia%TYPE;
+        TYPE t_zbior IS TABLE OF BOOLEAN INDEX BY PLS_INTEGER;
+        TYPE t_dni_portfeli IS TABLE OF DATE INDEX BY PLS_INTEGER;
+        v_order_ids t_liczby := t_liczby();
+        v_portfele t_liczby := t_liczby();
+        v_strony t_strony := t_strony();
+        v_dni t_daty := t_daty();
+        v_ceny t_liczby := t_liczby();
+        v_sprawdzone t_zbior;
+        v_spelnione t_zbior;
+        v_zrealizowane t_zbior;
+        v_zrealizowane_ids SYS.ODCINUMBERLIST := SYS.ODCINUMBERLIST();
+        v_od_portfela t_dni_portfeli;
+        v_portfolio_id PLS_INTEGER;
+        v_od DATE;
+        v_do DATE;
+        v_start PLS_INTEGER;
+        v_wynik_zlecenia VARCHAR2(500);
+    BEGIN
+        SAVEPOINT sp_kojarz_zlecenia;
+        p_sprawdzone := 0;
+        p_spelnione := 0;
+        p_wykonane := 0;
+        p_czas_wyboru_ms := 0;
+        p_czas_realizacji_ms := 0;
+
+        -- Domyślnie ostatni dzień sesyjny; bez p_od - tylko dzień p_do
+        IF p_do IS NULL THEN
+            SELECT MAX(data_sesji) INTO v_do FROM KALENDARZ_SESJI;
+        ELSE
+            v_do := TRUNC(p_do);
+        END IF;
+        v_od := NVL(TRUNC(p_od), v_do);
+
+        IF v_do IS NOT NULL THEN
+            -- Jeden przebieg: oczekujące zlecenia LIMIT złączone z notowaniami z dni zakresu
+            -- od dnia złożenia zlecenia; zapamiętywane są dni spełniające warunek limitu,
+            -- chronologicznie, a w ramach dnia według czasu złożenia
+            v_start := DBMS_UTILITY.GET_TIME;
+            FOR kandydat IN (
+                SELECT z.order_id, z.portfolio_id, z.strona_zlecenia, dd.data_notowan, dd.cena_zamkniecia,
+                       CASE
+                           WHEN z.strona_zlecenia = 'KUPNO' AND dd.cena_zamkniecia <= z.limit_ceny THEN 1
+                           WHEN z.strona_zlecenia = 'SPRZEDAZ' AND dd.cena_zamkniecia >= z.limit_ceny THEN 1
+                           ELSE 0
+                       END AS spelnia
+                FROM ZLECENIA z
+                JOIN DANE_DZIENNE dd
+                  ON dd.instrument_id = z.instrument_id
+                 AND dd.data_notowan >= GREATEST(v_od, TRUNC(z.data_utworzenia))
+                 AND dd.data_notowan <= v_do
+                WHERE z.status = 'OCZEKUJACE'
+                  AND z.typ_zlecenia = 'LIMIT'
+                  AND (p_portfolio_id IS NULL OR z.portfolio_id = p_portfolio_id)
+                  AND (z.data_wygasniecia IS NULL OR z.data_wygasniecia >= dd.data_notowan)
+                ORDER BY dd.data_notowan, z.data_utworzenia, z.order_id
+            ) LOOP
+                v_sprawdzone(kandydat.order_id) := TRUE;
+                IF kandydat.spelnia = 1 THEN
+                    v_spelnione(kandydat.order_id) := TRUE;
+                    v_order_ids.EXTEND;
+                    v_order_ids(v_order_ids.COUNT) := kandydat.order_id;
+                    v_portfele.EXTEND;
+                    v_portfele(v_portfele.COUNT) := kandydat.portfolio_id;
+                    v_strony.EXTEND;
+                    v_strony(v_strony.COUNT) := kandydat.strona_zlecenia;
+                    v_dni.EXTEND;
+                    v_dni(v_dni.COUNT) := kandydat.data_notowan;
+                    v_ceny.EXTEND;
+                    v_ceny(v_ceny.COUNT) := kandydat.cena_zamkniecia;
+                END IF;
+            END LOOP;
+            p_sprawdzone := v_sprawdzone.COUNT;
+            p_spelnione := v_spelnione.COUNT;
+            p_czas_wyboru_ms := (DBMS_UTILITY.GET_TIME - v_start) * 10;
+
+            -- Zlecenie wykonuje się w pierwszym dniu spełniającym warunek, po cenie zamknięcia
+            -- tego dnia; jeśli wykonanie się nie powiedzie (np. brak środków), próbujemy
+            -- w kolejnym takim dniu (bez zatwierdzania i przeliczania migawek po każdym z osobna)
+            v_start := DBMS_UTILITY.GET_TIME;
+            FOR i IN 1 .. v_order_ids.COUNT LOOP
+                IF NOT v_zrealizowane.EXISTS(v_order_ids(i)) THEN
+                    IF v_strony(i) = 'KUPNO' THEN
+                        pkg_gielda.wykonaj_zlecenie_kupna(v_order_ids(i), v_ceny(i), CAST(v_dni(i) AS TIMESTAMP), v_wynik_zlecenia,
+                            p_zatwierdz => FALSE, p_odswiez_migawki => FALSE);
+                    ELSE
+                        pkg_gielda.wykonaj_zlecenie_sprzedazy(v_order_ids(i), v_ceny(i), CAST(v_dni(i) AS TIMESTAMP), v_wynik_zlecenia,
+                            p_zatwierdz => FALSE, p_odswiez_migawki => FALSE);
+                    END IF;
+                    IF v_wynik_zlecenia LIKE 'OK%' THEN
+                        v_zrealizowane(v_order_ids(i)) := TRUE;
+                        v_zrealizowane_ids.EXTEND;
+                        v_zrealizowane_ids(v_zrealizowane_ids.COUNT) := v_order_ids(i);
+                        -- Dni są chronologiczne, więc pierwsza transakcja portfela jest najwcześniejsza
+                        IF NOT v_od_portfela.EXISTS(v_portfele(i)) THEN
+                            v_od_portfela(v_portfele(i)) := v_dni(i);
+                        END IF;
+                    END IF;
+                END IF;
+            END LOOP;
+            p_wykonane := v_zrealizowane_ids.COUNT;
+
+            -- Jedno przeliczenie migawek na portfel, od dnia jego najwcześniejszej transakcji
+            v_portfolio_id := v_od_portfela.FIRST;
+            WHILE v_portfolio_id IS NOT NULL LOOP
+                pkg_gielda.odswiez_migawki_portfeli(v_portfolio_id, v_od_portfela(v_portfolio_id));
+                v_portfolio_id := v_od_portfela.NEXT(v_portfolio_id);
+            END LOOP;
+
+            -- Jedno zatwierdzenie dla wszystkich wykonanych zleceń
+            IF p_zatwierdz THEN
+                COMMIT;
+            END IF;
+            p_czas_realizacji_ms := (DBMS_UTILITY.GET_TIME - v_start) * 10;
+        END IF;
+
+        -- Wykonane zlecenia w kolejności realizacji
+        OPEN p_zrealizowane FOR
+            SELECT z.order_id, z.portfolio_id, z.strona_zlecenia, i.symbol, t.ilosc,
+                   t.cena_jednostkowa, t.data_transakcji
+            FROM TABLE(v_zrealizowane_ids) w
+            JOIN ZLECENIA z ON z.order_id = w.COLUMN_VALUE
+            JOIN INSTRUMENTY i ON i.instrument_id = z.instrument_id
+            JOIN TRANSAKCJE t ON t.order_id = z.order_id
+            ORDER BY t.data_transakcji, z.order_id;
+
+        IF v_do IS NULL THEN
+            p_wynik := 'OK: Brak dni sesyjnych';
+        ELSIF v_od = v_do THEN
+            p_wynik := 'OK: Skojarzono zlecenia z dnia ' || TO_CHAR(v_do, 'YYYY-MM-DD') ||
+                       '. Wykonano: ' || p_wykonane || '/' || p_spelnione;
+        ELSE
+            p_wynik := 'OK: Skojarzono zlecenia z dni ' || TO_CHAR(v_od, 'YYYY-MM-DD') ||
+                       ' - ' || TO_CHAR(v_do, 'YYYY-MM-DD') ||
+                       '. Wykonano: ' || p_wykonane || '/' || p_spelnione;
+        END IF;
+
+    EXCEPTION
+        WHEN OTHERS THEN
+            p_wynik := 'BŁĄD: ' || SQLERRM;
+            ROLLBACK TO sp_kojarz_zlecenia;
+    END kojarz_zlecenia_limit;
+
+    -- =========================================
+    -- PROCEDURA: przetworz_zlecenia_limit_zakres
+    -- =========================================
+    PROCEDURE przetworz_zlecenia_limit_zakres(
+        p_portfolio_id IN NUMBER,
+        p_od IN DATE,
+        p_do IN DATE,
+        p_wynik OUT VARCHAR2,
+        p_wykonane OUT SYS_REFCURSOR,
+        p_zatwierdz IN BOOLEAN DEFAULT TRUE
+    ) IS
+        v_sprawdzone NUMBER;
+        v_spelnione NUMBER;
+        v_wykonane NUMBER;
+        v_czas_wyboru_ms NUMBER;
+        v_czas_realizacji_ms NUMBER;
+    BEGIN
+        -- Poprzednia data symulacji była już przetworzona: kojarzenie od następnego dnia,
+        -- tylko dla zleceń tego portfela
+        kojarz_zlecenia_limit(
+            p_od => TRUNC(p_od) + 1,
+            p_do => p_do,
+            p_portfolio_id => p_portfolio_id,
+            p_sprawdzone => v_sprawdzone,
+            p_spelnione => v_spelnione,
+            p_wykonane => v_wykonane,
+            p_czas_wyboru_ms => v_czas_wyboru_ms,
+            p_czas_realizacji_ms => v_czas_realizacji_ms,
+            p_wynik => p_wynik,
+            p_zrealizowane => p_wykonane,
+            p_zatwierdz => p_zatwierdz
+        );
+    END przetworz_zlecenia_limit_zakres;
+
     -- =========================================
     -- FUNKCJA: pobierz_cene_dla_daty
     -- =========================================
@@ -476,38 +747,55 @@ CREATE OR REPLACE PACKAGE BODY pkg_gielda_ext AS
         p_portfolio_id IN NUMBER,
         p_data IN DATE
     ) RETURN NUMBER IS
-        v_wartosc_pozycji NUMBER := 0;
-        v_saldo_gotowkowe NUMBER := 0;
-        v_cena NUMBER;
+        v_wartosc NUMBER;
     BEGIN
-        -- Pobierz saldo gotówkowe
-        SELECT NVL(saldo_gotowkowe, 0)
-        INTO v_saldo_gotowkowe
-        FROM PORTFELE
-        WHERE portfolio_id = p_portfolio_id;
-
-        -- Oblicz wartość pozycji dla podanej daty
-        FOR pozycja IN (
-            SELECT instrument_id, ilosc_akcji
-            FROM POZYCJE
-            WHERE portfolio_id = p_portfolio_id
-              AND ilosc_akcji > 0
-        ) LOOP
-            v_cena := pobierz_cene_dla_daty(pozycja.instrument_id, p_data);
-            IF v_cena IS NOT NULL THEN
-                v_wartosc_pozycji := v_wartosc_pozycji + (pozycja.ilosc_akcji * v_cena);
-            END IF;
-        END LOOP;
+        -- Migawka z dnia p_data albo ostatnia przed nim: saldo i pozycje z tamtego dnia,
+        -- a nie bieżące PORTFELE i POZYCJE wycenione po historycznych cenach
+        SELECT wartosc_calkowita INTO v_wartosc
+        FROM MIGAWKI_PORTFELI
+        WHERE portfolio_id = p_portfolio_id
+          AND data_sesji <= p_data
+        ORDER BY data_sesji DESC
+        FETCH FIRST 1 ROW ONLY;
 
-        RETURN ROUND(v_saldo_gotowkowe + v_wartosc_pozycji, 2);
+        RETURN v_wartosc;
 
     EXCEPTION
         WHEN NO_DATA_FOUND THEN
-            RETURN 0;
-        WHEN OTHERS THEN
+            -- Brak migawki na ten dzień lub wcześniej: portfel nie miał jeszcze historii
             RETURN 0;
     END oblicz_wartosc_portfela_dla_daty;
 
+    -- =========================================
+    -- FUNKCJA: wartosci_portfela_w_zakresie
+    -- =========================================
+    FUNCTION wartosci_portfela_w_zakresie(
+        p_portfolio_id IN NUMBER,
+        p_od IN DATE,
+        p_do IN DATE
+    ) RETURN t_wartosci_portfela PIPELINED IS
+        v_wiersz r_wartosc_portfela;
+    BEGIN
+        -- Odczyt dziennych migawek: gotówka i pozycje odtworzone z historii transakcji,
+        -- a nie bieżące saldo i POZYCJE przyłożone do każdego dnia
+        FOR migawka IN (
+            SELECT data_sesji, saldo_gotowkowe, wartosc_pozycji, wartosc_calkowita
+            FROM MIGAWKI_PORTFELI
+            WHERE portfolio_id = p_portfolio_id
+              AND data_sesji >= TRUNC(p_od)
+              AND data_sesji <= p_do
+            ORDER BY data_sesji
+        ) LOOP
+            v_wiersz.data_sesji := migawka.data_sesji;
+            v_wiersz.saldo_gotowkowe := migawka.saldo_gotowkowe;
+            v_wiersz.wartosc_pozycji := migawka.wartosc_pozycji;
+            v_wiersz.wartosc_calkowita := migawka.wartosc_calkowita;
+            PIPE ROW (v_wiersz);
+        END LOOP;
+
+        RETURN;
+    END wartosci_portfela_w_zakresie;
+
     -- =========================================
     -- FUNKCJA: czy_login_istnieje
     -- =========================================
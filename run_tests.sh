@@ -72,7 +72,7 @@ fi
 echo -e "${GREEN}[1/2] Uruchamiam testy jednostkowe...${NC}"
 echo ""
 
-$PYTEST_CMD tests/test_validators.py tests/test_services.py tests/test_procedures.py
+$PYTEST_CMD tests/test_validators.py tests/test_services.py tests/test_procedures.py tests/test_connection.py
 
 UNIT_EXIT_CODE=$?
 
@@ -0,0 +1,265 @@
+"""
+Portfolio performance analytics.
+
+Returns and risk measures computed with NumPy/pandas from the daily value
+series of PortfolioHistoryService and benchmark closes from the price
+matrix (DANE_DZIENNE):
+
+- TWR (time-weighted) and MWR (money-weighted, IRR; annualized only for
+  periods of a year or more) returns
+- cumulative return and maximum drawdown
+- rolling and overall annualized volatility
+- Sharpe and Sortino ratios
+- beta versus an INDEKS-type instrument
+
+External cash flows (deposits and withdrawals) are not dated in the
+database, so the series carries none and MWR equals TWR (annualized over
+a year or more); the functions accept a flows array for when they are.
+
+Results are cached per (portfolio, date range) until the value series or
+the price matrix changes.
+"""
+
+from typing import Optional, Dict, Tuple
+from datetime import date
+import threading
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANALYTICS_CONFIG
+from services.portfolio_history import PortfolioHistoryService
+from services.price_matrix import PriceMatrixService
+
+
+def daily_returns(values: np.ndarray, flows: np.ndarray = None) -> np.ndarray:
+    """
+    Daily returns of a value series, net of external flows.
+
+    A flow on day t (positive = deposit) is counted in the value of day t,
+    so r_t = (V_t - F_t) / V_{t-1} - 1. Days after a zero value have a
+    return of 0; days after a missing value (NaN, e.g. a benchmark before
+    its first quote) have a NaN return.
+
+    Returns:
+        Array of len(values) - 1 returns
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return np.empty(0)
+    flows = np.zeros(len(values)) if flows is None else np.asarray(flows, dtype=np.float64)
+    previous = values[:-1]
+    return np.divide(values[1:] - flows[1:], previous,
+                     out=np.where(np.isnan(previous), np.nan, 1.0), where=previous > 0) - 1.0
+
+
+def time_weighted_return(returns: np.ndarray) -> float:
+    """Chain-linked return over the whole period."""
+    return float(np.prod(1.0 + returns) - 1.0) if len(returns) else 0.0
+
+
+def money_weighted_return(values: np.ndarray, flows: np.ndarray, days: np.ndarray) -> Optional[float]:
+    """
+    Internal rate of return of the portfolio.
+
+    The starting value is invested on the first day, flows are added on
+    their days and the final value is withdrawn on the last day. The rate
+    is annualized only for periods of a year or more; compounding a short
+    period up to a year would turn a few days' gain into a huge figure.
+
+    Returns:
+        Annual rate (period of a year or more) or the rate over the period,
+        or None if it is undefined (period shorter than a day, nothing invested)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    flows = np.zeros(len(values)) if flows is None else np.asarray(flows, dtype=np.float64)
+    days = np.asarray(days).astype('datetime64[D]')
+    if len(values) < 2 or values[0] <= 0:
+        return None
+    years = (days - days[0]).astype(np.float64) / 365.0
+    if years[-1] <= 0:
+        return None
+
+    # Cash flows from the investor's side: money in is negative
+    cash_flows = -flows.copy()
+    cash_flows[0] = -values[0]
+    cash_flows[-1] += values[-1]
+
+    def npv(rate: float) -> float:
+        return float(np.sum(cash_flows / np.power(1.0 + rate, years)))
+
+    low, high = -0.9999, 1.0
+    while npv(high) > 0 and high < 1e12:
+        high *= 10
+    if npv(low) * npv(high) > 0:
+        return None
+    for _ in range(200):
+        middle = (low + high) / 2
+        if npv(middle) > 0:
+            low = middle
+        else:
+            high = middle
+    rate = (low + high) / 2
+    return rate if years[-1] >= 1.0 else float((1.0 + rate) ** years[-1] - 1.0)
+
+
+def drawdowns(returns: np.ndarray) -> np.ndarray:
+    """Drop from the running peak of the growth of 1 after each return (0 or negative)."""
+    wealth = np.concatenate([[1.0], np.cumprod(1.0 + returns)])
+    return wealth / np.maximum.accumulate(wealth) - 1.0
+
+
+def rolling_volatility(returns: np.ndarray, window: int, trading_days: int) -> np.ndarray:
+    """Annualized standard deviation of returns over a rolling window (NaN until full)."""
+    return (pd.Series(returns).rolling(window).std() * np.sqrt(trading_days)).to_numpy()
+
+
+def sharpe_ratio(returns: np.ndarray, risk_free_daily: float, trading_days: int) -> Optional[float]:
+    """Annualized mean excess return over its standard deviation."""
+    if len(returns) < 2:
+        return None
+    excess = returns - risk_free_daily
+    deviation = np.std(excess, ddof=1)
+    return float(np.mean(excess) / deviation * np.sqrt(trading_days)) if deviation > 0 else None
+
+
+def sortino_ratio(returns: np.ndarray, risk_free_daily: float, trading_days: int) -> Optional[float]:
+    """Annualized mean excess return over the downside deviation."""
+    if len(returns) < 2:
+        return None
+    excess = returns - risk_free_daily
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+    return float(np.mean(excess) / downside * np.sqrt(trading_days)) if downside > 0 else None
+
+
+def beta(returns: np.ndarray, benchmark_returns: np.ndarray) -> Optional[float]:
+    """Covariance of returns with the benchmark over the benchmark variance."""
+    valid = np.isfinite(returns) & np.isfinite(benchmark_returns)
+    if valid.sum() < 2:
+        return None
+    portfolio, benchmark = returns[valid], benchmark_returns[valid]
+    variance = np.var(benchmark, ddof=1)
+    return float(np.cov(portfolio, benchmark, ddof=1)[0, 1] / variance) if variance > 0 else None
+
+
+def compute_analytics(history: pd.DataFrame, benchmark_closes: Optional[np.ndarray] = None,
+                      flows: np.ndarray = None) -> Dict:
+    """
+    Compute all measures for a value series.
+
+    Args:
+        history: Rows of PortfolioHistoryService.get_value_history (data, wartosc)
+        benchmark_closes: Benchmark closes for the same days (None = no beta)
+        flows: External flows per day (None = no flows)
+
+    Returns:
+        Dict with twr, mwr, zwrot_skumulowany, max_obsuniecie, zmiennosc,
+        sharpe, sortino, beta, dni and a 'szereg' DataFrame (data,
+        zwrot_skumulowany, obsuniecie, zmiennosc_kroczaca) for charts
+    """
+    trading_days = ANALYTICS_CONFIG['trading_days']
+    values = history['wartosc'].to_numpy(dtype=np.float64)
+    returns = daily_returns(values, flows)
+    risk_free_daily = (1.0 + ANALYTICS_CONFIG['risk_free_rate']) ** (1.0 / trading_days) - 1.0
+
+    growth = np.concatenate([[0.0], np.cumprod(1.0 + returns) - 1.0]) if len(values) else np.empty(0)
+    drawdown = drawdowns(returns) if len(values) else np.empty(0)
+    rolling = np.concatenate([[np.nan], rolling_volatility(returns, ANALYTICS_CONFIG['volatility_window'],
+                                                          trading_days)]) if len(values) else np.empty(0)
+
+    benchmark_beta = None
+    if benchmark_closes is not None and len(benchmark_closes) == len(values):
+        benchmark_beta = beta(returns, daily_returns(benchmark_closes))
+
+    return {
+        'twr': time_weighted_return(returns),
+        'mwr': money_weighted_return(values, flows, history['data'].to_numpy()) if len(values) else None,
+        'zwrot_skumulowany': float(values[-1] / values[0] - 1.0) if len(values) and values[0] > 0 else 0.0,
+        'max_obsuniecie': float(drawdown.min()) if len(drawdown) else 0.0,
+        'zmiennosc': float(np.std(returns, ddof=1) * np.sqrt(trading_days)) if len(returns) > 1 else None,
+        'sharpe': sharpe_ratio(returns, risk_free_daily, trading_days),
+        'sortino': sortino_ratio(returns, risk_free_daily, trading_days),
+        'beta': benchmark_beta,
+        'dni': len(values),
+        'szereg': pd.DataFrame({
+            'data': history['data'].to_numpy(),
+            'zwrot_skumulowany': growth,
+            'obsuniecie': drawdown,
+            'zmiennosc_kroczaca': rolling,
+        }),
+    }
+
+
+class AnalyticsService:
+    """Cached performance analytics per portfolio and date range."""
+
+    # (portfolio_id, start_date, end_date) -> (version, analytics)
+    _cache: Dict[tuple, Tuple[tuple, Dict]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_benchmark() -> Optional[Dict]:
+        """Get the benchmark instrument: ANALYTICS_CONFIG['benchmark_symbol'] or the first INDEKS."""
+        from services.market_service import MarketService
+
+        symbol = ANALYTICS_CONFIG['benchmark_symbol']
+        for instrument in MarketService.get_all_instruments():
+            if (instrument['symbol'] == symbol) if symbol else (instrument['typ_instrumentu'] == 'INDEKS'):
+                return instrument
+        return None
+
+    @staticmethod
+    def get_portfolio_analytics(portfolio_id: int, start_date: Optional[date] = None,
+                                end_date: Optional[date] = None) -> Optional[Dict]:
+        """
+        Get performance analytics of a portfolio for a date range.
+
+        Args:
+            portfolio_id: Portfolio ID
+            start_date: First day (None = day of the first transaction)
+            end_date: Last day (None = last trading day)
+
+        Returns:
+            compute_analytics() dict plus 'benchmark' (symbol or None), or
+            None if the range has fewer than two trading days
+        """
+        history = PortfolioHistoryService.get_value_history(portfolio_id, start_date, end_date)
+        if len(history) < 2:
+            return None
+
+        matrix = PriceMatrixService.get_matrix()
+        values = history['wartosc'].to_numpy(dtype=np.float64)
+        key = (portfolio_id, start_date, end_date)
+        version = (len(values), hash(values.tobytes()), matrix.last_row_id)
+        with AnalyticsService._lock:
+            cached = AnalyticsService._cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        benchmark = AnalyticsService.get_benchmark()
+        benchmark_closes = None
+        if benchmark is not None:
+            days = pd.to_datetime(history['data'])
+            bench_days, closes = matrix.price_range(benchmark['instrument_id'], days.iloc[0], days.iloc[-1])
+            benchmark_closes = (
+                pd.Series(closes, index=pd.to_datetime(bench_days)).reindex(days).to_numpy()
+            )
+
+        analytics = compute_analytics(history, benchmark_closes)
+        analytics['benchmark'] = benchmark['symbol'] if benchmark is not None else None
+
+        with AnalyticsService._lock:
+            AnalyticsService._cache[key] = (version, analytics)
+        return analytics
+
+    @staticmethod
+    def invalidate(portfolio_id: Optional[int] = None):
+        """Drop cached analytics of one portfolio, or of all portfolios."""
+        with AnalyticsService._lock:
+            if portfolio_id is None:
+                AnalyticsService._cache.clear()
+            else:
+                for key in [key for key in AnalyticsService._cache if key[0] == portfolio_id]:
+                    del AnalyticsService._cache[key]
@@ -8,13 +8,31 @@ import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from db.connection import get_db_connection, execute_query_dict, execute_dml
+from db.connection import get_db_connection, execute_query_dict, execute_dml, execute_many
+from db.queries import Queries
+from db.procedures import Procedures
+from services.order_service import OrderService
+from services.reference_cache import reference_cache
+from services.price_matrix import PriceMatrixService
+from services.indicators import IndicatorService
 from utils.yahoo_finance import (
     get_default_stocks, get_sector_definitions, fetch_multiple_stocks,
     get_2025_date_range
 )
 
 
+# ORA-00001: the row already exists (uk_dane_dzienne)
+UNIQUE_VIOLATION = 1
+
+INSERT_DAILY_PRICE = """
+    INSERT INTO DANE_DZIENNE (instrument_id, data_notowan,
+        cena_otwarcia, cena_max, cena_min,
+        cena_zamkniecia, wolumen)
+    VALUES (:instrument_id, :data_notowan,
+        :open, :high, :low, :close, :volume)
+"""
+
+
 class DataLoader:
     """Service for loading market data into the database."""
 
@@ -197,6 +215,10 @@ class DataLoader:
             total = len(symbols)
             loaded_count = 0
             records_inserted = 0
+            failed_rows = 0
+            # Range of days with new bars - limit orders are matched against it
+            # and snapshots from the first day on are recalculated
+            first_loaded_date = last_loaded_date = None
 
             # Fetch data from Yahoo Finance
             stock_data = fetch_multiple_stocks(symbols, start_date, end_date)
@@ -209,44 +231,55 @@ class DataLoader:
                 if not instrument_id:
                     continue
 
-                # Insert each row
-                for _, row in df.iterrows():
-                    try:
-                        # Check if data exists
-                        existing = execute_query_dict("""
-                            SELECT daily_data_id FROM DANE_DZIENNE
-                            WHERE instrument_id = :instrument_id
-                              AND data_notowan = :data_notowan
-                        """, {
-                            'instrument_id': instrument_id,
-                            'data_notowan': row['data']
-                        })
-
-                        if not existing:
-                            execute_dml("""
-                                INSERT INTO DANE_DZIENNE (instrument_id, data_notowan,
-                                    cena_otwarcia, cena_max, cena_min,
-                                    cena_zamkniecia, wolumen)
-                                VALUES (:instrument_id, :data_notowan,
-                                    :open, :high, :low, :close, :volume)
-                            """, {
-                                'instrument_id': instrument_id,
-                                'data_notowan': row['data'],
-                                'open': float(row['open']),
-                                'high': float(row['high']),
-                                'low': float(row['low']),
-                                'close': float(row['close']),
-                                'volume': int(row['volume'])
-                            })
-                            records_inserted += 1
-
-                    except Exception as row_error:
-                        # Skip individual row errors
-                        continue
+                # Insert all rows in array-bound batches; rows that already
+                # exist are rejected by uk_dane_dzienne and skipped
+                rows = [
+                    {
+                        'instrument_id': instrument_id,
+                        'data_notowan': data_notowan,
+                        'open': float(open_), 'high': float(high),
+                        'low': float(low), 'close': float(close),
+                        'volume': int(volume)
+                    }
+                    for data_notowan, open_, high, low, close, volume in zip(
+                        df['data'], df['open'], df['high'], df['low'], df['close'], df['volume']
+                    )
+                ]
+                inserted, errors = execute_many(INSERT_DAILY_PRICE, rows)
+                records_inserted += inserted
+                if inserted:
+                    rejected = {error['row'] for error in errors}
+                    days = [row['data_notowan'] for i, row in enumerate(rows) if i not in rejected]
+                    first_day, last_day = min(days), max(days)
+                    first_loaded_date = first_day if first_loaded_date is None else min(first_loaded_date, first_day)
+                    last_loaded_date = last_day if last_loaded_date is None else max(last_loaded_date, last_day)
+                failed_rows += sum(1 for error in errors if error['code'] != UNIQUE_VIOLATION)
 
                 loaded_count += 1
 
+            revalued, revalue_message = True, ""
+            matched, match_message = True, ""
+            if records_inserted:
+                # The next as-of lookup loads just the new bars into the matrix
+                PriceMatrixService.mark_stale()
+                # Indicators of the new bars are computed from the stored tail
+                IndicatorService.mark_stale()
+                # Match pending limit orders of all portfolios against the new bars;
+                # each order is filled on its first loaded day that meets the limit
+                matched, match_message, _ = OrderService.match_all_limit_orders(
+                    first_loaded_date, last_loaded_date
+                )
+                # Revalue every portfolio at the new latest prices in one MERGE
+                # and recalculate their daily snapshots from the first new day
+                revalued, revalue_message = Procedures.update_all_portfolios(first_loaded_date)
+
             message = f"Załadowano dane dla {loaded_count}/{total} instrumentów. Dodano {records_inserted} rekordów."
+            if failed_rows:
+                message += f" Odrzucono {failed_rows} błędnych rekordów."
+            if match_message:
+                message += f" {match_message}." if matched else f" Nie udało się skojarzyć zleceń LIMIT: {match_message}"
+            if not revalued:
+                message += f" Nie udało się przeliczyć pozycji portfeli: {revalue_message}"
             return True, message
 
         except Exception as e:
@@ -263,6 +296,15 @@ class DataLoader:
         Returns:
             Tuple of (success, list of messages)
         """
+        try:
+            return DataLoader._initialize_steps(progress_callback)
+        finally:
+            # Even a failed run may have changed reference data
+            reference_cache.invalidate()
+
+    @staticmethod
+    def _initialize_steps(progress_callback=None) -> Tuple[bool, List[str]]:
+        """Run the steps of initialize_all."""
         messages = []
 
         # Step 1: Initialize exchange
@@ -335,11 +377,8 @@ class DataLoader:
             result = execute_query_dict("SELECT COUNT(*) as cnt FROM DANE_DZIENNE")
             status['price_records_count'] = result[0]['cnt'] if result else 0
 
-            # Get date range
-            result = execute_query_dict("""
-                SELECT MIN(data_notowan) as min_date, MAX(data_notowan) as max_date
-                FROM DANE_DZIENNE
-            """)
+            # Get date range from the trading calendar
+            result = execute_query_dict(Queries.GET_DATE_RANGE)
             if result and result[0]['min_date']:
                 status['date_range'] = (result[0]['min_date'], result[0]['max_date'])
             else:
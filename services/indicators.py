@@ -0,0 +1,207 @@
+"""
+Technical indicators cache.
+
+SMA, EMA, RSI, MACD, Bollinger Bands and ATR of every instrument are
+computed with pandas/NumPy and kept in a process-wide columnar cache (one
+DataFrame per instrument). Like the price matrix, the cache loads only bars
+with a daily_data_id above the highest one already loaded. Bars appended
+after an instrument's last day are computed from the stored tail: rolling
+indicators reuse the last window of closes and the exponential ones
+(EMA, RSI, MACD, ATR) continue from their last values, so the result
+equals a full recomputation. Back-filled bars recompute that instrument.
+
+Charts read the stored columns instead of recomputing indicators on each
+render.
+"""
+
+from typing import Optional, Dict
+from datetime import date
+import threading
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import INDICATOR_CONFIG
+from db.connection import execute_query_frame
+from db.queries import Queries
+
+
+SMA_PERIODS = (20, 50)
+EMA_PERIOD = 20
+RSI_PERIOD = 14
+MACD_PERIODS = (12, 26, 9)
+BOLLINGER_PERIOD, BOLLINGER_WIDTH = 20, 2.0
+ATR_PERIOD = 14
+
+BAR_COLUMNS = ['data', 'open', 'high', 'low', 'close']
+INDICATOR_COLUMNS = [
+    'sma_20', 'sma_50', 'ema_20', 'bb_gorna', 'bb_dolna',
+    'rsi_14', 'macd', 'macd_sygnal', 'macd_histogram', 'atr_14',
+]
+# Running values carried between incremental updates
+STATE_COLUMNS = ['ema_12', 'ema_26', 'sredni_zysk', 'srednia_strata']
+# Closes kept from the stored tail for the rolling windows
+WARMUP_BARS = max(SMA_PERIODS + (BOLLINGER_PERIOD,)) - 1
+
+
+def _ewm(values: np.ndarray, alpha: float, seed: float = np.nan) -> np.ndarray:
+    """Exponential moving average (adjust=False), continuing from seed when given."""
+    if np.isnan(seed):
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return pd.Series(np.concatenate([[seed], values])).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def compute_indicators(bars: pd.DataFrame, previous: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Compute indicators for bars of one instrument.
+
+    Args:
+        bars: Bars sorted by day with data, open, high, low and close
+        previous: Stored frame of the instrument whose last day is before
+            the first new bar (None = compute from scratch)
+
+    Returns:
+        bars with INDICATOR_COLUMNS and STATE_COLUMNS added
+    """
+    bars = bars[BAR_COLUMNS].reset_index(drop=True)
+    close = bars['close'].to_numpy(dtype=np.float64)
+    high = bars['high'].to_numpy(dtype=np.float64)
+    low = bars['low'].to_numpy(dtype=np.float64)
+    has_previous = previous is not None and len(previous) > 0
+
+    def last(column: str) -> float:
+        return float(previous[column].iloc[-1]) if has_previous else np.nan
+
+    previous_close = np.concatenate([[last('close')], close[:-1]])
+    result = bars.copy()
+
+    # Rolling windows over the stored tail + new closes
+    tail = previous['close'].to_numpy(dtype=np.float64)[-WARMUP_BARS:] if has_previous else np.empty(0)
+    window = pd.Series(np.concatenate([tail, close]))
+    for period in SMA_PERIODS:
+        result[f'sma_{period}'] = window.rolling(period).mean().to_numpy()[len(tail):]
+    middle = window.rolling(BOLLINGER_PERIOD).mean().to_numpy()[len(tail):]
+    deviation = window.rolling(BOLLINGER_PERIOD).std(ddof=0).to_numpy()[len(tail):]
+    result['bb_gorna'] = middle + BOLLINGER_WIDTH * deviation
+    result['bb_dolna'] = middle - BOLLINGER_WIDTH * deviation
+
+    result['ema_20'] = _ewm(close, 2.0 / (EMA_PERIOD + 1), last('ema_20'))
+
+    # MACD
+    fast, slow, signal = MACD_PERIODS
+    result['ema_12'] = _ewm(close, 2.0 / (fast + 1), last('ema_12'))
+    result['ema_26'] = _ewm(close, 2.0 / (slow + 1), last('ema_26'))
+    result['macd'] = result['ema_12'] - result['ema_26']
+    result['macd_sygnal'] = _ewm(result['macd'].to_numpy(), 2.0 / (signal + 1), last('macd_sygnal'))
+    result['macd_histogram'] = result['macd'] - result['macd_sygnal']
+
+    # RSI (Wilder smoothing)
+    change = close - previous_close
+    result['sredni_zysk'] = _ewm(np.where(np.isnan(change), np.nan, np.maximum(change, 0.0)),
+                                 1.0 / RSI_PERIOD, last('sredni_zysk'))
+    result['srednia_strata'] = _ewm(np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0)),
+                                    1.0 / RSI_PERIOD, last('srednia_strata'))
+    gain, loss = result['sredni_zysk'].to_numpy(), result['srednia_strata'].to_numpy()
+    result['rsi_14'] = np.where(
+        loss > 0, 100.0 - 100.0 / (1.0 + np.divide(gain, loss, out=np.zeros_like(gain), where=loss > 0)),
+        np.where(gain > 0, 100.0, np.nan)
+    )
+
+    # ATR (Wilder smoothing of the true range)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    result['atr_14'] = _ewm(true_range, 1.0 / ATR_PERIOD, last('atr_14'))
+
+    return result[BAR_COLUMNS + INDICATOR_COLUMNS + STATE_COLUMNS]
+
+
+class IndicatorService:
+    """Process-wide technical indicators loaded from DANE_DZIENNE."""
+
+    _frames: Optional[Dict[int, pd.DataFrame]] = None
+    _last_row_id = 0
+    _refreshed_at: float = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_indicators(instrument_id: int, start_date: Optional[date] = None,
+                       end_date: Optional[date] = None) -> pd.DataFrame:
+        """
+        Get stored indicators of an instrument for [start_date, end_date].
+
+        Returns:
+            DataFrame with data and INDICATOR_COLUMNS (empty if the instrument
+            has no bars)
+        """
+        with IndicatorService._lock:
+            age = time.monotonic() - IndicatorService._refreshed_at
+            if IndicatorService._frames is None or age >= INDICATOR_CONFIG['refresh_seconds']:
+                IndicatorService._refresh_locked()
+            frame = IndicatorService._frames.get(int(instrument_id))
+
+        if frame is None:
+            return pd.DataFrame(columns=['data'] + INDICATOR_COLUMNS)
+        mask = np.ones(len(frame), dtype=bool)
+        if start_date is not None:
+            mask &= (frame['data'] >= pd.Timestamp(start_date)).to_numpy()
+        if end_date is not None:
+            mask &= (frame['data'] <= pd.Timestamp(end_date)).to_numpy()
+        return frame.loc[mask, ['data'] + INDICATOR_COLUMNS].reset_index(drop=True)
+
+    @staticmethod
+    def refresh() -> int:
+        """
+        Load bars added since the last refresh and compute their indicators.
+
+        Returns:
+            Number of bars loaded
+        """
+        with IndicatorService._lock:
+            return IndicatorService._refresh_locked()
+
+    @staticmethod
+    def _refresh_locked() -> int:
+        """Load new bars into the cache (caller holds the lock)."""
+        df = execute_query_frame(Queries.GET_BARS_SINCE, {'last_id': IndicatorService._last_row_id})
+        # Readers keep the frames they already hold; updated frames go into a new dict
+        frames = dict(IndicatorService._frames or {})
+        if not df.empty:
+            df = df.rename(columns={
+                'data_notowan': 'data', 'cena_otwarcia': 'open', 'cena_max': 'high',
+                'cena_min': 'low', 'cena_zamkniecia': 'close',
+            })
+            df['data'] = pd.to_datetime(df['data'])
+            for instrument_id, bars in df.groupby('instrument_id', sort=False):
+                bars = bars.sort_values('data')
+                previous = frames.get(int(instrument_id))
+                if previous is None or bars['data'].iloc[0] > previous['data'].iloc[-1]:
+                    computed = compute_indicators(bars, previous)
+                    frames[int(instrument_id)] = (
+                        computed if previous is None
+                        else pd.concat([previous, computed], ignore_index=True)
+                    )
+                else:
+                    # Back-filled or corrected days: recompute the instrument
+                    merged = pd.concat([previous[BAR_COLUMNS], bars[BAR_COLUMNS]])
+                    merged = merged.drop_duplicates('data', keep='last').sort_values('data')
+                    frames[int(instrument_id)] = compute_indicators(merged)
+            IndicatorService._last_row_id = max(IndicatorService._last_row_id, int(df['daily_data_id'].max()))
+        IndicatorService._frames = frames
+        IndicatorService._refreshed_at = time.monotonic()
+        return len(df)
+
+    @staticmethod
+    def mark_stale():
+        """Make the next lookup load new bars (e.g. after DataLoader inserts)."""
+        with IndicatorService._lock:
+            IndicatorService._refreshed_at = 0.0
+
+    @staticmethod
+    def invalidate():
+        """Drop the cache; the next lookup reloads every instrument."""
+        with IndicatorService._lock:
+            IndicatorService._frames = None
+            IndicatorService._last_row_id = 0
+            IndicatorService._refreshed_at = 0.0
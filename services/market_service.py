@@ -2,15 +2,25 @@
 Market data service.
 """
 
-from typing import Optional, List, Dict, Tuple
-from datetime import date
+from typing import Optional, List, Dict, Tuple, Iterator
+from datetime import date, datetime
 import sys
 import os
+import json
+import pandas as pd
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from db.connection import execute_query_dict, execute_query
+from db.connection import (
+    execute_query_dict, execute_query, execute_query_records, iter_query_dict, execute_query_frame
+)
 from db.queries import Queries
 from db.procedures import Procedures
+from services.reference_cache import reference_cache, INSTRUMENTS, SECTORS, EXCHANGES, DATE_RANGE
+from services.price_matrix import PriceMatrixService
+
+
+# OHLC columns of DANE_DZIENNE fetched as float
+PRICE_FLOAT_FIELDS = ('cena_otwarcia', 'cena_max', 'cena_min', 'cena_zamkniecia')
 
 
 class MarketService:
@@ -18,8 +28,10 @@ class MarketService:
 
     @staticmethod
     def get_all_instruments() -> List[Dict]:
-        """Get all active instruments."""
-        return execute_query_dict(Queries.GET_ALL_INSTRUMENTS)
+        """Get all active instruments as records (cached, do not modify)."""
+        return reference_cache.get_or_load(
+            INSTRUMENTS, lambda: execute_query_records(Queries.GET_ALL_INSTRUMENTS)
+        )
 
     @staticmethod
     def get_instrument_by_id(instrument_id: int) -> Optional[Dict]:
@@ -49,13 +61,17 @@ class MarketService:
 
     @staticmethod
     def get_all_sectors() -> List[Dict]:
-        """Get all sectors."""
-        return execute_query_dict(Queries.GET_ALL_SECTORS)
+        """Get all sectors (cached, do not modify)."""
+        return reference_cache.get_or_load(
+            SECTORS, lambda: execute_query_dict(Queries.GET_ALL_SECTORS)
+        )
 
     @staticmethod
     def get_all_exchanges() -> List[Dict]:
-        """Get all exchanges."""
-        return execute_query_dict(Queries.GET_ALL_EXCHANGES)
+        """Get all exchanges (cached, do not modify)."""
+        return reference_cache.get_or_load(
+            EXCHANGES, lambda: execute_query_dict(Queries.GET_ALL_EXCHANGES)
+        )
 
     @staticmethod
     def get_current_price(instrument_id: int) -> Optional[float]:
@@ -64,7 +80,9 @@ class MarketService:
 
     @staticmethod
     def get_price_for_date(instrument_id: int, target_date: date) -> Optional[float]:
-        """Get price for a specific date."""
+        """Get price for a specific date (last close on or before it)."""
+        if PriceMatrixService.enabled():
+            return PriceMatrixService.price_as_of(instrument_id, target_date)
         return Procedures.get_price_for_date(instrument_id, target_date)
 
     @staticmethod
@@ -85,10 +103,56 @@ class MarketService:
         )
         return results[0] if results else None
 
+    @staticmethod
+    def get_prices_for_date(instrument_ids: List[int], price_date: date) -> Dict[int, float]:
+        """
+        Get closing prices of many instruments for a date (time travel) in one lookup.
+
+        Uses the last quote on or before the date, as get_price_for_date,
+        from the price matrix or, when it is disabled, one query.
+
+        Returns:
+            Dict of instrument_id -> price; instruments without quotes are omitted
+        """
+        if not instrument_ids:
+            return {}
+        if PriceMatrixService.enabled():
+            return PriceMatrixService.prices_as_of(instrument_ids, price_date)
+        results = execute_query(
+            Queries.GET_PRICES_FOR_DATE,
+            {'instrument_ids': json.dumps([int(i) for i in instrument_ids]), 'data_notowan': price_date}
+        )
+        return {int(instrument_id): float(price) for instrument_id, price in results if price}
+
     @staticmethod
     def get_price_history(instrument_id: int, start_date: date, end_date: date) -> List[Dict]:
-        """Get price history for a date range."""
-        return execute_query_dict(
+        """Get price history for a date range as records with float prices."""
+        return execute_query_records(
+            Queries.GET_PRICE_HISTORY,
+            {
+                'instrument_id': instrument_id,
+                'start_date': start_date,
+                'end_date': end_date
+            },
+            float_fields=PRICE_FLOAT_FIELDS
+        )
+
+    @staticmethod
+    def get_price_history_frame(instrument_id: int, start_date: date, end_date: date) -> pd.DataFrame:
+        """Get price history for a date range as a typed DataFrame."""
+        return execute_query_frame(
+            Queries.GET_PRICE_HISTORY,
+            {
+                'instrument_id': instrument_id,
+                'start_date': start_date,
+                'end_date': end_date
+            }
+        )
+
+    @staticmethod
+    def iter_price_history(instrument_id: int, start_date: date, end_date: date) -> Iterator[Dict]:
+        """Stream price history for a date range without materializing it."""
+        return iter_query_dict(
             Queries.GET_PRICE_HISTORY,
             {
                 'instrument_id': instrument_id,
@@ -113,7 +177,12 @@ class MarketService:
 
     @staticmethod
     def get_date_range() -> Tuple[Optional[date], Optional[date]]:
-        """Get min and max dates with price data."""
+        """Get min and max dates with price data (cached)."""
+        return reference_cache.get_or_load(DATE_RANGE, MarketService._load_date_range)
+
+    @staticmethod
+    def _load_date_range() -> Tuple[Optional[date], Optional[date]]:
+        """Query min and max dates with price data."""
         results = execute_query(Queries.GET_DATE_RANGE)
         if results and results[0]:
             return results[0][0], results[0][1]
@@ -128,45 +197,37 @@ class MarketService:
         )
         return [row[0] for row in results]
 
+    @staticmethod
+    def get_next_trading_day(after_date: date) -> Optional[date]:
+        """Get the first trading day after a date, or None if there is none."""
+        results = execute_query(Queries.GET_NEXT_TRADING_DAY, {'data_sesji': after_date})
+        return MarketService._as_date(results[0][0]) if results else None
+
+    @staticmethod
+    def get_previous_trading_day(before_date: date) -> Optional[date]:
+        """Get the last trading day before a date, or None if there is none."""
+        results = execute_query(Queries.GET_PREVIOUS_TRADING_DAY, {'data_sesji': before_date})
+        return MarketService._as_date(results[0][0]) if results else None
+
+    @staticmethod
+    def _as_date(value) -> Optional[date]:
+        """Convert an Oracle DATE (fetched as datetime) to a date."""
+        return value.date() if isinstance(value, datetime) else value
+
     @staticmethod
     def get_instruments_with_prices(target_date: date = None) -> List[Dict]:
         """
-        Get all instruments with their current prices.
+        Get all instruments with their current prices in one query.
         If target_date is provided, uses prices from that date.
+
+        Each record has the GET_ALL_INSTRUMENTS fields plus the OHLCV of the
+        last quote on or before the date and the daily change (zmiana,
+        zmiana_procent). Price fields are None for instruments without quotes.
         """
-        instruments = MarketService.get_all_instruments()
-
-        for inst in instruments:
-            instrument_id = inst['instrument_id']
-
-            if target_date:
-                price_data = MarketService.get_price_data_for_date(instrument_id, target_date)
-            else:
-                price_data = MarketService.get_latest_price_data(instrument_id)
-
-            if price_data:
-                inst['cena_zamkniecia'] = price_data.get('cena_zamkniecia')
-                inst['cena_otwarcia'] = price_data.get('cena_otwarcia')
-                inst['cena_max'] = price_data.get('cena_max')
-                inst['cena_min'] = price_data.get('cena_min')
-                inst['wolumen'] = price_data.get('wolumen')
-                inst['data_notowan'] = price_data.get('data_notowan')
-
-                # Calculate daily change
-                if price_data.get('cena_otwarcia') and price_data.get('cena_zamkniecia'):
-                    open_price = float(price_data['cena_otwarcia'])
-                    close_price = float(price_data['cena_zamkniecia'])
-                    inst['zmiana'] = close_price - open_price
-                    if open_price > 0:
-                        inst['zmiana_procent'] = ((close_price - open_price) / open_price) * 100
-                    else:
-                        inst['zmiana_procent'] = 0
-                else:
-                    inst['zmiana'] = 0
-                    inst['zmiana_procent'] = 0
-            else:
-                inst['cena_zamkniecia'] = None
-                inst['zmiana'] = None
-                inst['zmiana_procent'] = None
-
-        return instruments
+        if target_date is None:
+            # Latest prices come from the NOTOWANIA_BIEZACE snapshot table
+            return execute_query_records(Queries.GET_INSTRUMENTS_WITH_LATEST_PRICES)
+        return execute_query_records(
+            Queries.GET_INSTRUMENTS_WITH_PRICES,
+            {'data_notowan': target_date}
+        )
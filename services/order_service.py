@@ -2,15 +2,18 @@
 Order management service.
 """
 
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Iterator
 from datetime import date
 import sys
 import os
+import time
+import pandas as pd
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from db.connection import execute_query_dict
+from db.connection import execute_query_dict, iter_query_dict, execute_query_frame, unit_of_work
 from db.queries import Queries
 from db.procedures import Procedures, create_and_execute_market_order
+from services.position_ledger import PositionLedgerService
 from config import APP_CONFIG
 
 
@@ -41,6 +44,22 @@ class OrderService:
             {'portfolio_id': portfolio_id}
         )
 
+    @staticmethod
+    def get_orders_frame(portfolio_id: int) -> pd.DataFrame:
+        """Get all orders for a portfolio as a typed DataFrame."""
+        return execute_query_frame(
+            Queries.GET_ORDERS_BY_PORTFOLIO,
+            {'portfolio_id': portfolio_id}
+        )
+
+    @staticmethod
+    def get_executed_orders_frame(portfolio_id: int) -> pd.DataFrame:
+        """Get executed orders for a portfolio as a typed DataFrame."""
+        return execute_query_frame(
+            Queries.GET_EXECUTED_ORDERS,
+            {'portfolio_id': portfolio_id}
+        )
+
     @staticmethod
     def get_order_by_id(order_id: int) -> Optional[Dict]:
         """Get order details by ID."""
@@ -91,9 +110,12 @@ class OrderService:
         """
         from datetime import datetime
         order_datetime = datetime.combine(order_date, datetime.min.time()) if order_date else None
-        return create_and_execute_market_order(
+        success, message = create_and_execute_market_order(
             portfolio_id, instrument_id, 'KUPNO', quantity, price, order_datetime
         )
+        if success:
+            PositionLedgerService.mark_stale(portfolio_id)
+        return success, message
 
     @staticmethod
     def create_and_execute_sell(portfolio_id: int, instrument_id: int,
@@ -109,9 +131,12 @@ class OrderService:
         """
         from datetime import datetime
         order_datetime = datetime.combine(order_date, datetime.min.time()) if order_date else None
-        return create_and_execute_market_order(
+        success, message = create_and_execute_market_order(
             portfolio_id, instrument_id, 'SPRZEDAZ', quantity, price, order_datetime
         )
+        if success:
+            PositionLedgerService.mark_stale(portfolio_id)
+        return success, message
 
     @staticmethod
     def create_limit_buy(portfolio_id: int, instrument_id: int,
@@ -163,6 +188,24 @@ class OrderService:
         """
         return Procedures.cancel_order(order_id)
 
+    @staticmethod
+    def cancel_orders(order_ids: List[int]) -> int:
+        """
+        Cancel several pending orders in one transaction.
+
+        Returns:
+            Number of cancelled orders
+        """
+        cancelled = 0
+        with unit_of_work():
+            for order_id in order_ids:
+                success, _ = Procedures.cancel_order(order_id)
+                if success:
+                    cancelled += 1
+        if cancelled:
+            PositionLedgerService.mark_stale()
+        return cancelled
+
     @staticmethod
     def process_limit_orders(portfolio_id: int, simulation_date: date) -> Tuple[bool, str]:
         """
@@ -171,7 +214,10 @@ class OrderService:
         Returns:
             Tuple of (success, message)
         """
-        return Procedures.process_limit_orders(portfolio_id, simulation_date)
+        success, message = Procedures.process_limit_orders(portfolio_id, simulation_date)
+        if success:
+            PositionLedgerService.mark_stale(portfolio_id)
+        return success, message
 
     @staticmethod
     def calculate_order_cost(quantity: float, price: float,
@@ -232,8 +278,11 @@ class OrderService:
         """
         Process limit orders for all trading days between old_date and new_date.
 
-        Only processes forward in time (can't un-execute orders).
-        Stops early if no more pending LIMIT orders exist.
+        Only processes forward in time (can't un-execute orders). The
+        portfolio's orders go through the matching job
+        (Procedures.process_limit_orders_range) for trading days in
+        (old_date, new_date], so each order is filled on its first
+        qualifying trading day and never on a day after new_date.
 
         Args:
             portfolio_id: Portfolio ID
@@ -243,36 +292,50 @@ class OrderService:
         Returns:
             Tuple of (executed_count, messages)
         """
-        from services.market_service import MarketService
-
-        messages = []
-        executed_count = 0
-
         # Only process forward in time
         if new_date <= old_date:
             return 0, []
 
-        # Get trading days between dates
-        trading_days = MarketService.get_trading_days_between(old_date, new_date)
-
-        if not trading_days:
+        success, _, executed = Procedures.process_limit_orders_range(
+            portfolio_id, old_date, new_date
+        )
+        if not success:
             return 0, []
+        if executed:
+            PositionLedgerService.mark_stale(portfolio_id)
 
-        # Process each trading day
-        for day in trading_days:
-            # Check if there are still pending LIMIT orders
-            if not OrderService.has_pending_limit_orders(portfolio_id):
-                break
+        messages = [
+            f"{order['data_transakcji']:%Y-%m-%d}: Wykonano zlecenie {order['strona_zlecenia']} "
+            f"{order['symbol']} ({order['ilosc']:g} szt. po {order['cena_jednostkowa']:.2f})"
+            for order in executed
+        ]
+        return len(executed), messages
 
-            # Process limit orders for this day
-            success, message = OrderService.process_limit_orders(portfolio_id, day)
+    @staticmethod
+    def match_all_limit_orders(since: date = None, until: date = None) -> Tuple[bool, str, Dict]:
+        """
+        Run the global limit-order matching job for trading days in [since, until].
 
-            if success and message and "wykonano" in message.lower():
-                # Extract execution info from message
-                messages.append(f"{day}: {message}")
-                executed_count += 1
+        Every pending LIMIT order in every portfolio is evaluated against
+        the bars of those days in one pass, filled on its first qualifying
+        day, and the fills are committed together.
 
-        return executed_count, messages
+        Args:
+            since: First trading day (None = only `until`)
+            until: Last trading day (None = last trading day)
+
+        Returns:
+            Tuple of (success, message, stats) - stats holds the counts and
+            database timings from Procedures.match_limit_orders plus the
+            round-trip time czas_calkowity_ms
+        """
+        start = time.perf_counter()
+        success, message, stats, _ = Procedures.match_limit_orders(since, until)
+        stats['czas_calkowity_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        if stats.get('wykonane'):
+            # Fills may touch any portfolio
+            PositionLedgerService.mark_stale()
+        return success, message, stats
 
 
 class TransactionService:
@@ -286,6 +349,14 @@ class TransactionService:
             {'portfolio_id': portfolio_id}
         )
 
+    @staticmethod
+    def iter_transactions_by_portfolio(portfolio_id: int) -> Iterator[Dict]:
+        """Stream all transactions for a portfolio (e.g. for export)."""
+        return iter_query_dict(
+            Queries.GET_TRANSACTIONS_BY_PORTFOLIO,
+            {'portfolio_id': portfolio_id}
+        )
+
     @staticmethod
     def get_transactions_by_date_range(portfolio_id: int,
                                        start_date: date,
@@ -0,0 +1,178 @@
+"""
+Portfolio value history engine.
+
+Rebuilds a portfolio's daily holdings and cash from its transactions and
+values them against the in-memory price matrix with NumPy, giving the whole
+value curve in one pass instead of one oblicz_wartosc_portfela_dla_daty call
+per day.
+
+Holdings are replayed forward from the first transaction. Cash is anchored
+at the current saldo_gotowkowe and unwound backwards through the
+transaction cash flows; deposits and withdrawals are not recorded anywhere,
+so they appear as if they had happened before the first day of the series.
+Holdings without a close yet are valued at their weighted-average cost, so
+the series matches the MIGAWKI_PORTFELI snapshots day for day.
+
+Series are cached per portfolio and rebuilt only when the portfolio's cash,
+its last transaction or the price matrix change.
+"""
+
+from typing import Optional, Dict, Tuple
+from datetime import date
+import threading
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.connection import execute_query, execute_query_frame
+from db.queries import Queries
+from services.price_matrix import PriceMatrix, PriceMatrixService, _to_day
+
+
+HISTORY_COLUMNS = ['data', 'gotowka', 'wartosc_pozycji', 'wartosc']
+
+
+def build_value_history(transactions: pd.DataFrame, cash: float,
+                        matrix: PriceMatrix) -> pd.DataFrame:
+    """
+    Build the daily value series of a portfolio over all trading days in the matrix.
+
+    Args:
+        transactions: Rows of GET_PORTFOLIO_TRANSACTION_FLOWS
+        cash: Current cash balance of the portfolio
+        matrix: Price matrix supplying the trading days and as-of closes
+
+    Returns:
+        DataFrame with data, gotowka, wartosc_pozycji and wartosc per trading day
+    """
+    dates = matrix.dates
+    n = len(dates)
+    cash_series = np.full(n, float(cash))
+    positions_value = np.zeros(n)
+
+    if len(transactions):
+        days = pd.to_datetime(transactions['data_transakcji']).to_numpy().astype('datetime64[D]')
+        # A transaction counts from the first trading day on or after its date;
+        # index n means it happened after the last trading day in the matrix
+        day_index = np.searchsorted(dates, days, side='left')
+        is_buy = (transactions['typ_transakcji'] == 'KUPNO').to_numpy()
+        quantity = transactions['ilosc'].to_numpy(dtype=np.float64)
+        value = transactions['wartosc_transakcji'].to_numpy(dtype=np.float64)
+        commission = transactions['prowizja'].to_numpy(dtype=np.float64)
+
+        instrument_ids, column = np.unique(transactions['instrument_id'].to_numpy(), return_inverse=True)
+
+        # Holdings: per-day share deltas accumulated over time (n days x m instruments)
+        deltas = np.zeros((n + 1, len(instrument_ids)))
+        np.add.at(deltas, (day_index, column), np.where(is_buy, quantity, -quantity))
+        holdings = np.cumsum(deltas[:n], axis=0)
+
+        # Cost basis (weighted average, as in MIGAWKI_PORTFELI): a buy adds its value,
+        # a sell removes the sold share of the cost; replayed in transaction order
+        held = np.zeros(len(instrument_ids))
+        cost = np.zeros(len(instrument_ids))
+        cost_change = np.empty(len(transactions))
+        for k, (j, buy, q, v) in enumerate(zip(column, is_buy, quantity, value)):
+            before = cost[j]
+            if buy:
+                cost[j] += v
+            else:
+                cost[j] = 0.0 if held[j] <= q else cost[j] * (held[j] - q) / held[j]
+            held[j] += q if buy else -q
+            cost_change[k] = cost[j] - before
+        cost_deltas = np.zeros((n + 1, len(instrument_ids)))
+        np.add.at(cost_deltas, (day_index, column), cost_change)
+        costs = np.cumsum(cost_deltas[:n], axis=0)
+
+        # Cash: current balance minus the flows that have not happened yet on each day
+        flows = np.bincount(
+            day_index,
+            weights=np.where(is_buy, -(value + commission), value - commission),
+            minlength=n + 1
+        )
+        cash_series = float(cash) - (flows.sum() - np.cumsum(flows[:n]))
+
+        # Holdings without a close on or before the day are valued at cost
+        prices = matrix.closes_for(instrument_ids).T
+        positions_value = np.where(np.isnan(prices), costs, holdings * prices).sum(axis=1)
+
+    return pd.DataFrame({
+        'data': pd.to_datetime(dates).date if n else np.empty(0, dtype=object),
+        'gotowka': np.round(cash_series, 2),
+        'wartosc_pozycji': np.round(positions_value, 2),
+        'wartosc': np.round(cash_series + positions_value, 2),
+    }, columns=HISTORY_COLUMNS)
+
+
+class PortfolioHistoryService:
+    """Cached daily value series per portfolio."""
+
+    # portfolio_id -> (version, series)
+    _cache: Dict[int, Tuple[tuple, pd.DataFrame]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_value_history(portfolio_id: int, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None) -> pd.DataFrame:
+        """
+        Get the daily value of a portfolio for a date range.
+
+        Args:
+            portfolio_id: Portfolio ID
+            start_date: First day (None = day of the first transaction)
+            end_date: Last day (None = last trading day)
+
+        Returns:
+            DataFrame with data, gotowka, wartosc_pozycji and wartosc per trading day
+        """
+        series, first_day = PortfolioHistoryService._get_series(portfolio_id)
+        if series.empty:
+            return series
+
+        days = pd.to_datetime(series['data']).to_numpy().astype('datetime64[D]')
+        start = start_date or first_day
+        mask = np.ones(len(series), dtype=bool)
+        if start is not None:
+            mask &= days >= _to_day(start)
+        if end_date is not None:
+            mask &= days <= _to_day(end_date)
+        return series[mask].reset_index(drop=True)
+
+    @staticmethod
+    def _get_series(portfolio_id: int) -> Tuple[pd.DataFrame, Optional[date]]:
+        """Get the full cached series, rebuilding it when the portfolio or prices changed."""
+        matrix = PriceMatrixService.get_matrix()
+        results = execute_query(Queries.GET_PORTFOLIO_HISTORY_VERSION, {'portfolio_id': portfolio_id})
+        if not results:
+            return pd.DataFrame(columns=HISTORY_COLUMNS), None
+        cash, last_transaction = results[0]
+        version = (float(cash or 0), last_transaction, matrix.last_row_id, len(matrix.dates))
+
+        with PortfolioHistoryService._lock:
+            cached = PortfolioHistoryService._cache.get(portfolio_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        transactions = execute_query_frame(
+            Queries.GET_PORTFOLIO_TRANSACTION_FLOWS, {'portfolio_id': portfolio_id}
+        )
+        series = build_value_history(transactions, version[0], matrix)
+        first_day = (
+            pd.to_datetime(transactions['data_transakcji']).min().date()
+            if len(transactions) else None
+        )
+
+        with PortfolioHistoryService._lock:
+            PortfolioHistoryService._cache[portfolio_id] = (version, (series, first_day))
+        return series, first_day
+
+    @staticmethod
+    def invalidate(portfolio_id: Optional[int] = None):
+        """Drop the cached series of one portfolio, or of all portfolios."""
+        with PortfolioHistoryService._lock:
+            if portfolio_id is None:
+                PortfolioHistoryService._cache.clear()
+            else:
+                PortfolioHistoryService._cache.pop(portfolio_id, None)
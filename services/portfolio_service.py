@@ -4,13 +4,31 @@ Portfolio management service.
 
 from typing import Optional, List, Dict, Tuple
 from datetime import date
+import asyncio
+import numpy as np
+import pandas as pd
+import oracledb
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from db.connection import execute_query_dict
+from db.connection import execute_query_dict, execute_query_records, execute_query_batch, execute_query_frame
+from db.connection_async import execute_query_records_async, call_function_async
+from db.records import records_from_dicts
 from db.queries import Queries
 from db.procedures import Procedures
+from services.position_ledger import PositionLedgerService
+
+
+# Numeric position columns fetched as float
+POSITION_FLOAT_FIELDS = (
+    'ilosc_akcji', 'srednia_cena_zakupu', 'wartosc_zakupu',
+    'wartosc_biezaca', 'zysk_strata', 'zysk_strata_procent',
+)
+# Position fields filled in by get_positions_for_date
+POSITION_EXTRA_FIELDS = ('cena_biezaca',)
+# Money columns of the portfolio summary, always returned as float
+SUMMARY_MONEY_FIELDS = ('saldo_gotowkowe', 'wartosc_pozycji', 'zysk_strata_pozycji')
 
 
 class PortfolioService:
@@ -47,23 +65,30 @@ class PortfolioService:
             Queries.GET_PORTFOLIO_SUMMARY,
             {'portfolio_id': portfolio_id}
         )
+        return PortfolioService._summary_with_total(results)
+
+    @staticmethod
+    def _summary_with_total(results: List[Dict]) -> Optional[Dict]:
+        """Take the summary row and add the calculated total value."""
         if not results:
             return None
 
         summary = results[0]
+        # Connections already fetch these as float; only NULLs need replacing
+        for key in SUMMARY_MONEY_FIELDS:
+            summary[key] = summary.get(key) or 0.0
         # Calculate total value
-        summary['wartosc_calkowita'] = (
-            float(summary.get('saldo_gotowkowe', 0) or 0) +
-            float(summary.get('wartosc_pozycji', 0) or 0)
-        )
+        summary['wartosc_calkowita'] = summary['saldo_gotowkowe'] + summary['wartosc_pozycji']
         return summary
 
     @staticmethod
     def get_positions(portfolio_id: int) -> List[Dict]:
-        """Get all positions in a portfolio."""
-        return execute_query_dict(
+        """Get all positions in a portfolio as records with float amounts."""
+        return execute_query_records(
             Queries.GET_POSITIONS_BY_PORTFOLIO,
-            {'portfolio_id': portfolio_id}
+            {'portfolio_id': portfolio_id},
+            float_fields=POSITION_FLOAT_FIELDS,
+            extra_fields=POSITION_EXTRA_FIELDS
         )
 
     @staticmethod
@@ -87,6 +112,48 @@ class PortfolioService:
         value = Procedures.get_portfolio_value_for_date(portfolio_id, target_date)
         return value if value is not None else 0.0
 
+    @staticmethod
+    def get_portfolio_values_for_range(portfolio_id: int, start_date: date,
+                                       end_date: date) -> pd.DataFrame:
+        """
+        Get portfolio value for every trading day in [start_date, end_date].
+
+        One call to the pipelined pkg_gielda_ext.wartosci_portfela_w_zakresie,
+        which reads the MIGAWKI_PORTFELI snapshots (cash and holdings as of
+        each day, not today's).
+
+        Returns:
+            DataFrame with data_sesji, saldo_gotowkowe, wartosc_pozycji and
+            wartosc_calkowita
+        """
+        return execute_query_frame(
+            Queries.GET_PORTFOLIO_VALUES_FOR_RANGE,
+            {'portfolio_id': portfolio_id, 'start_date': start_date, 'end_date': end_date}
+        )
+
+    @staticmethod
+    def get_portfolio_summary_for_date(portfolio_id: int, target_date: date) -> Optional[Dict]:
+        """
+        Get the portfolio summary for a date from its daily snapshot (time travel).
+
+        Returns dict with:
+        - data_sesji (last trading day on or before target_date)
+        - saldo_gotowkowe, wartosc_pozycji, wartosc_zakupu, zysk_strata_pozycji,
+          wartosc_calkowita, liczba_pozycji
+        or None if there is no snapshot on or before the date
+        """
+        results = execute_query_dict(
+            Queries.GET_PORTFOLIO_SNAPSHOT_FOR_DATE,
+            {'portfolio_id': portfolio_id, 'target_date': target_date}
+        )
+        if not results:
+            return None
+
+        snapshot = results[0]
+        for key in SUMMARY_MONEY_FIELDS + ('wartosc_zakupu', 'wartosc_calkowita'):
+            snapshot[key] = snapshot.get(key) or 0.0
+        return snapshot
+
     @staticmethod
     def create_portfolio(user_id: int, name: str, currency: str,
                         initial_balance: float = 0) -> Tuple[bool, str, Optional[int]]:
@@ -118,54 +185,157 @@ class PortfolioService:
         """Get available cash balance."""
         portfolio = PortfolioService.get_portfolio(portfolio_id)
         if portfolio:
-            return float(portfolio.get('saldo_gotowkowe', 0) or 0)
+            return portfolio.get('saldo_gotowkowe') or 0.0
         return 0.0
 
+    # =========================================
+    # ASYNC VARIANTS
+    # =========================================
+
+    @staticmethod
+    async def get_positions_async(portfolio_id: int) -> List[Dict]:
+        """Async variant of get_positions."""
+        return await execute_query_records_async(
+            Queries.GET_POSITIONS_BY_PORTFOLIO,
+            {'portfolio_id': portfolio_id},
+            float_fields=POSITION_FLOAT_FIELDS,
+            extra_fields=POSITION_EXTRA_FIELDS
+        )
+
+    @staticmethod
+    async def get_portfolio_value_async(portfolio_id: int) -> float:
+        """Async variant of get_portfolio_value."""
+        try:
+            value = await call_function_async(
+                'pkg_gielda.oblicz_wartosc_portfela',
+                oracledb.NUMBER,
+                [portfolio_id]
+            )
+            return float(value) if value else 0.0
+        except oracledb.Error:
+            return 0.0
+
+    @staticmethod
+    async def get_portfolios_totals_async(portfolio_ids: List[int]) -> Tuple[float, int]:
+        """
+        Get combined value and number of positions of several portfolios.
+
+        Returns:
+            Tuple of (total_value, total_positions)
+        """
+        values, positions = await asyncio.gather(
+            asyncio.gather(*(PortfolioService.get_portfolio_value_async(pid) for pid in portfolio_ids)),
+            asyncio.gather(*(PortfolioService.get_positions_async(pid) for pid in portfolio_ids)),
+        )
+        return sum(values), sum(len(p) for p in positions)
+
+    @staticmethod
+    def get_page_data(portfolio_id: Optional[int], user_id: Optional[int] = None,
+                      include_positions: bool = False) -> Dict:
+        """
+        Get the data shown when a page loads, in one batched round trip.
+
+        Args:
+            portfolio_id: Active portfolio (summary and positions are skipped if None)
+            user_id: Logged in user (portfolios and date range are skipped if None)
+            include_positions: Also fetch the portfolio's positions
+
+        Returns dict with the requested keys:
+        - portfolios: as get_user_portfolios
+        - date_range: as MarketService.get_date_range
+        - summary: as get_portfolio_summary
+        - positions: as get_positions (only with include_positions)
+        """
+        from services.market_service import MarketService
+
+        queries = {}
+        if user_id is not None:
+            queries['portfolios'] = (Queries.GET_PORTFOLIOS_BY_USER, {'user_id': user_id})
+        if portfolio_id is not None:
+            queries['summary'] = (Queries.GET_PORTFOLIO_SUMMARY, {'portfolio_id': portfolio_id})
+            if include_positions:
+                queries['positions'] = (Queries.GET_POSITIONS_BY_PORTFOLIO, {'portfolio_id': portfolio_id})
+
+        results = execute_query_batch(queries)
+
+        data = {}
+        if 'portfolios' in results:
+            data['portfolios'] = results['portfolios']
+            # Reference data comes from the process-wide cache
+            data['date_range'] = MarketService.get_date_range()
+        if 'summary' in results:
+            data['summary'] = PortfolioService._summary_with_total(results['summary'])
+        if 'positions' in results:
+            data['positions'] = records_from_dicts(
+                results['positions'],
+                float_fields=POSITION_FLOAT_FIELDS,
+                extra_fields=POSITION_EXTRA_FIELDS
+            )
+        return data
+
     @staticmethod
     def get_positions_for_date(portfolio_id: int, target_date: date) -> List[Dict]:
         """
-        Get positions with values calculated for a specific date.
+        Get positions held at the end of a date, valued at that date's prices.
         Used for time travel feature.
-        Only returns positions that existed at the target_date.
-        """
-        positions = PortfolioService.get_positions(portfolio_id)
-
-        # Filter positions that existed at target_date
-        filtered_positions = []
-        for pos in positions:
-            # Check if position existed at target_date
-            data_pierwszego_zakupu = pos.get('data_pierwszego_zakupu')
-            if data_pierwszego_zakupu:
-                # Convert to date if datetime
-                if hasattr(data_pierwszego_zakupu, 'date'):
-                    data_pierwszego_zakupu = data_pierwszego_zakupu.date()
-
-                # Skip positions that didn't exist yet at target_date
-                if data_pierwszego_zakupu > target_date:
-                    continue
-
-            instrument_id = pos['instrument_id']
-            price = Procedures.get_price_for_date(instrument_id, target_date)
-
-            if price:
-                ilosc = float(pos.get('ilosc_akcji', 0) or 0)
-                srednia_cena = float(pos.get('srednia_cena_zakupu', 0) or 0)
-
-                pos['cena_biezaca'] = price
-                pos['wartosc_biezaca'] = round(ilosc * price, 2)
-                pos['wartosc_zakupu'] = round(ilosc * srednia_cena, 2)
-                pos['zysk_strata'] = round(ilosc * (price - srednia_cena), 2)
-
-                if srednia_cena > 0:
-                    pos['zysk_strata_procent'] = round(
-                        ((price - srednia_cena) / srednia_cena) * 100, 2
-                    )
-                else:
-                    pos['zysk_strata_procent'] = 0.0
-
-                filtered_positions.append(pos)
-
-        return filtered_positions
+
+        Holdings are replayed from the portfolio's transactions
+        (PositionLedgerService), so later buys, sells and closed positions
+        do not leak into the past. Positions without a price on or before
+        the date are skipped.
+        """
+        from services.market_service import MarketService
+
+        held = PositionLedgerService.positions_as_of(portfolio_id, target_date)
+
+        # One lookup prices every position
+        prices = MarketService.get_prices_for_date(list(held), target_date)
+        held = {instrument_id: pos for instrument_id, pos in held.items() if instrument_id in prices}
+        if not held:
+            return []
+
+        instruments = {i['instrument_id']: i for i in MarketService.get_all_instruments()}
+        rows = []
+        for instrument_id, pos in held.items():
+            instrument = instruments.get(instrument_id) or MarketService.get_instrument_by_id(instrument_id) or {}
+            rows.append({
+                'position_id': None,
+                'portfolio_id': portfolio_id,
+                'instrument_id': instrument_id,
+                'ilosc_akcji': pos['ilosc_akcji'],
+                'srednia_cena_zakupu': pos['srednia_cena_zakupu'],
+                'wartosc_zakupu': pos['wartosc_zakupu'],
+                'wartosc_biezaca': 0.0,
+                'zysk_strata': 0.0,
+                'zysk_strata_procent': 0.0,
+                'data_pierwszego_zakupu': pos['data_pierwszego_zakupu'],
+                'data_ostatniej_zmiany': pos['data_ostatniej_zmiany'],
+                'symbol': instrument.get('symbol'),
+                'nazwa_pelna': instrument.get('nazwa_pelna'),
+                'waluta_notowania': instrument.get('waluta_notowania'),
+            })
+        positions = records_from_dicts(rows, POSITION_FLOAT_FIELDS, POSITION_EXTRA_FIELDS)
+
+        price = np.array([prices[pos['instrument_id']] for pos in positions])
+        ilosc = np.array([pos['ilosc_akcji'] for pos in positions])
+        srednia_cena = np.array([pos['srednia_cena_zakupu'] for pos in positions])
+
+        wartosc_biezaca = np.round(ilosc * price, 2)
+        zysk_strata = np.round(ilosc * (price - srednia_cena), 2)
+        zysk_strata_procent = np.round(
+            np.divide((price - srednia_cena) * 100, srednia_cena,
+                      out=np.zeros_like(price), where=srednia_cena > 0),
+            2
+        )
+
+        for i, pos in enumerate(positions):
+            pos['cena_biezaca'] = prices[pos['instrument_id']]
+            pos['wartosc_biezaca'] = float(wartosc_biezaca[i])
+            pos['zysk_strata'] = float(zysk_strata[i])
+            pos['zysk_strata_procent'] = float(zysk_strata_procent[i])
+
+        # Same order as GET_POSITIONS_BY_PORTFOLIO
+        return sorted(positions, key=lambda pos: pos['wartosc_biezaca'], reverse=True)
 
 
 class UserService:
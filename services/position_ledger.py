@@ -0,0 +1,229 @@
+"""
+Event-sourced position history.
+
+Positions held at any date are rebuilt from the portfolio's transactions
+instead of filtering today's POZYCJE. Each portfolio gets a ledger: its
+transactions in execution order, a sorted index of their days, and a copy of
+all positions every POSITION_LEDGER_CONFIG['checkpoint_interval']
+transactions. A lookup bisects the day index, starts from the nearest
+checkpoint before that point and replays at most checkpoint_interval
+transactions, so its cost does not grow with the length of the history.
+A cached ledger is checked against the database at most once per
+POSITION_LEDGER_CONFIG['refresh_seconds']; the trade paths in OrderService
+mark it stale so the portfolio's own trades show up on the next lookup.
+
+Positions follow the weighted-average cost rules of
+pkg_gielda.wykonaj_zlecenie_kupna/wykonaj_zlecenie_sprzedazy: a buy adds
+its value to the cost, a sell reduces the cost in proportion to the
+quantity sold and selling everything closes the position. Quantities are
+kept at the NUMBER(15,4) scale of ilosc_akcji, so float sums of fractional
+trades close a position exactly as the database does.
+"""
+
+from typing import Optional, List, Dict, Tuple
+from datetime import date
+from bisect import bisect_right
+import threading
+import time
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import POSITION_LEDGER_CONFIG
+from db.connection import execute_query, execute_query_frame
+from db.queries import Queries
+
+
+# Position state: (ilosc_akcji, wartosc_zakupu, data_pierwszego_zakupu, data_ostatniej_zmiany)
+PositionState = Tuple[float, float, date, date]
+
+# Decimal places of POZYCJE.ilosc_akcji (NUMBER(15,4))
+QUANTITY_SCALE = 4
+
+
+def _apply(state: Dict[int, PositionState], instrument_id: int, is_buy: bool,
+           quantity: float, value: float, day: date):
+    """Apply one transaction to the positions in state."""
+    ilosc, koszt, first_day, _ = state.get(instrument_id, (0.0, 0.0, None, None))
+    if is_buy:
+        state[instrument_id] = (round(ilosc + quantity, QUANTITY_SCALE), koszt + value, first_day or day, day)
+        return
+    remaining = round(ilosc - quantity, QUANTITY_SCALE)
+    if remaining <= 0:
+        state.pop(instrument_id, None)
+    else:
+        state[instrument_id] = (remaining, koszt * remaining / ilosc, first_day, day)
+
+
+class PositionLedger:
+    """Transactions of one portfolio with position checkpoints."""
+
+    def __init__(self, checkpoint_interval: int = None):
+        self.checkpoint_interval = max(1, checkpoint_interval or POSITION_LEDGER_CONFIG['checkpoint_interval'])
+        self.last_transaction_id = 0
+        # Day of each transaction, non-decreasing (bisect index)
+        self._days: List[date] = []
+        # (instrument_id, is_buy, quantity, value, day) per transaction
+        self._events: List[tuple] = []
+        # Positions after the first k * checkpoint_interval transactions
+        self._checkpoints: List[Dict[int, PositionState]] = [{}]
+        self._state: Dict[int, PositionState] = {}
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def last_day(self) -> Optional[date]:
+        """Day of the latest transaction, or None for an empty ledger."""
+        return self._days[-1] if self._days else None
+
+    def copy(self) -> 'PositionLedger':
+        """Copy that can be appended to without changing this ledger."""
+        ledger = PositionLedger(self.checkpoint_interval)
+        ledger.last_transaction_id = self.last_transaction_id
+        ledger._days = list(self._days)
+        ledger._events = list(self._events)
+        # Checkpoints are never modified once taken
+        ledger._checkpoints = list(self._checkpoints)
+        ledger._state = dict(self._state)
+        return ledger
+
+    def append(self, transactions: pd.DataFrame):
+        """
+        Append transactions (rows of GET_PORTFOLIO_TRANSACTION_FLOWS) in execution order.
+
+        The transactions must be from days after last_day: the ledger keeps
+        only days, so same-day transactions could not be ordered by their
+        execution time. Use a new ledger for back-dated or same-day history.
+        """
+        if transactions.empty:
+            return
+        days = [d.date() for d in pd.to_datetime(transactions['data_transakcji'])]
+        if self._days and days[0] <= self._days[-1]:
+            raise ValueError("Transakcje nie późniejsze niż ostatni dzień w historii pozycji")
+
+        for instrument_id, side, quantity, value, day in zip(
+            transactions['instrument_id'], transactions['typ_transakcji'],
+            transactions['ilosc'], transactions['wartosc_transakcji'], days
+        ):
+            event = (int(instrument_id), side == 'KUPNO', float(quantity), float(value), day)
+            _apply(self._state, *event)
+            self._events.append(event)
+            self._days.append(day)
+            if len(self._events) % self.checkpoint_interval == 0:
+                self._checkpoints.append(dict(self._state))
+
+        self.last_transaction_id = max(self.last_transaction_id, int(transactions['transaction_id'].max()))
+
+    def positions_as_of(self, target_date) -> Dict[int, Dict]:
+        """
+        Positions held at the end of a date.
+
+        Returns:
+            Dict of instrument_id -> dict with ilosc_akcji, srednia_cena_zakupu,
+            wartosc_zakupu, data_pierwszego_zakupu and data_ostatniej_zmiany
+        """
+        if hasattr(target_date, 'date'):
+            target_date = target_date.date()
+        count = bisect_right(self._days, target_date)
+        checkpoint = count // self.checkpoint_interval
+        state = dict(self._checkpoints[checkpoint])
+        for event in self._events[checkpoint * self.checkpoint_interval:count]:
+            _apply(state, *event)
+
+        return {
+            instrument_id: {
+                'ilosc_akcji': ilosc,
+                'srednia_cena_zakupu': round(koszt / ilosc, 4),
+                'wartosc_zakupu': round(koszt, 2),
+                'data_pierwszego_zakupu': first_day,
+                'data_ostatniej_zmiany': last_day,
+            }
+            for instrument_id, (ilosc, koszt, first_day, last_day) in state.items()
+        }
+
+
+class PositionLedgerService:
+    """Cached position ledgers per portfolio."""
+
+    _ledgers: Dict[int, PositionLedger] = {}
+    # Monotonic time of each portfolio's last check against the database
+    _checked_at: Dict[int, float] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_ledger(portfolio_id: int) -> PositionLedger:
+        """
+        Get the ledger of a portfolio, loading only transactions added since the last check.
+
+        A cached ledger is returned as is until it is older than
+        POSITION_LEDGER_CONFIG['refresh_seconds'] or marked stale. Then
+        transactions from days after the cached ledger are appended; a
+        back-dated transaction (time travel) or one on the ledger's last day
+        rebuilds the ledger, whose query orders them by their full timestamp.
+        """
+        now = time.monotonic()
+        with PositionLedgerService._lock:
+            ledger = PositionLedgerService._ledgers.get(portfolio_id)
+            checked_at = PositionLedgerService._checked_at.get(portfolio_id)
+        if (ledger is not None and checked_at is not None
+                and now - checked_at < POSITION_LEDGER_CONFIG['refresh_seconds']):
+            return ledger
+
+        results = execute_query(Queries.GET_PORTFOLIO_HISTORY_VERSION, {'portfolio_id': portfolio_id})
+        last_transaction_id = int(results[0][1] or 0) if results else 0
+
+        if ledger is not None and ledger.last_transaction_id == last_transaction_id:
+            with PositionLedgerService._lock:
+                PositionLedgerService._checked_at[portfolio_id] = now
+            return ledger
+
+        if ledger is not None:
+            new = execute_query_frame(
+                Queries.GET_PORTFOLIO_TRANSACTION_FLOWS_SINCE,
+                {'portfolio_id': portfolio_id, 'last_id': ledger.last_transaction_id}
+            )
+            first_day = pd.to_datetime(new['data_transakcji']).min().date() if len(new) else None
+            if first_day is not None and (ledger.last_day is None or first_day > ledger.last_day):
+                # Readers may still use the cached ledger, so extend a copy
+                ledger = ledger.copy()
+                ledger.append(new)
+            else:
+                ledger = None
+
+        if ledger is None:
+            ledger = PositionLedger()
+            ledger.append(execute_query_frame(
+                Queries.GET_PORTFOLIO_TRANSACTION_FLOWS, {'portfolio_id': portfolio_id}
+            ))
+
+        with PositionLedgerService._lock:
+            PositionLedgerService._ledgers[portfolio_id] = ledger
+            PositionLedgerService._checked_at[portfolio_id] = now
+        return ledger
+
+    @staticmethod
+    def positions_as_of(portfolio_id: int, target_date: date) -> Dict[int, Dict]:
+        """Positions of a portfolio held at the end of a date."""
+        return PositionLedgerService.get_ledger(portfolio_id).positions_as_of(target_date)
+
+    @staticmethod
+    def mark_stale(portfolio_id: Optional[int] = None):
+        """Make the next lookup load new transactions of one portfolio, or of all portfolios."""
+        with PositionLedgerService._lock:
+            if portfolio_id is None:
+                PositionLedgerService._checked_at.clear()
+            else:
+                PositionLedgerService._checked_at.pop(portfolio_id, None)
+
+    @staticmethod
+    def invalidate(portfolio_id: Optional[int] = None):
+        """Drop the cached ledger of one portfolio, or of all portfolios."""
+        with PositionLedgerService._lock:
+            if portfolio_id is None:
+                PositionLedgerService._ledgers.clear()
+                PositionLedgerService._checked_at.clear()
+            else:
+                PositionLedgerService._ledgers.pop(portfolio_id, None)
+                PositionLedgerService._checked_at.pop(portfolio_id, None)
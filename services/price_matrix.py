@@ -0,0 +1,267 @@
+"""
+In-memory price matrix for as-of price lookups.
+
+Closing prices from DANE_DZIENNE are held in a dense NumPy matrix of
+instruments x trading days, forward-filled so that each cell holds the last
+close on or before that day. As-of, snapshot and range queries are then a
+searchsorted over the trading days instead of a correlated query per
+instrument. The matrix refreshes incrementally by loading only rows with a
+daily_data_id above the highest one already loaded.
+"""
+
+from typing import Optional, List, Dict, Tuple, Iterable
+from datetime import date
+import threading
+import copy
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PRICE_MATRIX_CONFIG
+from db.connection import execute_query_frame
+from db.queries import Queries
+
+
+def _to_day(value) -> np.datetime64:
+    """Convert a date/datetime to a numpy day."""
+    if hasattr(value, 'date'):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+def _forward_fill(raw: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs along each row (leading NaNs stay NaN)."""
+    if raw.size == 0:
+        return raw.copy()
+    columns = np.arange(raw.shape[1])
+    last_valid = np.where(~np.isnan(raw), columns, 0)
+    np.maximum.accumulate(last_valid, axis=1, out=last_valid)
+    return raw[np.arange(raw.shape[0])[:, None], last_valid]
+
+
+class PriceMatrix:
+    """Forward-filled instruments x trading days matrix of closing prices."""
+
+    def __init__(self):
+        self.instrument_ids = np.empty(0, dtype=np.int64)
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        # Closes as loaded (NaN where an instrument has no quote that day)
+        self.raw = np.empty((0, 0), dtype=np.float64)
+        # Closes forward-filled along each row
+        self.closes = np.empty((0, 0), dtype=np.float64)
+        self.last_row_id = 0
+        self._rows: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.instrument_ids)
+
+    def add_bars(self, instrument_ids: np.ndarray, dates: np.ndarray, closes: np.ndarray,
+                 row_ids: np.ndarray = None):
+        """
+        Merge daily bars into the matrix.
+
+        Bars for new trading days after the last loaded one are appended and
+        only the new columns are forward-filled; anything else (new
+        instruments, back-filled history, corrections) re-fills the matrix.
+        """
+        if len(instrument_ids) == 0:
+            return
+        instrument_ids = np.asarray(instrument_ids, dtype=np.int64)
+        dates = np.asarray(dates).astype('datetime64[D]')
+        closes = np.asarray(closes, dtype=np.float64)
+
+        new_instruments = np.setdiff1d(instrument_ids, self.instrument_ids)
+        new_dates = np.setdiff1d(dates, self.dates)
+        append_only = (
+            len(new_instruments) == 0
+            and len(self.dates) > 0
+            and dates.min() > self.dates[-1]
+        )
+
+        if len(new_instruments) or len(new_dates):
+            all_instruments = np.union1d(self.instrument_ids, new_instruments)
+            all_dates = np.union1d(self.dates, new_dates)
+            raw = np.full((len(all_instruments), len(all_dates)), np.nan)
+            if self.raw.size:
+                rows = np.searchsorted(all_instruments, self.instrument_ids)
+                cols = np.searchsorted(all_dates, self.dates)
+                raw[np.ix_(rows, cols)] = self.raw
+            self.instrument_ids, self.dates, self.raw = all_instruments, all_dates, raw
+            self._rows = {int(i): row for row, i in enumerate(all_instruments)}
+
+        rows = np.searchsorted(self.instrument_ids, instrument_ids)
+        cols = np.searchsorted(self.dates, dates)
+        self.raw[rows, cols] = closes
+
+        if append_only and self.closes.shape[0] == self.raw.shape[0]:
+            first_new = self.closes.shape[1]
+            # Seed the fill with the last known closes, then fill the new days
+            tail = _forward_fill(np.hstack([self.closes[:, -1:], self.raw[:, first_new:]]))[:, 1:]
+            self.closes = np.hstack([self.closes, tail])
+        else:
+            self.closes = _forward_fill(self.raw)
+
+        if row_ids is not None and len(row_ids):
+            self.last_row_id = max(self.last_row_id, int(np.max(row_ids)))
+
+    def _column(self, target_date) -> int:
+        """Index of the last trading day on or before target_date (-1 if none)."""
+        return int(np.searchsorted(self.dates, _to_day(target_date), side='right')) - 1
+
+    def price_as_of(self, instrument_id: int, target_date) -> Optional[float]:
+        """Last close of an instrument on or before a date, or None."""
+        row = self._rows.get(int(instrument_id))
+        col = self._column(target_date)
+        if row is None or col < 0:
+            return None
+        price = self.closes[row, col]
+        return None if np.isnan(price) else float(price)
+
+    def prices_as_of(self, instrument_ids: Iterable[int], target_date) -> Dict[int, float]:
+        """Last closes of several instruments on or before a date (missing ones omitted)."""
+        col = self._column(target_date)
+        if col < 0:
+            return {}
+        known = [(int(i), self._rows[int(i)]) for i in instrument_ids if int(i) in self._rows]
+        if not known:
+            return {}
+        prices = self.closes[[row for _, row in known], col]
+        return {
+            instrument_id: float(price)
+            for (instrument_id, _), price in zip(known, prices)
+            if not np.isnan(price)
+        }
+
+    def snapshot(self, target_date) -> Dict[int, float]:
+        """Last close of every instrument on or before a date."""
+        col = self._column(target_date)
+        if col < 0:
+            return {}
+        column = self.closes[:, col]
+        valid = ~np.isnan(column)
+        return dict(zip(self.instrument_ids[valid].tolist(), column[valid].tolist()))
+
+    def closes_for(self, instrument_ids: Iterable[int]) -> np.ndarray:
+        """
+        Forward-filled closes of several instruments over all trading days.
+
+        Returns:
+            Array of shape (len(instrument_ids), len(self.dates)); rows of
+            unknown instruments are all NaN
+        """
+        instrument_ids = [int(i) for i in instrument_ids]
+        closes = np.full((len(instrument_ids), len(self.dates)), np.nan)
+        known = [(n, self._rows[i]) for n, i in enumerate(instrument_ids) if i in self._rows]
+        if known:
+            targets, rows = zip(*known)
+            closes[list(targets)] = self.closes[list(rows)]
+        return closes
+
+    def price_range(self, instrument_id: int, start_date, end_date) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Forward-filled closes of an instrument for trading days in [start_date, end_date].
+
+        Returns:
+            Tuple of (dates as datetime64[D], closes with NaN before the first quote)
+        """
+        row = self._rows.get(int(instrument_id))
+        lo = int(np.searchsorted(self.dates, _to_day(start_date), side='left'))
+        hi = int(np.searchsorted(self.dates, _to_day(end_date), side='right'))
+        if row is None:
+            return self.dates[lo:hi], np.full(max(hi - lo, 0), np.nan)
+        return self.dates[lo:hi], self.closes[row, lo:hi]
+
+
+class PriceMatrixService:
+    """Process-wide price matrix loaded from DANE_DZIENNE."""
+
+    _matrix: Optional[PriceMatrix] = None
+    _refreshed_at: float = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        """Check whether the price matrix is enabled in PRICE_MATRIX_CONFIG."""
+        return PRICE_MATRIX_CONFIG['enabled']
+
+    @staticmethod
+    def get_matrix() -> PriceMatrix:
+        """
+        Get the price matrix, loading it on first use.
+
+        The matrix is refreshed incrementally when it is older than
+        PRICE_MATRIX_CONFIG['refresh_seconds'], so prices loaded by other
+        processes show up too.
+        """
+        with PriceMatrixService._lock:
+            matrix = PriceMatrixService._matrix
+            age = time.monotonic() - PriceMatrixService._refreshed_at
+            if matrix is None or age >= PRICE_MATRIX_CONFIG['refresh_seconds']:
+                PriceMatrixService._refresh_locked()
+            return PriceMatrixService._matrix
+
+    @staticmethod
+    def refresh() -> int:
+        """
+        Load bars added since the last refresh.
+
+        Returns:
+            Number of bars loaded
+        """
+        with PriceMatrixService._lock:
+            return PriceMatrixService._refresh_locked()
+
+    @staticmethod
+    def _refresh_locked() -> int:
+        """Load new bars into the matrix (caller holds the lock)."""
+        # Readers keep using the current matrix while a copy is updated
+        current = PriceMatrixService._matrix
+        matrix = copy.copy(current) if current is not None else PriceMatrix()
+        df = execute_query_frame(Queries.GET_CLOSES_SINCE, {'last_id': matrix.last_row_id})
+        if not df.empty:
+            matrix.add_bars(
+                df['instrument_id'].to_numpy(),
+                pd.to_datetime(df['data_notowan']).to_numpy(),
+                df['cena_zamkniecia'].to_numpy(dtype=np.float64),
+                df['daily_data_id'].to_numpy(),
+            )
+        PriceMatrixService._matrix = matrix
+        PriceMatrixService._refreshed_at = time.monotonic()
+        return len(df)
+
+    @staticmethod
+    def mark_stale():
+        """Make the next lookup load new bars (e.g. after DataLoader inserts)."""
+        with PriceMatrixService._lock:
+            PriceMatrixService._refreshed_at = 0.0
+
+    @staticmethod
+    def invalidate():
+        """Drop the matrix; the next lookup reloads it from scratch."""
+        with PriceMatrixService._lock:
+            PriceMatrixService._matrix = None
+            PriceMatrixService._refreshed_at = 0.0
+
+    @staticmethod
+    def price_as_of(instrument_id: int, target_date: date) -> Optional[float]:
+        """Last close of an instrument on or before a date."""
+        return PriceMatrixService.get_matrix().price_as_of(instrument_id, target_date)
+
+    @staticmethod
+    def prices_as_of(instrument_ids: List[int], target_date: date) -> Dict[int, float]:
+        """Last closes of several instruments on or before a date."""
+        return PriceMatrixService.get_matrix().prices_as_of(instrument_ids, target_date)
+
+    @staticmethod
+    def snapshot(target_date: date) -> Dict[int, float]:
+        """Last close of every instrument on or before a date."""
+        return PriceMatrixService.get_matrix().snapshot(target_date)
+
+    @staticmethod
+    def price_range(instrument_id: int, start_date: date,
+                    end_date: date) -> Tuple[np.ndarray, np.ndarray]:
+        """Forward-filled closes of an instrument for a date range."""
+        return PriceMatrixService.get_matrix().price_range(instrument_id, start_date, end_date)
@@ -0,0 +1,106 @@
+"""
+Process-wide cache for reference data.
+
+Instruments, sectors, exchanges and the price date range change only when
+DataLoader runs, so every Streamlit session in the process shares one copy
+of them instead of querying Oracle on each rerun. Entries expire after
+REFERENCE_CACHE_TTL seconds and DataLoader.initialize_all invalidates the
+whole cache when it finishes.
+
+Cached rows are shared between sessions and must not be modified.
+"""
+
+from typing import Callable, Dict, Optional
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import REFERENCE_CACHE_TTL
+
+
+# Cache keys
+INSTRUMENTS = 'instruments'
+SECTORS = 'sectors'
+EXCHANGES = 'exchanges'
+DATE_RANGE = 'date_range'
+
+
+class ReferenceCache:
+    """Thread-safe key/value cache with a time-to-live."""
+
+    def __init__(self, ttl_seconds: float = None):
+        self.ttl_seconds = REFERENCE_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        # key -> (expires_at, value)
+        self._entries: Dict[str, tuple] = {}
+        # key -> lock held while the value is loaded, so concurrent misses query once
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """Get a cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value):
+        """Store a value (nothing is stored when the TTL is 0)."""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def get_or_load(self, key: str, loader: Callable):
+        """
+        Get a cached value, calling loader() to fill it on a miss.
+
+        Usage:
+            sectors = reference_cache.get_or_load(
+                SECTORS, lambda: execute_query_dict(Queries.GET_ALL_SECTORS)
+            )
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[1]
+            value = loader()
+            self.set(key, value)
+            return value
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or all entries when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics: entries, hits, misses and ttl_seconds."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'entries': sum(1 for expires_at, _ in self._entries.values() if expires_at > now),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+
+# Global cache instance
+reference_cache = ReferenceCache()
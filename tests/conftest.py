@@ -16,6 +16,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # MOCK FIXTURES
 # ============================================
 
+@pytest.fixture(autouse=True)
+def clear_reference_cache():
+    """Start every test with an empty reference-data cache."""
+    from services.reference_cache import reference_cache
+    reference_cache.invalidate()
+    yield
+    reference_cache.invalidate()
+
+
 @pytest.fixture
 def mock_db_connection():
     """Mock database connection."""
@@ -229,6 +238,83 @@ def sample_price_data():
     }
 
 
+@pytest.fixture
+def price_matrix():
+    """Price matrix: instrument 1 on 2, 3 and 6 Jan 2025, instrument 2 from 3 Jan."""
+    import numpy as np
+    from services.price_matrix import PriceMatrix
+
+    matrix = PriceMatrix()
+    matrix.add_bars(
+        np.array([1, 1, 2, 1]),
+        np.array(['2025-01-02', '2025-01-03', '2025-01-03', '2025-01-06'], dtype='datetime64[D]'),
+        np.array([10.0, 11.0, 20.0, 12.0]),
+        np.array([1, 2, 3, 4]),
+    )
+    return matrix
+
+
+@pytest.fixture
+def transaction_flows():
+    """
+    Build GET_PORTFOLIO_TRANSACTION_FLOWS rows.
+
+    Each row is (day, instrument_id, typ_transakcji, ilosc, wartosc_transakcji,
+    prowizja); transaction ids are numbered from 1.
+    """
+    import pandas as pd
+
+    def build(*rows):
+        days, instrument_ids, sides, quantities, values, commissions = zip(*rows)
+        return pd.DataFrame({
+            'transaction_id': range(1, len(rows) + 1),
+            'data_transakcji': pd.to_datetime(list(days)),
+            'instrument_id': instrument_ids, 'typ_transakcji': sides, 'ilosc': quantities,
+            'wartosc_transakcji': values, 'prowizja': commissions,
+        })
+    return build
+
+
+@pytest.fixture
+def position_flows(transaction_flows):
+    """Instrument 1 bought, partly sold, bought again and sold out; one buy of instrument 2."""
+    return transaction_flows(
+        ('2025-01-02', 1, 'KUPNO', 10.0, 100.0, 0.39),
+        ('2025-01-03', 1, 'SPRZEDAZ', 5.0, 60.0, 0.23),
+        ('2025-01-06', 1, 'KUPNO', 5.0, 100.0, 0.39),
+        ('2025-01-06', 2, 'KUPNO', 1.0, 30.0, 0.12),
+        ('2025-01-08', 1, 'SPRZEDAZ', 10.0, 200.0, 0.78),
+    )
+
+
+@pytest.fixture
+def value_history():
+    """Build a daily value series (data, wartosc) starting on 1 Jan 2025."""
+    import pandas as pd
+
+    def build(values):
+        return pd.DataFrame({
+            'data': pd.date_range('2025-01-01', periods=len(values)).date,
+            'wartosc': values,
+        })
+    return build
+
+
+@pytest.fixture
+def price_bars():
+    """Build n daily OHLC bars of a seeded random walk."""
+    import numpy as np
+    import pandas as pd
+
+    def build(n, start='2025-01-01'):
+        closes = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+        return pd.DataFrame({
+            'data': pd.date_range(start, periods=n),
+            'open': closes, 'high': closes + 1, 'low': closes - 1, 'close': closes,
+        })
+    return build
+
+
 # ============================================
 # INTEGRATION TEST FIXTURES
 # ============================================
@@ -0,0 +1,665 @@
+"""
+Unit tests for database connection helpers.
+Tests pool configuration and statistics without actual DB connection.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import PoolStats, ConnectionPool
+
+
+@pytest.fixture
+def fresh_pool():
+    """ConnectionPool singleton with no underlying pool and clean stats."""
+    pool = ConnectionPool()
+    saved = pool._pool
+    pool._pool = None
+    pool.reset_stats()
+    yield pool
+    pool._pool = saved
+    pool.reset_stats()
+
+
+class TestPoolStats:
+    """Tests for connection pool statistics."""
+
+    def test_acquire_updates_histogram(self):
+        """Test that wait times land in the right buckets."""
+        stats = PoolStats(buckets_ms=[1, 10])
+
+        stats.record_acquire(0.5)
+        stats.record_acquire(5)
+        stats.record_acquire(50)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot['acquires'] == 3
+        assert snapshot['wait_histogram'] == {'<=1ms': 1, '<=10ms': 1, '>10ms': 1}
+        assert snapshot['max_wait_ms'] == 50
+
+    def test_peak_in_use(self):
+        """Test that peak usage survives releases."""
+        stats = PoolStats()
+
+        stats.record_acquire(0)
+        stats.record_acquire(0)
+        stats.record_release()
+
+        snapshot = stats.snapshot()
+
+        assert snapshot['in_use'] == 1
+        assert snapshot['peak_in_use'] == 2
+
+    def test_failures(self):
+        """Test counting timeouts separately from other errors."""
+        stats = PoolStats()
+
+        stats.record_failure(timed_out=True)
+        stats.record_failure(timed_out=False)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot['timeouts'] == 1
+        assert snapshot['errors'] == 1
+        assert snapshot['avg_wait_ms'] == 0.0
+
+
+class TestConnectionPool:
+    """Tests for ConnectionPool configuration and instrumentation."""
+
+    @patch('db.connection.oracledb.create_pool')
+    def test_initialize_uses_pool_config(self, mock_create, fresh_pool):
+        """Test that pool sizing comes from POOL_CONFIG."""
+        with patch.dict('db.connection.POOL_CONFIG', {'min': 3, 'max': 7, 'getmode': 'TIMEDWAIT',
+                                                      'wait_timeout': 250}):
+            fresh_pool.initialize()
+
+        kwargs = mock_create.call_args.kwargs
+        assert kwargs['min'] == 3
+        assert kwargs['max'] == 7
+        assert kwargs['wait_timeout'] == 250
+
+    def test_initialize_unknown_getmode(self, fresh_pool):
+        """Test that an unknown getmode is rejected."""
+        with patch.dict('db.connection.POOL_CONFIG', {'getmode': 'SOMETIMES'}):
+            with pytest.raises(ValueError):
+                fresh_pool.initialize()
+
+    @patch('db.connection.oracledb.create_pool')
+    def test_get_connection_records_stats(self, mock_create, fresh_pool):
+        """Test that acquire and release are counted."""
+        mock_pool = MagicMock(opened=2, busy=1, min=2, max=10)
+        mock_create.return_value = mock_pool
+
+        connection = fresh_pool.get_connection()
+        fresh_pool.release_connection(connection)
+
+        stats = fresh_pool.get_stats()
+
+        assert stats['acquires'] == 1
+        assert stats['releases'] == 1
+        assert stats['opened'] == 2
+        assert stats['busy'] == 1
+        assert stats['initialized'] is True
+
+    @patch('db.connection.oracledb.create_pool')
+    def test_get_connection_timeout(self, mock_create, fresh_pool):
+        """Test that a TIMEDWAIT timeout is counted and re-raised."""
+        import oracledb
+
+        error_obj = MagicMock(full_code='DPY-4005')
+        mock_create.return_value.acquire.side_effect = oracledb.Error(error_obj)
+
+        with pytest.raises(oracledb.Error):
+            fresh_pool.get_connection()
+
+        assert fresh_pool.get_stats()['timeouts'] == 1
+
+
+class TestOutputTypeHandlers:
+    """Tests for fetch-time NUMBER conversion."""
+
+    def _metadata(self, scale):
+        import oracledb
+        return MagicMock(type_code=oracledb.DB_TYPE_NUMBER, scale=scale)
+
+    def test_float_handler_only_for_decimal_columns(self):
+        """Test that NUMBER(p,s) with s > 0 is fetched as BINARY_DOUBLE."""
+        import oracledb
+        from db.connection import float_output_handler
+
+        cursor = MagicMock(arraysize=100)
+        float_output_handler(cursor, self._metadata(4))
+        cursor.var.assert_called_once_with(oracledb.DB_TYPE_BINARY_DOUBLE, arraysize=100)
+
+        cursor.reset_mock()
+        assert float_output_handler(cursor, self._metadata(0)) is None
+        cursor.var.assert_not_called()
+
+    def test_fixed_point_handler_scales_exactly(self):
+        """Test that values become integers in units of 10**-scale."""
+        from db.connection import fixed_point_output_handler
+
+        cursor = MagicMock(arraysize=100)
+        fixed_point_output_handler(cursor, self._metadata(4))
+        convert = cursor.var.call_args.kwargs['outconverter']
+
+        assert convert('12.3456') == 123456
+        assert convert('-0.1') == -1000
+
+    @patch('db.connection.oracledb.create_pool')
+    def test_pooled_connections_get_handler(self, mock_create, fresh_pool):
+        """Test that acquired connections fetch money and prices as float."""
+        from db.connection import float_output_handler
+
+        connection = MagicMock()
+        mock_create.return_value.acquire.return_value = connection
+
+        assert fresh_pool.get_connection() is connection
+        assert connection.outputtypehandler is float_output_handler
+
+
+class TestIterQuery:
+    """Tests for streaming query helpers."""
+
+    @patch('db.connection.get_db_cursor')
+    def test_iter_query_fetches_in_batches(self, mock_get_cursor):
+        """Test that rows are fetched with fetchmany until exhausted."""
+        from db.connection import iter_query
+
+        mock_cursor = MagicMock()
+        mock_get_cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_get_cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+
+        rows = list(iter_query("SELECT x FROM t", arraysize=2))
+
+        assert rows == [(1,), (2,), (3,)]
+        assert mock_cursor.arraysize == 2
+        assert mock_cursor.fetchmany.call_count == 3
+        mock_cursor.fetchall.assert_not_called()
+
+    @patch('db.connection.get_db_cursor')
+    def test_iter_query_dict(self, mock_get_cursor):
+        """Test that rows are yielded as dicts with lowercase keys."""
+        from db.connection import iter_query_dict
+
+        mock_cursor = MagicMock()
+        mock_get_cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_get_cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_cursor.description = [('SYMBOL',), ('CENA',)]
+        mock_cursor.fetchmany.side_effect = [[('AAPL', 150.0)], []]
+
+        rows = list(iter_query_dict("SELECT symbol, cena FROM t", {'id': 1}))
+
+        assert rows == [{'symbol': 'AAPL', 'cena': 150.0}]
+        mock_cursor.execute.assert_called_once_with("SELECT symbol, cena FROM t", {'id': 1})
+
+    @patch('db.connection.get_db_cursor')
+    def test_iter_query_is_lazy(self, mock_get_cursor):
+        """Test that nothing is executed until iteration starts."""
+        from db.connection import iter_query
+
+        iter_query("SELECT 1 FROM DUAL")
+
+        mock_get_cursor.assert_not_called()
+
+
+class TestExecuteQueryFrame:
+    """Tests for the columnar query helper."""
+
+    @patch('db.connection.pyarrow', None)
+    @patch('db.connection.get_db_connection')
+    def test_frame_from_cursor_batches(self, mock_get_conn):
+        """Test that batches are assembled into typed columns."""
+        import oracledb
+        from db.connection import execute_query_frame
+
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+        mock_cursor.description = [
+            ('SYMBOL', oracledb.DB_TYPE_VARCHAR, None, None, None, None, True),
+            ('WOLUMEN', oracledb.DB_TYPE_NUMBER, None, None, None, None, True),
+            ('CENA', oracledb.DB_TYPE_NUMBER, None, None, None, None, True),
+        ]
+        mock_cursor.fetchmany.side_effect = [
+            [('AAPL', 100, 150.5), ('MSFT', 200, 300)],
+            [('GOOG', 50, None)],
+            [],
+        ]
+
+        df = execute_query_frame("SELECT symbol, wolumen, cena FROM t", arraysize=2)
+
+        assert list(df.columns) == ['symbol', 'wolumen', 'cena']
+        assert list(df['symbol']) == ['AAPL', 'MSFT', 'GOOG']
+        assert df['wolumen'].dtype == 'int64'
+        assert df['cena'].dtype == 'float64'
+        assert df['cena'].isna().sum() == 1
+        mock_cursor.close.assert_called_once()
+
+    @patch('db.connection.pyarrow', None)
+    @patch('db.connection.get_db_connection')
+    def test_empty_frame_keeps_columns(self, mock_get_conn):
+        """Test that an empty result still has the selected columns."""
+        import oracledb
+        from db.connection import execute_query_frame
+
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+        mock_cursor.description = [('CENA', oracledb.DB_TYPE_NUMBER, None, None, None, None, True)]
+        mock_cursor.fetchmany.side_effect = [[]]
+
+        df = execute_query_frame("SELECT cena FROM t")
+
+        assert df.empty
+        assert list(df.columns) == ['cena']
+
+
+class TestAsyncHelpers:
+    """Tests for the asyncio database helpers."""
+
+    @patch('db.connection_async._async_pool')
+    def test_execute_query_dict_async(self, mock_pool):
+        """Test that rows are returned as dicts with lowercase keys."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from db.connection_async import execute_query_dict_async
+
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchall = AsyncMock(return_value=[('AAPL', 150.0)])
+        mock_cursor.description = [('SYMBOL',), ('CENA',)]
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_pool.get_connection = AsyncMock(return_value=mock_conn)
+        mock_pool.release_connection = AsyncMock()
+
+        rows = asyncio.run(execute_query_dict_async("SELECT symbol, cena FROM t", {'id': 1}))
+
+        assert rows == [{'symbol': 'AAPL', 'cena': 150.0}]
+        mock_pool.release_connection.assert_awaited_once_with(mock_conn)
+        mock_cursor.close.assert_called_once()
+
+    @patch('db.connection_async._async_pool')
+    def test_call_procedure_async_out_params(self, mock_pool):
+        """Test that OUT parameters are created from types and returned."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from db.connection_async import call_procedure_async
+
+        out_var = MagicMock()
+        out_var.getvalue.return_value = 'OK: gotowe'
+        mock_cursor = MagicMock()
+        mock_cursor.callproc = AsyncMock()
+        mock_cursor.var.return_value = out_var
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_conn.commit = AsyncMock()
+        mock_pool.get_connection = AsyncMock(return_value=mock_conn)
+        mock_pool.release_connection = AsyncMock()
+
+        result = asyncio.run(call_procedure_async('pkg.proc', [1, 2], out_types=[str]))
+
+        assert result == ['OK: gotowe']
+        mock_cursor.callproc.assert_awaited_once_with('pkg.proc', [1, 2, out_var])
+        mock_conn.commit.assert_awaited_once()
+
+    def test_run_async_gathers_in_order(self):
+        """Test that several coroutines run concurrently and keep their order."""
+        import asyncio
+        from db.connection_async import run_async
+
+        async def slow(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        assert run_async(slow(1, 0)) == 1
+        assert run_async(slow('a', 0.02), slow('b', 0)) == ['a', 'b']
+
+
+class TestExecuteMany:
+    """Tests for the bulk DML helper."""
+
+    @patch('db.connection.get_db_connection')
+    def test_batches_and_errors(self, mock_get_conn):
+        """Test one round trip and commit per batch with row offsets in errors."""
+        from db.connection import execute_many
+
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+        type(mock_cursor).rowcount = property(lambda self: 2)
+        mock_cursor.getbatcherrors.side_effect = [
+            [],
+            [MagicMock(offset=0, code=1, message='ORA-00001: unique constraint')],
+        ]
+
+        rows = [{'id': i} for i in range(4)]
+        affected, errors = execute_many("INSERT INTO t VALUES (:id)", rows, batch_size=2)
+
+        assert mock_cursor.executemany.call_count == 2
+        assert mock_cursor.executemany.call_args_list[1].args[1] == [{'id': 2}, {'id': 3}]
+        assert mock_conn.commit.call_count == 2
+        assert affected == 4
+        assert errors == [{'row': 2, 'code': 1, 'message': 'ORA-00001: unique constraint'}]
+
+    @patch('db.connection.get_db_connection')
+    def test_empty_rows(self, mock_get_conn):
+        """Test that nothing is sent for an empty row list."""
+        from db.connection import execute_many
+
+        assert execute_many("INSERT INTO t VALUES (:id)", []) == (0, [])
+        mock_get_conn.assert_not_called()
+
+
+class TestRecords:
+    """Tests for typed row records."""
+
+    def test_record_converts_floats_and_acts_as_mapping(self):
+        """Test float conversion, dict-style access and pandas support."""
+        import pandas as pd
+        from decimal import Decimal
+        from db.records import record_type
+
+        factory = record_type(('symbol', 'ilosc_akcji'), ('ilosc_akcji',), ('cena_biezaca',))
+        row = factory('AAPL', Decimal('2.5'))
+        empty = factory('MSFT', None)
+
+        assert row['ilosc_akcji'] == 2.5 and isinstance(row.ilosc_akcji, float)
+        assert empty.get('ilosc_akcji') == 0.0
+        assert row.get('missing', 'x') == 'x'
+        assert row == {'symbol': 'AAPL', 'ilosc_akcji': 2.5, 'cena_biezaca': None}
+        assert not hasattr(row, '__dict__')
+
+        row['cena_biezaca'] = 10.0
+        assert dict(row)['cena_biezaca'] == 10.0
+        with pytest.raises(KeyError):
+            row['unknown'] = 1
+
+        df = pd.DataFrame.from_records([row, empty])
+        assert list(df.columns) == ['symbol', 'ilosc_akcji', 'cena_biezaca']
+
+    def test_record_type_is_cached(self):
+        """Test that one type is generated per column layout."""
+        from db.records import record_type
+
+        assert record_type(('a', 'b')) is record_type(('a', 'b'))
+        assert record_type(('a', 'b')) is not record_type(('a', 'b'), ('a',))
+
+    @patch('db.connection.get_db_cursor')
+    def test_execute_query_records_sets_rowfactory(self, mock_get_cursor):
+        """Test that rows are built by the cursor row factory."""
+        from db.connection import execute_query_records
+
+        mock_cursor = MagicMock()
+        mock_cursor.description = [('SYMBOL',), ('CENA',)]
+        mock_cursor.fetchall.side_effect = lambda: [
+            mock_cursor.rowfactory('AAPL', None)
+        ]
+        mock_get_cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_get_cursor.return_value.__exit__ = MagicMock(return_value=False)
+
+        rows = execute_query_records("SELECT symbol, cena FROM t", float_fields=('cena',))
+
+        assert rows[0].symbol == 'AAPL'
+        assert rows[0].cena == 0.0
+
+
+class TestExecuteQueryBatch:
+    """Tests for batching several queries into one round trip."""
+
+    @patch('db.connection.QUERY_BATCH_MODE', 'plsql')
+    @patch('db.connection.get_db_connection')
+    def test_plsql_block_with_ref_cursors(self, mock_get_conn):
+        """Test that one block opens a prefetching REF CURSOR per query."""
+        from db.connection import execute_query_batch
+
+        block_cursor = MagicMock()
+        first, second = MagicMock(), MagicMock()
+        first.description = [('ID',)]
+        first.fetchall.return_value = [(1,), (2,)]
+        second.description = [('MIN_DATE',), ('MAX_DATE',)]
+        second.fetchall.return_value = [('a', 'b')]
+        mock_conn = MagicMock()
+        mock_conn.cursor.side_effect = [block_cursor, first, second]
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+
+        results = execute_query_batch({
+            'ids': ("SELECT id FROM t WHERE u = :user_id", {'user_id': 5}),
+            'range': ("SELECT MIN(d) min_date, MAX(d) max_date FROM t", None),
+        })
+
+        block, params = block_cursor.execute.call_args.args
+        assert block_cursor.execute.call_count == 1
+        assert "OPEN :batch_cursor_0 FOR SELECT id FROM t WHERE u = :user_id;" in block
+        assert "OPEN :batch_cursor_1 FOR SELECT MIN(d)" in block
+        assert params == {'user_id': 5, 'batch_cursor_0': first, 'batch_cursor_1': second}
+        assert first.prefetchrows > 0
+        assert results == {
+            'ids': [{'id': 1}, {'id': 2}],
+            'range': [{'min_date': 'a', 'max_date': 'b'}],
+        }
+        first.close.assert_called_once()
+        block_cursor.close.assert_called_once()
+
+    def test_conflicting_binds_rejected(self):
+        """Test that a bind name shared with different values is an error."""
+        from db.connection import merge_batch_params
+
+        assert merge_batch_params({
+            'a': ("SELECT 1 FROM t WHERE id = :id", {'id': 1}),
+            'b': ("SELECT 2 FROM t WHERE id = :id", {'id': 1}),
+        }) == {'id': 1}
+        with pytest.raises(ValueError):
+            merge_batch_params({
+                'a': ("SELECT 1 FROM t WHERE id = :id", {'id': 1}),
+                'b': ("SELECT 2 FROM t WHERE id = :id", {'id': 2}),
+            })
+
+    @patch('db.connection.QUERY_BATCH_MODE', 'pipeline')
+    @patch('db.connection_async._async_pool')
+    @patch('db.connection_async.oracledb.create_pipeline')
+    def test_pipeline_mode(self, mock_create_pipeline, mock_pool):
+        """Test that pipeline mode adds one fetchall per query and runs them together."""
+        from unittest.mock import AsyncMock
+        from db.connection import execute_query_batch
+
+        pipeline = MagicMock()
+        mock_create_pipeline.return_value = pipeline
+        column = MagicMock()
+        column.name = 'ID'
+        op_result = MagicMock(columns=[column], rows=[(7,)])
+        mock_conn = MagicMock()
+        mock_conn.run_pipeline = AsyncMock(return_value=[op_result])
+        mock_pool.get_connection = AsyncMock(return_value=mock_conn)
+        mock_pool.release_connection = AsyncMock()
+
+        results = execute_query_batch({'ids': ("SELECT id FROM t", {'id': 7})})
+
+        pipeline.add_fetchall.assert_called_once_with("SELECT id FROM t", {'id': 7})
+        mock_conn.run_pipeline.assert_awaited_once_with(pipeline)
+        assert results == {'ids': [{'id': 7}]}
+
+    def test_empty_batch(self):
+        """Test that an empty batch needs no connection."""
+        from db.connection import execute_query_batch
+
+        assert execute_query_batch({}) == {}
+
+
+class TestUnitOfWork:
+    """Tests for the shared-transaction context manager."""
+
+    @patch('db.connection.release_connection')
+    @patch('db.connection.get_connection')
+    def test_shares_connection_and_commits_once(self, mock_get, mock_release):
+        """Test that helpers reuse the unit's connection and only the unit commits."""
+        from db.connection import unit_of_work, get_db_connection, execute_dml
+
+        connection = MagicMock()
+        mock_get.return_value = connection
+
+        with unit_of_work():
+            with get_db_connection() as inner:
+                assert inner is connection
+            execute_dml("UPDATE t SET x = 1")
+            execute_dml("UPDATE t SET x = 2")
+            connection.commit.assert_not_called()
+
+        mock_get.assert_called_once()
+        connection.commit.assert_called_once()
+        mock_release.assert_called_once_with(connection)
+
+    @patch('db.connection.release_connection')
+    @patch('db.connection.get_connection')
+    def test_exception_rolls_back(self, mock_get, mock_release):
+        """Test that an exception discards the work and is re-raised."""
+        from db.connection import unit_of_work, current_unit_of_work
+
+        connection = MagicMock()
+        mock_get.return_value = connection
+
+        with pytest.raises(RuntimeError):
+            with unit_of_work():
+                raise RuntimeError("boom")
+
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
+        assert current_unit_of_work() is None
+
+    @patch('db.connection.release_connection')
+    @patch('db.connection.get_connection')
+    def test_nested_joins_outer(self, mock_get, mock_release):
+        """Test that a nested unit joins the outer one and a rollback sticks."""
+        from db.connection import unit_of_work
+
+        connection = MagicMock()
+        mock_get.return_value = connection
+
+        with unit_of_work() as outer:
+            with unit_of_work() as inner:
+                assert inner is outer
+                inner.rollback()
+
+        mock_get.assert_called_once()
+        connection.commit.assert_not_called()
+
+
+class TestInstrumentation:
+    """Tests for per-statement latency instrumentation."""
+
+    def test_statement_name_from_queries(self):
+        """Test that Queries constants are reported by name."""
+        from db.instrumentation import statement_name
+        from db.queries import Queries
+
+        assert statement_name(Queries.GET_DATE_RANGE) == 'GET_DATE_RANGE'
+        assert statement_name('pkg_gielda.oblicz_wartosc_portfela') == 'pkg_gielda.oblicz_wartosc_portfela'
+        assert statement_name("SELECT COUNT(*) as cnt FROM GIELDY") == "SELECT COUNT(*) as cnt FROM GIELDY"
+
+    def test_bind_shape_hides_values(self):
+        """Test that bind shapes contain names and types only."""
+        from db.instrumentation import bind_shape
+
+        assert bind_shape({'login': 'jan', 'user_id': 1}) == 'login:str,user_id:int'
+        assert bind_shape(['jan', 'tajne_haslo']) == 'str,str'
+        assert bind_shape(None) == ''
+
+    def test_query_stats_histogram(self):
+        """Test aggregation per statement and bind shape."""
+        from db.instrumentation import QueryStats
+
+        stats = QueryStats(buckets_ms=[10])
+        stats.record('GET_X', 'id:int', 3, 1.0, 5.0)
+        stats.record('GET_X', 'id:int', 1, 2.0, 15.0, failed=True)
+        stats.record('GET_Y', '', 0, 0.0, 1.0)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot[0]['statement'] == 'GET_X'
+        assert snapshot[0]['calls'] == 2
+        assert snapshot[0]['errors'] == 1
+        assert snapshot[0]['rows'] == 4
+        assert snapshot[0]['avg_ms'] == 10.0
+        assert snapshot[0]['histogram'] == {'<=10ms': 1, '>10ms': 1}
+
+    @patch('db.connection.get_db_cursor')
+    def test_execute_query_dict_records_stats(self, mock_get_cursor):
+        """Test that the helpers record rows per statement."""
+        from db.connection import execute_query_dict
+        from db.instrumentation import get_query_stats, reset_query_stats
+        from db.queries import Queries
+
+        mock_cursor = MagicMock()
+        mock_get_cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_get_cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_cursor.description = [('ID',)]
+        mock_cursor.fetchall.return_value = [(1,), (2,)]
+
+        reset_query_stats()
+        execute_query_dict(Queries.GET_PORTFOLIO_BY_ID, {'portfolio_id': 1})
+
+        entry = get_query_stats()[0]
+        assert entry['statement'] == 'GET_PORTFOLIO_BY_ID'
+        assert entry['binds'] == 'portfolio_id:int'
+        assert entry['rows'] == 2
+
+    @patch('db.connection.get_db_cursor')
+    def test_iter_query_records_stats_when_closed(self, mock_get_cursor):
+        """Test that a streamed query records its rows when exhausted or closed early."""
+        from db.connection import iter_query_dict
+        from db.instrumentation import get_query_stats, reset_query_stats
+        from db.queries import Queries
+
+        mock_cursor = MagicMock()
+        mock_get_cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_get_cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_cursor.description = [('ID',)]
+        mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+
+        reset_query_stats()
+        assert len(list(iter_query_dict(Queries.GET_PORTFOLIO_BY_ID, {'portfolio_id': 1}))) == 3
+        entry = get_query_stats()[0]
+        assert entry['statement'] == 'GET_PORTFOLIO_BY_ID'
+        assert entry['calls'] == 1 and entry['rows'] == 3 and entry['errors'] == 0
+
+        mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+        rows = iter_query_dict(Queries.GET_PORTFOLIO_BY_ID, {'portfolio_id': 1})
+        next(rows)
+        rows.close()
+        entry = get_query_stats()[0]
+        assert entry['calls'] == 2 and entry['rows'] == 5 and entry['errors'] == 0
+
+    @patch('db.instrumentation._get_slow_log')
+    def test_slow_statement_is_logged(self, mock_get_log):
+        """Test that only statements over the threshold go to the slow-query log."""
+        from db.instrumentation import instrument
+
+        with patch.dict('db.instrumentation.QUERY_STATS_CONFIG', {'slow_threshold_ms': 0}):
+            with instrument('pkg_gielda.wplac_srodki', [1, 2.0]):
+                pass
+
+        args = mock_get_log.return_value.warning.call_args.args
+        assert 'pkg_gielda.wplac_srodki' in args
+        assert 'int,float' in args
+
+        mock_get_log.reset_mock()
+        with patch.dict('db.instrumentation.QUERY_STATS_CONFIG', {'slow_threshold_ms': 60000}):
+            with instrument('pkg_gielda.wplac_srodki', [1, 2.0]):
+                pass
+
+        mock_get_log.assert_not_called()
@@ -268,6 +268,34 @@ class TestMarketIntegration:
 
         assert sectors is not None
 
+    def test_get_instruments_with_prices_matches_latest_price(self):
+        """Test that the set-based prices match the per-instrument lookup."""
+        from services.market_service import MarketService
+
+        instruments = MarketService.get_instruments_with_prices()
+
+        assert len(instruments) == len(MarketService.get_all_instruments())
+        for inst in instruments[:5]:
+            latest = MarketService.get_latest_price_data(inst['instrument_id'])
+            if latest:
+                assert inst['cena_zamkniecia'] == latest['cena_zamkniecia']
+                assert inst['data_notowan'] == latest['data_notowan']
+            else:
+                assert inst['cena_zamkniecia'] is None
+
+    def test_latest_price_snapshot_matches_daily_data(self):
+        """Test that NOTOWANIA_BIEZACE holds the last quote from DANE_DZIENNE."""
+        from services.market_service import MarketService
+        from datetime import date
+
+        latest = MarketService.get_instruments_with_prices()
+        as_of = MarketService.get_instruments_with_prices(date(9999, 12, 31))
+
+        assert [i['instrument_id'] for i in latest] == [i['instrument_id'] for i in as_of]
+        for snapshot, daily in zip(latest, as_of):
+            assert snapshot['cena_zamkniecia'] == daily['cena_zamkniecia']
+            assert snapshot['data_notowan'] == daily['data_notowan']
+
     def test_get_date_range(self):
         """Test getting available date range."""
         from services.market_service import MarketService
@@ -277,6 +305,18 @@ class TestMarketIntegration:
         if min_date and max_date:
             assert min_date <= max_date
 
+    def test_trading_calendar_neighbours(self):
+        """Test that next/previous trading days step through the calendar."""
+        from services.market_service import MarketService
+
+        dates = sorted(MarketService._as_date(d) for d in MarketService.get_available_dates())
+        if len(dates) < 2:
+            pytest.skip("Not enough trading days loaded")
+
+        assert MarketService.get_next_trading_day(dates[0]) == dates[1]
+        assert MarketService.get_previous_trading_day(dates[1]) == dates[0]
+        assert MarketService.get_previous_trading_day(dates[0]) is None
+
 
 class TestOrderIntegration:
     """Integration tests for order operations."""
@@ -393,6 +433,84 @@ class TestFullTradingFlow:
         assert position is not None
         assert float(position['ilosc_akcji']) == 10
 
+    def test_portfolio_values_for_range_match_snapshots(self, trading_setup):
+        """Test that the pipelined range valuation returns the daily snapshots."""
+        from services.order_service import OrderService
+        from services.portfolio_service import PortfolioService
+        from services.market_service import MarketService
+
+        if not trading_setup['instrument_id']:
+            pytest.skip("No instrument with price data available")
+
+        portfolio_id = trading_setup['portfolio_id']
+        min_date, max_date = MarketService.get_date_range()
+        OrderService.create_and_execute_buy(
+            portfolio_id, trading_setup['instrument_id'], 5, trading_setup['price'], max_date
+        )
+
+        values = PortfolioService.get_portfolio_values_for_range(portfolio_id, min_date, max_date)
+
+        assert not values.empty
+        assert values.iloc[-1]['wartosc_pozycji'] > 0
+        for row in values.tail(3).itertuples():
+            expected = PortfolioService.get_portfolio_summary_for_date(portfolio_id, row.data_sesji)
+            assert row.wartosc_calkowita == pytest.approx(expected['wartosc_calkowita'], abs=0.01)
+
+    def test_snapshot_tracks_backdated_buy(self, trading_setup):
+        """Test that a buy on a past session shows up in that day's snapshot."""
+        from services.order_service import OrderService
+        from services.portfolio_service import PortfolioService
+        from services.market_service import MarketService
+
+        if not trading_setup['instrument_id']:
+            pytest.skip("No instrument with price data available")
+
+        portfolio_id = trading_setup['portfolio_id']
+        _, max_date = MarketService.get_date_range()
+        success, message = OrderService.create_and_execute_buy(
+            portfolio_id, trading_setup['instrument_id'], 5, trading_setup['price'], max_date
+        )
+        assert success, f"Buy failed: {message}"
+
+        before = PortfolioService.get_portfolio_summary_for_date(
+            portfolio_id, MarketService.get_previous_trading_day(max_date)
+        )
+        after = PortfolioService.get_portfolio_summary_for_date(portfolio_id, max_date)
+        portfolio = PortfolioService.get_portfolio(portfolio_id)
+
+        assert after['liczba_pozycji'] == 1
+        assert after['saldo_gotowkowe'] == pytest.approx(float(portfolio['saldo_gotowkowe']), abs=0.01)
+        if before:
+            assert before['liczba_pozycji'] == 0
+            assert before['wartosc_calkowita'] == pytest.approx(50000, abs=0.01)
+
+    def test_value_for_date_reads_snapshot(self, trading_setup):
+        """Test that the time-travel value uses that day's snapshot, not today's holdings."""
+        from services.order_service import OrderService
+        from services.portfolio_service import PortfolioService
+        from services.market_service import MarketService
+
+        if not trading_setup['instrument_id']:
+            pytest.skip("No instrument with price data available")
+
+        portfolio_id = trading_setup['portfolio_id']
+        _, max_date = MarketService.get_date_range()
+        success, message = OrderService.create_and_execute_buy(
+            portfolio_id, trading_setup['instrument_id'], 5, trading_setup['price'], max_date
+        )
+        assert success, f"Buy failed: {message}"
+
+        snapshot = PortfolioService.get_portfolio_summary_for_date(portfolio_id, max_date)
+        value = PortfolioService.get_portfolio_value_for_date(portfolio_id, max_date)
+        assert value == pytest.approx(snapshot['wartosc_calkowita'], abs=0.01)
+
+        previous_day = MarketService.get_previous_trading_day(max_date)
+        before = PortfolioService.get_portfolio_summary_for_date(portfolio_id, previous_day)
+        if before:
+            assert PortfolioService.get_portfolio_value_for_date(
+                portfolio_id, previous_day
+            ) == pytest.approx(before['wartosc_calkowita'], abs=0.01)
+
     def test_buy_then_sell(self, trading_setup):
         """Test complete buy and sell flow."""
         from services.order_service import OrderService
@@ -7,6 +7,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 import sys
 import os
+from datetime import date, datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -213,6 +214,99 @@ class TestProceduresPortfolio:
         assert success is True
         assert 'wpłacone' in message.lower()
 
+    @patch('db.procedures.get_db_connection')
+    def test_update_all_portfolios(self, mock_get_conn):
+        """Test revaluing every portfolio with one procedure call."""
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+        mock_conn.cursor.return_value = mock_cursor
+
+        success, message = Procedures.update_all_portfolios(date(2025, 1, 3))
+
+        assert success is True
+        mock_cursor.callproc.assert_called_once_with(
+            'pkg_gielda.aktualizuj_wszystkie_portfele', [date(2025, 1, 3)]
+        )
+
+    @patch('db.procedures.get_db_connection')
+    def test_refresh_portfolio_snapshots(self, mock_get_conn):
+        """Test recalculating one portfolio's snapshots from a given day."""
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+        mock_conn.cursor.return_value = mock_cursor
+
+        success, message = Procedures.refresh_portfolio_snapshots(1, date(2025, 1, 3))
+
+        assert success is True
+        mock_cursor.callproc.assert_called_once_with(
+            'pkg_gielda.odswiez_migawki_portfeli', [1, date(2025, 1, 3)]
+        )
+
+    @patch('db.procedures.get_db_connection')
+    def test_match_limit_orders(self, mock_get_conn):
+        """Test the matching job returns counts, timings and executed orders."""
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        executed_cursor = MagicMock()
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+        mock_conn.cursor.side_effect = [mock_cursor, executed_cursor]
+
+        values = iter([10, 3, 2, 20, 40, "OK: Skojarzono zlecenia z dni 2025-03-03 - 2025-03-04. Wykonano: 2/3"])
+        variables = []
+        def make_var(*args):
+            var = MagicMock()
+            var.getvalue.return_value = next(values)
+            variables.append(var)
+            return var
+        mock_cursor.var.side_effect = make_var
+        executed_cursor.description = [('ORDER_ID',), ('SYMBOL',)]
+        executed_cursor.__iter__.return_value = iter([(5, 'AAPL'), (6, 'MSFT')])
+
+        success, message, stats, executed = Procedures.match_limit_orders(
+            date(2025, 3, 3), date(2025, 3, 4), 1
+        )
+
+        assert success is True
+        assert stats == {
+            'sprawdzone': 10, 'spelnione': 3, 'wykonane': 2, 'odrzucone': 1,
+            'czas_wyboru_ms': 20, 'czas_realizacji_ms': 40,
+        }
+        assert executed == [{'order_id': 5, 'symbol': 'AAPL'}, {'order_id': 6, 'symbol': 'MSFT'}]
+        proc_name, params = mock_cursor.callproc.call_args.args
+        assert proc_name == 'pkg_gielda_ext.kojarz_zlecenia_limit'
+        assert params == [date(2025, 3, 3), date(2025, 3, 4), 1, *variables, executed_cursor]
+
+    @patch('db.procedures.get_db_connection')
+    def test_process_limit_orders_range(self, mock_get_conn):
+        """Test the date-jump wrapper passes the portfolio and range and returns executed orders."""
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        executed_cursor = MagicMock()
+        mock_get_conn.return_value.__enter__ = MagicMock(return_value=mock_conn)
+        mock_get_conn.return_value.__exit__ = MagicMock(return_value=False)
+        mock_conn.cursor.side_effect = [mock_cursor, executed_cursor]
+
+        result_var = MagicMock()
+        result_var.getvalue.return_value = "OK: Skojarzono zlecenia z dni 2025-01-02 - 2025-12-31. Wykonano: 1/1"
+        mock_cursor.var.return_value = result_var
+        executed_cursor.description = [('ORDER_ID',), ('SYMBOL',)]
+        executed_cursor.__iter__.return_value = iter([(5, 'AAPL')])
+
+        success, message, executed = Procedures.process_limit_orders_range(
+            1, date(2025, 1, 1), date(2025, 12, 31)
+        )
+
+        assert success is True
+        assert executed == [{'order_id': 5, 'symbol': 'AAPL'}]
+        proc_name, params = mock_cursor.callproc.call_args.args
+        assert proc_name == 'pkg_gielda_ext.przetworz_zlecenia_limit_zakres'
+        assert params == [1, date(2025, 1, 1), date(2025, 12, 31), result_var, executed_cursor]
+
     @patch('db.procedures.get_db_connection')
     def test_withdraw_funds_success(self, mock_get_conn):
         """Test successful withdrawal."""
@@ -424,9 +518,19 @@ class TestProceduresPrice:
 class TestCreateAndExecuteMarketOrder:
     """Tests for combined market order creation and execution."""
 
+    @pytest.fixture(autouse=True)
+    def mock_connection(self):
+        """Pooled connection used by the unit of work."""
+        connection = MagicMock()
+        with patch('db.connection.get_connection', return_value=connection), \
+                patch('db.connection.release_connection') as mock_release:
+            yield connection
+            mock_release.assert_called_once_with(connection)
+
+    @patch('db.procedures.Procedures.refresh_portfolio_snapshots')
     @patch('db.procedures.Procedures.execute_buy_order')
     @patch('db.procedures.Procedures.create_order')
-    def test_create_and_execute_buy(self, mock_create, mock_execute):
+    def test_create_and_execute_buy(self, mock_create, mock_execute, mock_refresh, mock_connection):
         """Test creating and executing a buy market order."""
         from db.procedures import create_and_execute_market_order
 
@@ -438,11 +542,37 @@ class TestCreateAndExecuteMarketOrder:
             instrument_id=1,
             order_side='KUPNO',
             quantity=10,
-            price=150.00
+            price=150.00,
+            order_date=datetime(2025, 1, 3)
         )
 
         assert success is True
         mock_execute.assert_called_once()
+        # The trade refreshes its own snapshots, even though the unit commits it
+        mock_refresh.assert_not_called()
+        mock_connection.commit.assert_called_once()
+
+    @patch('db.procedures.Procedures.execute_buy_order')
+    @patch('db.procedures.Procedures.create_order')
+    def test_snapshot_failure_rolls_back_trade(self, mock_create, mock_execute, mock_connection):
+        """Test that a trade failing on its snapshot refresh rolls back the created order."""
+        from db.procedures import create_and_execute_market_order
+
+        mock_create.return_value = (True, "Zlecenie utworzone", 1)
+        mock_execute.return_value = (False, "Błąd podczas odświeżania migawek portfela")
+
+        success, message = create_and_execute_market_order(
+            portfolio_id=1,
+            instrument_id=1,
+            order_side='KUPNO',
+            quantity=10,
+            price=150.00
+        )
+
+        assert success is False
+        assert 'migawek' in message
+        mock_connection.rollback.assert_called_once()
+        mock_connection.commit.assert_not_called()
 
     @patch('db.procedures.Procedures.execute_sell_order')
     @patch('db.procedures.Procedures.create_order')
@@ -481,3 +611,52 @@ class TestCreateAndExecuteMarketOrder:
 
         assert success is False
         assert 'Niewystarczające' in message
+
+    @patch('db.procedures.Procedures.execute_buy_order')
+    @patch('db.procedures.Procedures.create_order')
+    def test_execute_fails_rolls_back_order(self, mock_create, mock_execute, mock_connection):
+        """Test that a failed execution also discards the created order."""
+        from db.procedures import create_and_execute_market_order
+
+        mock_create.return_value = (True, "Zlecenie utworzone", 1)
+        mock_execute.return_value = (False, "Niewystarczające środki na koncie")
+
+        success, message = create_and_execute_market_order(
+            portfolio_id=1,
+            instrument_id=1,
+            order_side='KUPNO',
+            quantity=1000,
+            price=150.00
+        )
+
+        assert success is False
+        mock_connection.rollback.assert_called_once()
+        mock_connection.commit.assert_not_called()
+
+
+class TestCommitMode:
+    """Tests for passing transaction control to PL/SQL procedures."""
+
+    def test_outside_unit_of_work(self):
+        """Test that procedures commit themselves by default."""
+        from db.procedures import commit_mode
+
+        assert commit_mode() == {}
+
+    @patch('db.connection.release_connection')
+    @patch('db.connection.get_connection')
+    def test_inside_unit_of_work(self, mock_get, mock_release):
+        """Test that procedures leave the commit to the unit of work."""
+        from db.connection import unit_of_work
+
+        mock_cursor = MagicMock()
+        mock_cursor.var.return_value.getvalue.return_value = 'OK: Zlecenie anulowane'
+        mock_get.return_value.cursor.return_value = mock_cursor
+
+        with unit_of_work():
+            success, _ = Procedures.cancel_order(1)
+
+        assert success is True
+        assert mock_cursor.callproc.call_args.args[2] == {'p_zatwierdz': False}
+        mock_get.return_value.commit.assert_called_once()
+
@@ -3,7 +3,8 @@ Unit tests for service layer with mocked database.
 """
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 from datetime import date, datetime
 import sys
 import os
@@ -85,10 +86,10 @@ class TestPortfolioService:
         assert result is not None
         assert result['wartosc_calkowita'] == 0.0
 
-    @patch('services.portfolio_service.execute_query_dict')
+    @patch('services.portfolio_service.execute_query_records')
     def test_get_positions(self, mock_execute):
         """Test getting portfolio positions."""
-        from services.portfolio_service import PortfolioService
+        from services.portfolio_service import PortfolioService, POSITION_FLOAT_FIELDS
 
         mock_execute.return_value = [
             {'position_id': 1, 'symbol': 'AAPL'},
@@ -98,6 +99,7 @@ class TestPortfolioService:
         result = PortfolioService.get_positions(1)
 
         assert len(result) == 2
+        assert mock_execute.call_args.kwargs['float_fields'] == POSITION_FLOAT_FIELDS
 
     @patch('services.portfolio_service.Procedures')
     def test_get_portfolio_value(self, mock_procedures):
@@ -110,6 +112,56 @@ class TestPortfolioService:
 
         assert result == 15000.00
 
+    @patch('services.portfolio_service.execute_query_frame')
+    def test_get_portfolio_values_for_range(self, mock_frame):
+        """Test that a value history is one pipelined-function query."""
+        import pandas as pd
+        from services.portfolio_service import PortfolioService
+        from db.queries import Queries
+
+        mock_frame.return_value = pd.DataFrame({
+            'data_sesji': [date(2025, 1, 2), date(2025, 1, 3)],
+            'wartosc_calkowita': [10000.0, 10100.0],
+        })
+
+        result = PortfolioService.get_portfolio_values_for_range(1, date(2025, 1, 1), date(2025, 1, 31))
+
+        assert list(result['wartosc_calkowita']) == [10000.0, 10100.0]
+        mock_frame.assert_called_once_with(
+            Queries.GET_PORTFOLIO_VALUES_FOR_RANGE,
+            {'portfolio_id': 1, 'start_date': date(2025, 1, 1), 'end_date': date(2025, 1, 31)}
+        )
+
+    @patch('services.portfolio_service.execute_query_dict')
+    def test_get_portfolio_summary_for_date(self, mock_execute):
+        """Test that a historical summary is one snapshot lookup."""
+        from services.portfolio_service import PortfolioService
+        from db.queries import Queries
+
+        mock_execute.return_value = [{
+            'data_sesji': datetime(2025, 1, 3), 'saldo_gotowkowe': 9000.0,
+            'wartosc_pozycji': 1100.0, 'wartosc_zakupu': 1000.0,
+            'zysk_strata_pozycji': 100.0, 'wartosc_calkowita': 10100.0, 'liczba_pozycji': 1
+        }]
+
+        result = PortfolioService.get_portfolio_summary_for_date(1, date(2025, 1, 5))
+
+        assert result['wartosc_calkowita'] == 10100.0
+        assert result['zysk_strata_pozycji'] == 100.0
+        mock_execute.assert_called_once_with(
+            Queries.GET_PORTFOLIO_SNAPSHOT_FOR_DATE,
+            {'portfolio_id': 1, 'target_date': date(2025, 1, 5)}
+        )
+
+    @patch('services.portfolio_service.execute_query_dict')
+    def test_get_portfolio_summary_for_date_before_history(self, mock_execute):
+        """Test that a date before the first snapshot returns None."""
+        from services.portfolio_service import PortfolioService
+
+        mock_execute.return_value = []
+
+        assert PortfolioService.get_portfolio_summary_for_date(1, date(2024, 1, 1)) is None
+
     @patch('services.portfolio_service.Procedures')
     def test_get_portfolio_value_none(self, mock_procedures):
         """Test getting portfolio value when None."""
@@ -178,6 +230,93 @@ class TestPortfolioService:
 
         assert result == 0.0
 
+    @patch.dict('services.price_matrix.PRICE_MATRIX_CONFIG', {'enabled': False})
+    @patch('services.market_service.MarketService.get_all_instruments')
+    @patch('services.market_service.execute_query')
+    @patch('services.portfolio_service.PositionLedgerService.positions_as_of')
+    def test_get_positions_for_date_bulk_prices(self, mock_held, mock_prices, mock_instruments):
+        """Test that replayed holdings are priced by one query and valued together."""
+        from services.portfolio_service import PortfolioService
+
+        def held(ilosc, srednia):
+            return {'ilosc_akcji': ilosc, 'srednia_cena_zakupu': srednia,
+                    'wartosc_zakupu': round(ilosc * srednia, 2),
+                    'data_pierwszego_zakupu': date(2025, 1, 2), 'data_ostatniej_zmiany': date(2025, 1, 2)}
+
+        mock_held.return_value = {1: held(10, 150), 2: held(5, 0), 4: held(1, 10)}
+        mock_instruments.return_value = [
+            {'instrument_id': 1, 'symbol': 'AAPL', 'nazwa_pelna': 'Apple Inc.', 'waluta_notowania': 'USD'},
+            {'instrument_id': 2, 'symbol': 'MSFT', 'nazwa_pelna': 'Microsoft', 'waluta_notowania': 'USD'},
+        ]
+        # Instrument 4 has no quote yet
+        mock_prices.return_value = [(1, 160.0), (2, 20.0)]
+
+        result = PortfolioService.get_positions_for_date(1, date(2025, 2, 1))
+
+        mock_held.assert_called_once_with(1, date(2025, 2, 1))
+        assert mock_prices.call_count == 1
+        assert mock_prices.call_args.args[1]['instrument_ids'] == '[1, 2, 4]'
+        assert [pos['instrument_id'] for pos in result] == [1, 2]
+        assert result[0]['symbol'] == 'AAPL'
+        assert result[0]['cena_biezaca'] == 160.0
+        assert result[0]['wartosc_biezaca'] == 1600.0
+        assert result[0]['wartosc_zakupu'] == 1500.0
+        assert result[0]['zysk_strata'] == 100.0
+        assert result[0]['zysk_strata_procent'] == 6.67
+        assert result[1]['zysk_strata_procent'] == 0.0
+
+    @patch('services.market_service.execute_query')
+    @patch('services.portfolio_service.execute_query_batch')
+    def test_get_page_data(self, mock_batch, mock_market):
+        """Test batching sidebar, summary and positions queries for a page load."""
+        from services.portfolio_service import PortfolioService
+
+        mock_market.return_value = [(date(2024, 1, 1), date(2024, 12, 31))]
+        mock_batch.return_value = {
+            'portfolios': [{'portfolio_id': 1}],
+            'summary': [{'saldo_gotowkowe': 1000, 'wartosc_pozycji': 500}],
+            'positions': [{'instrument_id': 1, 'ilosc_akcji': 10, 'wartosc_biezaca': None}],
+        }
+
+        result = PortfolioService.get_page_data(1, user_id=3, include_positions=True)
+
+        queries = mock_batch.call_args.args[0]
+        assert list(queries) == ['portfolios', 'summary', 'positions']
+        assert queries['portfolios'][1] == {'user_id': 3}
+        assert result['date_range'] == (date(2024, 1, 1), date(2024, 12, 31))
+        assert result['summary']['wartosc_calkowita'] == 1500
+        assert result['positions'][0]['ilosc_akcji'] == 10.0
+        assert result['positions'][0]['wartosc_biezaca'] == 0.0
+        assert result['positions'][0]['cena_biezaca'] is None
+
+    @patch('services.portfolio_service.execute_query_batch')
+    def test_get_page_data_portfolio_only(self, mock_batch):
+        """Test that user and position queries are skipped unless requested."""
+        from services.portfolio_service import PortfolioService
+
+        mock_batch.return_value = {'summary': []}
+
+        result = PortfolioService.get_page_data(1)
+
+        assert list(mock_batch.call_args.args[0]) == ['summary']
+        assert result == {'summary': None}
+
+    @patch('services.portfolio_service.execute_query_records_async', new_callable=AsyncMock)
+    @patch('services.portfolio_service.call_function_async', new_callable=AsyncMock)
+    def test_get_portfolios_totals_async(self, mock_function, mock_execute):
+        """Test summing values and positions over several portfolios."""
+        from services.portfolio_service import PortfolioService
+
+        mock_function.side_effect = [1000.0, None]
+        mock_execute.side_effect = [[{'instrument_id': 1}], [{'instrument_id': 2}, {'instrument_id': 3}]]
+
+        total_value, total_positions = asyncio.run(
+            PortfolioService.get_portfolios_totals_async([1, 2])
+        )
+
+        assert total_value == 1000.0
+        assert total_positions == 3
+
 
 class TestUserService:
     """Tests for UserService."""
@@ -372,6 +511,79 @@ class TestOrderService:
 
         assert result is False
 
+    @patch('services.order_service.Procedures')
+    def test_process_limit_orders_for_range(self, mock_procedures):
+        """Test that a date jump matches the portfolio's orders up to the new date in one call."""
+        from services.order_service import OrderService
+
+        mock_procedures.process_limit_orders_range.return_value = (True, "Wykonano: 1/1", [
+            {'order_id': 5, 'portfolio_id': 1, 'strona_zlecenia': 'KUPNO', 'symbol': 'AAPL', 'ilosc': 10.0,
+             'cena_jednostkowa': 145.0, 'data_transakcji': datetime(2025, 3, 4)},
+        ])
+
+        executed, messages = OrderService.process_limit_orders_for_range(1, date(2025, 1, 1), date(2025, 12, 31))
+
+        assert executed == 1
+        assert messages == ["2025-03-04: Wykonano zlecenie KUPNO AAPL (10 szt. po 145.00)"]
+        mock_procedures.process_limit_orders_range.assert_called_once_with(
+            1, date(2025, 1, 1), date(2025, 12, 31)
+        )
+
+    @patch('services.order_service.PositionLedgerService')
+    @patch('services.order_service.create_and_execute_market_order')
+    def test_create_and_execute_buy_marks_ledger_stale(self, mock_execute, mock_ledger):
+        """Test that an executed market order makes the portfolio's ledger reload its transactions."""
+        from services.order_service import OrderService
+
+        mock_execute.return_value = (True, "OK")
+        assert OrderService.create_and_execute_buy(1, 2, 10, 150.0) == (True, "OK")
+        mock_ledger.mark_stale.assert_called_once_with(1)
+
+        mock_ledger.reset_mock()
+        mock_execute.return_value = (False, "Błąd")
+        OrderService.create_and_execute_sell(1, 2, 10, 150.0)
+        mock_ledger.mark_stale.assert_not_called()
+
+    @patch('services.order_service.Procedures')
+    def test_match_all_limit_orders(self, mock_procedures):
+        """Test the global matching job reports counts and round-trip time."""
+        from services.order_service import OrderService
+
+        mock_procedures.match_limit_orders.return_value = (True, "Wykonano: 2/3", {
+            'sprawdzone': 10, 'spelnione': 3, 'wykonane': 2, 'odrzucone': 1,
+            'czas_wyboru_ms': 20, 'czas_realizacji_ms': 40,
+        }, [])
+
+        success, message, stats = OrderService.match_all_limit_orders(date(2025, 3, 3), date(2025, 3, 4))
+
+        assert success is True
+        assert stats['wykonane'] == 2 and stats['odrzucone'] == 1
+        assert stats['czas_calkowity_ms'] >= 0
+        mock_procedures.match_limit_orders.assert_called_once_with(date(2025, 3, 3), date(2025, 3, 4))
+
+    @patch('services.order_service.Procedures')
+    def test_process_limit_orders_for_range_backwards(self, mock_procedures):
+        """Test that moving back in time does not process orders."""
+        from services.order_service import OrderService
+
+        assert OrderService.process_limit_orders_for_range(1, date(2025, 3, 1), date(2025, 1, 1)) == (0, [])
+        mock_procedures.process_limit_orders_range.assert_not_called()
+
+
+    @patch('services.order_service.unit_of_work')
+    @patch('services.order_service.Procedures')
+    def test_cancel_orders(self, mock_procedures, mock_uow):
+        """Test cancelling several orders in one unit of work."""
+        from services.order_service import OrderService
+
+        mock_procedures.cancel_order.side_effect = [(True, "OK"), (False, "Błąd"), (True, "OK")]
+
+        result = OrderService.cancel_orders([1, 2, 3])
+
+        assert result == 2
+        mock_uow.assert_called_once()
+        assert mock_procedures.cancel_order.call_count == 3
+
 
 class TestTransactionService:
     """Tests for TransactionService."""
@@ -409,7 +621,7 @@ class TestTransactionService:
 class TestMarketService:
     """Tests for MarketService."""
 
-    @patch('services.market_service.execute_query_dict')
+    @patch('services.market_service.execute_query_records')
     def test_get_all_instruments(self, mock_execute):
         """Test getting all instruments."""
         from services.market_service import MarketService
@@ -458,6 +670,7 @@ class TestMarketService:
 
         assert result == 150.00
 
+    @patch.dict('services.price_matrix.PRICE_MATRIX_CONFIG', {'enabled': False})
     @patch('services.market_service.Procedures')
     def test_get_price_for_date(self, mock_procedures):
         """Test getting price for date."""
@@ -507,6 +720,39 @@ class TestMarketService:
         assert min_date is None
         assert max_date is None
 
+    @patch('services.market_service.execute_query_dict')
+    def test_reference_data_is_cached(self, mock_execute):
+        """Test that sectors are queried once until the cache is invalidated."""
+        from services.market_service import MarketService
+        from services.reference_cache import reference_cache
+
+        mock_execute.return_value = [{'sector_id': 1, 'nazwa_sektora': 'Technologia'}]
+
+        assert MarketService.get_all_sectors() == MarketService.get_all_sectors()
+        assert mock_execute.call_count == 1
+
+        reference_cache.invalidate()
+        MarketService.get_all_sectors()
+        assert mock_execute.call_count == 2
+
+    @patch('services.market_service.execute_query_records')
+    def test_get_instruments_with_prices_single_query(self, mock_execute):
+        """Test that prices for all instruments come from one as-of query."""
+        from services.market_service import MarketService
+        from db.queries import Queries
+
+        mock_execute.return_value = [{'instrument_id': 1, 'cena_zamkniecia': 150.0}]
+
+        result = MarketService.get_instruments_with_prices(date(2025, 3, 1))
+        MarketService.get_instruments_with_prices()
+
+        assert result == [{'instrument_id': 1, 'cena_zamkniecia': 150.0}]
+        assert mock_execute.call_count == 2
+        first, latest = mock_execute.call_args_list
+        assert first.args == (Queries.GET_INSTRUMENTS_WITH_PRICES, {'data_notowan': date(2025, 3, 1)})
+        # Latest prices are read from the NOTOWANIA_BIEZACE snapshot table
+        assert latest.args == (Queries.GET_INSTRUMENTS_WITH_LATEST_PRICES,)
+
     @patch('services.market_service.execute_query')
     def test_get_trading_days_between(self, mock_execute):
         """Test getting trading days between dates."""
@@ -521,3 +767,501 @@ class TestMarketService:
         result = MarketService.get_trading_days_between(date(2025, 1, 1), date(2025, 1, 6))
 
         assert len(result) == 3
+
+    @patch('services.market_service.execute_query')
+    def test_next_and_previous_trading_day(self, mock_execute):
+        """Test trading calendar lookups for the neighbouring sessions."""
+        from services.market_service import MarketService
+        from db.queries import Queries
+
+        mock_execute.side_effect = [[(datetime(2025, 1, 6),)], [(None,)]]
+
+        assert MarketService.get_next_trading_day(date(2025, 1, 3)) == date(2025, 1, 6)
+        assert MarketService.get_previous_trading_day(date(2025, 1, 2)) is None
+
+        next_call, previous_call = mock_execute.call_args_list
+        assert next_call.args == (Queries.GET_NEXT_TRADING_DAY, {'data_sesji': date(2025, 1, 3)})
+        assert previous_call.args == (Queries.GET_PREVIOUS_TRADING_DAY, {'data_sesji': date(2025, 1, 2)})
+
+    @patch('services.market_service.iter_query_dict')
+    def test_iter_price_history(self, mock_iter):
+        """Test streaming price history."""
+        from services.market_service import MarketService
+
+        mock_iter.return_value = iter([
+            {'data_notowan': date(2025, 1, 2), 'cena_zamkniecia': 150.00},
+            {'data_notowan': date(2025, 1, 3), 'cena_zamkniecia': 151.00}
+        ])
+
+        result = MarketService.iter_price_history(1, date(2025, 1, 1), date(2025, 1, 31))
+
+        assert len(list(result)) == 2
+        mock_iter.assert_called_once()
+
+
+class TestPriceMatrix:
+    """Tests for the in-memory price matrix."""
+
+    def test_as_of_lookups_forward_fill(self, price_matrix):
+        """Test as-of prices on trading days, gaps, weekends and before data."""
+        matrix = price_matrix
+
+        assert matrix.price_as_of(1, date(2025, 1, 3)) == 11.0
+        assert matrix.price_as_of(1, date(2025, 1, 5)) == 11.0
+        assert matrix.price_as_of(2, date(2025, 1, 6)) == 20.0
+        assert matrix.price_as_of(2, date(2025, 1, 2)) is None
+        assert matrix.price_as_of(1, date(2024, 12, 31)) is None
+        assert matrix.price_as_of(99, date(2025, 1, 6)) is None
+        assert matrix.prices_as_of([1, 2, 99], date(2025, 1, 2)) == {1: 10.0}
+        assert matrix.snapshot(date(2025, 1, 10)) == {1: 12.0, 2: 20.0}
+        assert matrix.last_row_id == 4
+
+    def test_price_range(self, price_matrix):
+        """Test forward-filled closes for a date range."""
+        import numpy as np
+
+        dates, closes = price_matrix.price_range(2, date(2025, 1, 1), date(2025, 1, 6))
+
+        assert len(dates) == 3
+        assert np.isnan(closes[0])
+        assert closes[1:].tolist() == [20.0, 20.0]
+
+    def test_incremental_append_and_backfill(self, price_matrix):
+        """Test appending new days and merging back-filled history."""
+        import numpy as np
+
+        matrix = price_matrix
+        matrix.add_bars(np.array([1]), np.array(['2025-01-07'], dtype='datetime64[D]'),
+                        np.array([13.0]), np.array([5]))
+
+        assert matrix.price_as_of(2, date(2025, 1, 7)) == 20.0
+        assert matrix.price_as_of(1, date(2025, 1, 7)) == 13.0
+
+        matrix.add_bars(np.array([3]), np.array(['2025-01-01'], dtype='datetime64[D]'),
+                        np.array([5.0]), np.array([6]))
+
+        assert matrix.price_as_of(3, date(2025, 1, 7)) == 5.0
+        assert matrix.price_as_of(1, date(2025, 1, 1)) is None
+        assert matrix.price_as_of(1, date(2025, 1, 7)) == 13.0
+        assert matrix.last_row_id == 6
+
+    @patch('services.price_matrix.execute_query_frame')
+    def test_service_refreshes_incrementally(self, mock_frame):
+        """Test that only rows after the last loaded id are fetched."""
+        import pandas as pd
+        from services.price_matrix import PriceMatrixService
+
+        PriceMatrixService.invalidate()
+        mock_frame.side_effect = [
+            pd.DataFrame({'daily_data_id': [1], 'instrument_id': [1],
+                          'data_notowan': [pd.Timestamp('2025-01-02')], 'cena_zamkniecia': [10.0]}),
+            pd.DataFrame({'daily_data_id': [2], 'instrument_id': [1],
+                          'data_notowan': [pd.Timestamp('2025-01-03')], 'cena_zamkniecia': [11.0]}),
+        ]
+        try:
+            assert PriceMatrixService.price_as_of(1, date(2025, 1, 3)) == 10.0
+            PriceMatrixService.mark_stale()
+            assert PriceMatrixService.price_as_of(1, date(2025, 1, 3)) == 11.0
+            assert mock_frame.call_args_list[1].args[1] == {'last_id': 1}
+        finally:
+            PriceMatrixService.invalidate()
+
+
+class TestPortfolioHistory:
+    """Tests for the portfolio value history engine."""
+
+    def test_build_value_history(self, price_matrix, transaction_flows):
+        """Test that holdings replay forward and cash unwinds from the current saldo."""
+        from services.portfolio_history import build_value_history
+
+        transactions = transaction_flows(('2025-01-03', 1, 'KUPNO', 2.0, 22.0, 0.09))
+
+        history = build_value_history(transactions, 100.0, price_matrix)
+
+        assert history['data'].tolist() == [date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 6)]
+        assert history['gotowka'].tolist() == [122.09, 100.0, 100.0]
+        assert history['wartosc_pozycji'].tolist() == [0.0, 22.0, 24.0]
+        assert history['wartosc'].tolist() == [122.09, 122.0, 124.0]
+
+    def test_unpriced_holdings_valued_at_cost(self, price_matrix, transaction_flows):
+        """Test that holdings without a close count at their average cost, like the snapshots."""
+        from services.portfolio_history import build_value_history
+
+        transactions = transaction_flows(
+            ('2025-01-02', 2, 'KUPNO', 2.0, 20.0, 0.0),
+            ('2025-01-02', 2, 'KUPNO', 2.0, 28.0, 0.0),
+            ('2025-01-02', 2, 'SPRZEDAZ', 1.0, 15.0, 0.0),
+        )
+
+        history = build_value_history(transactions, 100.0, price_matrix)
+
+        # Before the first close: three of four shares at three quarters of the cost of 48
+        assert history['wartosc_pozycji'].tolist() == [36.0, 60.0, 60.0]
+
+    @patch('services.portfolio_history.execute_query_frame')
+    @patch('services.portfolio_history.execute_query')
+    @patch('services.portfolio_history.PriceMatrixService.get_matrix')
+    def test_history_is_cached_per_version(self, mock_matrix, mock_query, mock_frame,
+                                           price_matrix, transaction_flows):
+        """Test that transactions are fetched again only after the portfolio changes."""
+        from services.portfolio_history import PortfolioHistoryService
+
+        PortfolioHistoryService.invalidate()
+        mock_matrix.return_value = price_matrix
+        mock_query.return_value = [(100.0, 1)]
+        mock_frame.return_value = transaction_flows(('2025-01-03', 1, 'KUPNO', 2.0, 22.0, 0.09))
+        try:
+            history = PortfolioHistoryService.get_value_history(1, end_date=date(2025, 1, 5))
+            PortfolioHistoryService.get_value_history(1)
+
+            assert history['data'].tolist() == [date(2025, 1, 3)]
+            assert mock_frame.call_count == 1
+
+            mock_query.return_value = [(50.0, 2)]
+            PortfolioHistoryService.get_value_history(1)
+
+            assert mock_frame.call_count == 2
+        finally:
+            PortfolioHistoryService.invalidate()
+
+
+class TestPositionLedger:
+    """Tests for event-sourced position reconstruction."""
+
+    def test_positions_follow_weighted_average_cost(self, position_flows):
+        """Test later sells, re-buys and closed positions at different dates."""
+        from services.position_ledger import PositionLedger
+
+        ledger = PositionLedger(checkpoint_interval=2)
+        ledger.append(position_flows)
+
+        assert ledger.positions_as_of(date(2025, 1, 1)) == {}
+        after_sell = ledger.positions_as_of(date(2025, 1, 3))
+        assert after_sell[1]['ilosc_akcji'] == 5.0
+        assert after_sell[1]['wartosc_zakupu'] == 50.0
+        rebought = ledger.positions_as_of(datetime(2025, 1, 7))
+        assert rebought[1]['srednia_cena_zakupu'] == 15.0
+        assert rebought[1]['data_pierwszego_zakupu'] == date(2025, 1, 2)
+        assert set(rebought) == {1, 2}
+        assert set(ledger.positions_as_of(date(2025, 1, 8))) == {2}
+        assert ledger.last_transaction_id == 5
+
+    def test_fractional_sells_close_position(self, transaction_flows):
+        """Test that selling 0.3 after buying 0.1 and 0.2 shares closes the position despite float sums."""
+        from services.position_ledger import PositionLedger
+
+        ledger = PositionLedger()
+        ledger.append(transaction_flows(
+            ('2025-01-02', 1, 'KUPNO', 0.1, 10.0, 0.0),
+            ('2025-01-03', 1, 'KUPNO', 0.2, 20.0, 0.0),
+            ('2025-01-06', 1, 'SPRZEDAZ', 0.3, 33.0, 0.0),
+        ))
+
+        assert ledger.positions_as_of(date(2025, 1, 3))[1]['ilosc_akcji'] == 0.3
+        assert ledger.positions_as_of(date(2025, 1, 6)) == {}
+
+    def test_checkpoints_match_full_replay(self, position_flows):
+        """Test that lookups from checkpoints equal replaying every transaction."""
+        from services.position_ledger import PositionLedger
+
+        checkpointed, full = PositionLedger(checkpoint_interval=1), PositionLedger(checkpoint_interval=1000)
+        checkpointed.append(position_flows)
+        full.append(position_flows)
+
+        for day in range(1, 10):
+            target = date(2025, 1, day)
+            assert checkpointed.positions_as_of(target) == full.positions_as_of(target)
+
+    @patch('services.position_ledger.execute_query_frame')
+    @patch('services.position_ledger.execute_query')
+    def test_service_appends_new_transactions(self, mock_version, mock_frame, position_flows):
+        """Test that only transactions after the cached ledger are loaded."""
+        from services.position_ledger import PositionLedgerService
+        from db.queries import Queries
+
+        transactions = position_flows
+        PositionLedgerService.invalidate()
+        mock_version.return_value = [(100.0, 4)]
+        mock_frame.return_value = transactions.iloc[:4]
+        try:
+            cached = PositionLedgerService.get_ledger(1)
+            assert PositionLedgerService.get_ledger(1) is cached
+
+            mock_version.return_value = [(300.0, 5)]
+            mock_frame.return_value = transactions.iloc[4:]
+            PositionLedgerService.mark_stale(1)
+            ledger = PositionLedgerService.get_ledger(1)
+
+            assert mock_frame.call_args.args == (
+                Queries.GET_PORTFOLIO_TRANSACTION_FLOWS_SINCE, {'portfolio_id': 1, 'last_id': 4}
+            )
+            assert len(cached) == 4 and len(ledger) == 5
+            assert set(ledger.positions_as_of(date(2025, 1, 8))) == {2}
+        finally:
+            PositionLedgerService.invalidate()
+
+    @patch('services.position_ledger.execute_query_frame')
+    @patch('services.position_ledger.execute_query')
+    def test_service_checks_version_once_per_refresh(self, mock_version, mock_frame, position_flows):
+        """Test that a fresh cached ledger is returned without a version query until marked stale."""
+        from services.position_ledger import PositionLedgerService
+
+        PositionLedgerService.invalidate()
+        mock_version.return_value = [(100.0, 4)]
+        mock_frame.return_value = position_flows.iloc[:4]
+        try:
+            cached = PositionLedgerService.get_ledger(1)
+            for _ in range(3):
+                assert PositionLedgerService.get_ledger(1) is cached
+            assert mock_version.call_count == 1
+
+            PositionLedgerService.mark_stale(1)
+            assert PositionLedgerService.get_ledger(1) is cached
+            assert mock_version.call_count == 2
+            assert mock_frame.call_count == 1
+        finally:
+            PositionLedgerService.invalidate()
+
+    @patch('services.position_ledger.execute_query_frame')
+    @patch('services.position_ledger.execute_query')
+    def test_service_rebuilds_on_same_day_transaction(self, mock_version, mock_frame, position_flows):
+        """Test that a transaction on the ledger's last day rebuilds it in timestamp order."""
+        from services.position_ledger import PositionLedgerService
+        from db.queries import Queries
+
+        transactions = position_flows
+        PositionLedgerService.invalidate()
+        mock_version.return_value = [(100.0, 3)]
+        mock_frame.return_value = transactions.iloc[:3]
+        try:
+            PositionLedgerService.get_ledger(1)
+
+            mock_version.return_value = [(70.0, 4)]
+            mock_frame.side_effect = [transactions.iloc[3:4], transactions.iloc[:4]]
+            PositionLedgerService.mark_stale(1)
+            ledger = PositionLedgerService.get_ledger(1)
+
+            assert mock_frame.call_args.args == (
+                Queries.GET_PORTFOLIO_TRANSACTION_FLOWS, {'portfolio_id': 1}
+            )
+            assert len(ledger) == 4
+        finally:
+            PositionLedgerService.invalidate()
+
+
+class TestAnalytics:
+    """Tests for portfolio performance analytics."""
+
+    def test_returns_net_of_flows(self):
+        """Test that deposits do not count as return."""
+        import numpy as np
+        from services.analytics import daily_returns, time_weighted_return, money_weighted_return
+
+        returns = daily_returns(np.array([100.0, 210.0]), np.array([0.0, 100.0]))
+
+        assert returns.tolist() == pytest.approx([0.1])
+        assert time_weighted_return(returns) == pytest.approx(0.1)
+        days = np.array(['2025-01-01', '2026-01-01'], dtype='datetime64[D]')
+        assert money_weighted_return(np.array([100.0, 210.0]), np.array([0.0, 100.0]), days) == pytest.approx(0.1)
+
+    def test_short_period_mwr_not_annualized(self):
+        """Test that MWR over less than a year is the rate over the period."""
+        import numpy as np
+        from services.analytics import money_weighted_return
+
+        days = np.array(['2025-01-01', '2025-01-08'], dtype='datetime64[D]')
+
+        assert money_weighted_return(np.array([100.0, 106.0]), None, days) == pytest.approx(0.06)
+
+    def test_beta_skips_days_before_benchmark_quote(self):
+        """Test that a benchmark without a quote yet adds no fake zero returns to beta."""
+        import numpy as np
+        from services.analytics import daily_returns, beta
+
+        benchmark = np.array([np.nan, np.nan, 100.0, 110.0, 99.0])
+        portfolio = np.array([100.0, 150.0, 120.0, 144.0, 115.2])
+
+        benchmark_returns = daily_returns(benchmark)
+
+        assert np.isnan(benchmark_returns[:2]).all()
+        assert beta(daily_returns(portfolio), benchmark_returns) == pytest.approx(2.0)
+
+    def test_compute_analytics(self, value_history):
+        """Test drawdown, cumulative return and beta against a benchmark."""
+        import numpy as np
+        from services.analytics import compute_analytics
+
+        values = np.array([100.0, 110.0, 99.0, 120.0])
+        history = value_history(values)
+        # Benchmark moves half as much as the portfolio every day
+        benchmark = 100.0 * np.concatenate([[1.0], np.cumprod(1.0 + (values[1:] / values[:-1] - 1.0) / 2)])
+
+        result = compute_analytics(history, benchmark)
+
+        assert result['twr'] == pytest.approx(0.2)
+        assert result['zwrot_skumulowany'] == pytest.approx(0.2)
+        assert result['max_obsuniecie'] == pytest.approx(-0.1)
+        assert result['beta'] == pytest.approx(2.0)
+        assert result['szereg']['obsuniecie'].tolist() == pytest.approx([0.0, 0.0, -0.1, 0.0])
+        assert result['sharpe'] is not None and result['sortino'] is not None
+
+    @patch('services.analytics.AnalyticsService.get_benchmark')
+    @patch('services.analytics.PriceMatrixService.get_matrix')
+    @patch('services.analytics.PortfolioHistoryService.get_value_history')
+    def test_analytics_cached_per_range(self, mock_history, mock_matrix, mock_benchmark, value_history):
+        """Test that analytics are recomputed only when the value series changes."""
+        from services.analytics import AnalyticsService
+        from services.price_matrix import PriceMatrix
+
+        AnalyticsService.invalidate()
+        mock_history.return_value = value_history([100.0, 110.0, 121.0])
+        mock_matrix.return_value = PriceMatrix()
+        mock_benchmark.return_value = None
+        try:
+            first = AnalyticsService.get_portfolio_analytics(1)
+            assert AnalyticsService.get_portfolio_analytics(1) is first
+            assert first['benchmark'] is None and first['beta'] is None
+
+            mock_history.return_value = value_history([100.0, 110.0, 132.0])
+            second = AnalyticsService.get_portfolio_analytics(1)
+
+            assert second['twr'] == pytest.approx(0.32)
+            assert mock_benchmark.call_count == 2
+
+            mock_history.return_value = value_history([100.0])
+            assert AnalyticsService.get_portfolio_analytics(1, end_date=date(2025, 1, 1)) is None
+        finally:
+            AnalyticsService.invalidate()
+
+
+class TestIndicators:
+    """Tests for the technical indicators cache."""
+
+    def test_incremental_matches_full(self, price_bars):
+        """Test that indicators appended from the stored tail equal a full computation."""
+        import numpy as np
+        import pandas as pd
+        from services.indicators import compute_indicators, INDICATOR_COLUMNS, STATE_COLUMNS
+
+        bars = price_bars(120)
+        full = compute_indicators(bars)
+        head = compute_indicators(bars.iloc[:70])
+        incremental = pd.concat([head, compute_indicators(bars.iloc[70:], head)], ignore_index=True)
+
+        columns = INDICATOR_COLUMNS + STATE_COLUMNS
+        assert np.allclose(full[columns].to_numpy(float), incremental[columns].to_numpy(float), equal_nan=True)
+        assert full['sma_20'].iloc[-1] == pytest.approx(bars['close'].iloc[-20:].mean())
+        assert full['sma_50'].iloc[:49].isna().all()
+        assert full['rsi_14'].dropna().between(0, 100).all()
+
+    @patch('services.indicators.execute_query_frame')
+    def test_service_loads_only_new_bars(self, mock_query, price_bars):
+        """Test that refreshes append new bars and recompute back-filled ones."""
+        import pandas as pd
+        from services.indicators import IndicatorService, compute_indicators
+
+        def rows(bars, first_id):
+            return pd.DataFrame({
+                'daily_data_id': range(first_id, first_id + len(bars)),
+                'instrument_id': 1,
+                'data_notowan': bars['data'],
+                'cena_otwarcia': bars['open'], 'cena_max': bars['high'],
+                'cena_min': bars['low'], 'cena_zamkniecia': bars['close'],
+            })
+
+        bars = price_bars(60)
+        IndicatorService.invalidate()
+        try:
+            mock_query.return_value = rows(bars.iloc[:40], 1)
+            assert len(IndicatorService.get_indicators(1)) == 40
+
+            mock_query.return_value = rows(bars.iloc[40:], 41)
+            assert IndicatorService.refresh() == 20
+            assert mock_query.call_args[0][1] == {'last_id': 40}
+            result = IndicatorService.get_indicators(1, date(2025, 2, 1), None)
+            expected = compute_indicators(bars)
+            assert result['data'].iloc[0] == pd.Timestamp(2025, 2, 1)
+            assert result['macd'].iloc[-1] == pytest.approx(expected['macd'].iloc[-1])
+
+            # A corrected earlier day recomputes the instrument
+            corrected = bars.copy()
+            corrected.loc[10, 'close'] += 5
+            mock_query.return_value = rows(corrected.iloc[10:11], 61)
+            IndicatorService.refresh()
+            result = IndicatorService.get_indicators(1)
+            assert len(result) == 60
+            assert result['sma_20'].iloc[-1] == pytest.approx(compute_indicators(corrected)['sma_20'].iloc[-1])
+            assert IndicatorService.get_indicators(2).empty
+        finally:
+            IndicatorService.invalidate()
+
+    def test_candlestick_chart_overlays(self, price_bars):
+        """Test that selected indicators are drawn from the precomputed frame."""
+        from components.charts import Charts
+        from services.indicators import compute_indicators
+
+        bars = price_bars(30)
+        price_data = bars.rename(columns={'data': 'data_notowan'}).assign(wolumen=1000)
+        indicators = compute_indicators(bars)
+
+        fig = Charts.candlestick_chart(price_data, 'AAPL', indicators=indicators,
+                                       selected_indicators=['SMA 20', 'Bollinger', 'MACD'])
+
+        names = [trace.name for trace in fig.data]
+        assert 'SMA 20' in names and 'Bollinger górna' in names and 'MACD' in names
+        assert len(Charts.candlestick_chart(price_data, 'AAPL').data) == 2
+
+
+class TestDataLoader:
+    """Tests for DataLoader."""
+
+    @patch('services.data_loader.OrderService.match_all_limit_orders')
+    @patch('services.data_loader.Procedures.update_all_portfolios')
+    @patch('services.data_loader.execute_many')
+    @patch('services.data_loader.fetch_multiple_stocks')
+    def test_load_price_data_bulk_insert(self, mock_fetch, mock_execute_many, mock_revalue, mock_match):
+        """Test that prices are inserted in bulk and duplicates are skipped."""
+        import pandas as pd
+        from services.data_loader import DataLoader
+
+        mock_fetch.return_value = {
+            'AAPL': pd.DataFrame({
+                'data': [date(2025, 1, 2), date(2025, 1, 3)],
+                'open': [1.0, 2.0], 'high': [1.5, 2.5], 'low': [0.5, 1.5],
+                'close': [1.2, 2.2], 'volume': [100, 200],
+            })
+        }
+        mock_execute_many.return_value = (1, [
+            {'row': 0, 'code': 1, 'message': 'ORA-00001'},
+        ])
+        mock_revalue.return_value = (True, "Pozycje we wszystkich portfelach zaktualizowane")
+        mock_match.return_value = (True, "Skojarzono zlecenia z dnia 2025-01-03. Wykonano: 0/0", {})
+
+        success, message = DataLoader.load_price_data({'AAPL': 7}, '2025-01-01', '2025-01-31')
+
+        assert success is True
+        assert 'Dodano 1 rekordów' in message
+        assert 'Odrzucono' not in message
+        rows = mock_execute_many.call_args.args[1]
+        assert len(rows) == 2
+        assert rows[1]['instrument_id'] == 7
+        assert rows[1]['volume'] == 200 and type(rows[1]['volume']) is int
+        # Limit orders are matched against the inserted days and portfolios revalued once
+        mock_match.assert_called_once_with(date(2025, 1, 3), date(2025, 1, 3))
+        # Snapshots are recalculated from the first inserted (not rejected) day
+        mock_revalue.assert_called_once_with(date(2025, 1, 3))
+        assert 'Skojarzono zlecenia' in message
+
+    @patch('services.data_loader.DataLoader.initialize_exchange')
+    def test_initialize_all_invalidates_cache(self, mock_exchange):
+        """Test that reference data is reloaded after initialize_all, even on failure."""
+        from services.data_loader import DataLoader
+        from services.reference_cache import reference_cache, SECTORS
+
+        reference_cache.set(SECTORS, [{'sector_id': 1}])
+        mock_exchange.return_value = (False, "Błąd", None)
+
+        success, messages = DataLoader.initialize_all()
+
+        assert success is False
+        assert reference_cache.get(SECTORS) is None